@@ -0,0 +1,195 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import faiss
+
+
+def normalize_question(question):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!. ")
+
+
+class AnswerCache:
+    """Bounded LRU cache of answers with a time-to-live
+
+    Keys combine the normalized question, the answer mode and the vector store
+    version, so adding or deleting documents makes older answers unreachable.
+    With disk_path set, answers are also kept in SQLite and survive restarts.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=3600, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> (answer, created)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.conn = None
+        if disk_path:
+            self.conn = sqlite3.connect(disk_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, answer TEXT, created REAL)"
+            )
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(question, use_advanced, version):
+        return f"{int(bool(use_advanced))}:{version}:{normalize_question(question)}"
+
+    def get(self, question, use_advanced, version):
+        """Cached answer, or None on a miss"""
+        key = self.make_key(question, use_advanced, version)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.entries.pop(key, None)
+
+            if self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT answer, created FROM answers WHERE key = ? AND created >= ?",
+                    (key, now - self.ttl_seconds)
+                ).fetchone()
+                if row is not None:
+                    self.remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, question, use_advanced, version, answer):
+        key = self.make_key(question, use_advanced, version)
+        now = time.time()
+        with self.lock:
+            self.remember(key, answer, now)
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO answers (key, answer, created) VALUES (?, ?, ?)",
+                    (key, answer, now)
+                )
+                # Expired answers are never read again
+                self.conn.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl_seconds,))
+                self.conn.commit()
+
+    def remember(self, key, answer, created):
+        """Add to the in-memory tier, evicting the least recently used entry (lock held)"""
+        self.entries[key] = (answer, created)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get_stats(self):
+        """Hit/miss counters and size of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM answers")
+                self.conn.commit()
+
+
+class SemanticAnswerCache:
+    """Reuse answers for questions that are worded differently but mean the same
+
+    Question embeddings go into a small FAISS inner-product index; a lookup
+    returns the closest cached answer if its cosine similarity passes threshold.
+    Entries are evicted least recently used first, and each remembers the content
+    hashes of the chunks it was answered from so callers can drop it once those
+    chunks are deleted or changed.
+    """
+
+    def __init__(self, dimension, threshold=0.9, max_entries=512):
+        self.dimension = dimension
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        self.entries = OrderedDict()  # id -> {'question', 'answer', 'use_advanced', 'chunk_hashes'}
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, embedding, use_advanced, is_valid=None):
+        """Most similar cached entry answered in the same mode, or None
+
+        is_valid(chunk_hashes) is asked before returning an entry; entries it
+        rejects are invalidated.
+        """
+        query = np.ascontiguousarray(embedding, dtype='float32').reshape(1, -1)
+        with self.lock:
+            if self.index.ntotal:
+                # A few neighbours in case the closest was answered in the other mode
+                scores, ids = self.index.search(query, min(4, self.index.ntotal))
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if entry_id == -1 or score < self.threshold:
+                        break
+                    entry_id = int(entry_id)
+                    entry = self.entries[entry_id]
+                    if entry['use_advanced'] != bool(use_advanced):
+                        continue
+                    if is_valid is not None and not is_valid(entry['chunk_hashes']):
+                        self.remove(entry_id)
+                        self.invalidations += 1
+                        continue
+                    self.entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return dict(entry, score=float(score))
+            self.misses += 1
+            return None
+
+    def put(self, embedding, use_advanced, question, answer, chunk_hashes):
+        vector = np.ascontiguousarray(embedding, dtype='float32').reshape(1, -1)
+        with self.lock:
+            entry_id = self.next_id
+            self.next_id += 1
+            self.index.add_with_ids(vector, np.array([entry_id], dtype='int64'))
+            self.entries[entry_id] = {
+                'question': question,
+                'answer': answer,
+                'use_advanced': bool(use_advanced),
+                'chunk_hashes': list(chunk_hashes)
+            }
+            while len(self.entries) > self.max_entries:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, entry_id):
+        """Drop an entry from the index (lock held)"""
+        del self.entries[entry_id]
+        self.index.remove_ids(np.array([entry_id], dtype='int64'))
+
+    def get_stats(self):
+        """Hit/miss counters and size of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def clear(self):
+        with self.lock:
+            self.index.reset()
+            self.entries.clear()
@@ -0,0 +1,102 @@
+# benchmark_index.py - Recall vs. latency report for the vector store index types
+#
+# Usage:
+#   python benchmark_index.py                 # use vectors from ./vector_store
+#   python benchmark_index.py --synthetic 200000
+
+import argparse
+import os
+import time
+import numpy as np
+import faiss
+from local_vector_store import build_index, get_search_params
+
+# Settings to sweep for each index type
+SWEEPS = {
+    "flat": [{}],
+    "ivf_flat": [{"nprobe": n} for n in (1, 4, 8, 16, 32, 64)],
+    "ivf_pq": [{"nprobe": n} for n in (4, 16, 32, 64)],
+    "hnsw": [{"ef_search": ef} for ef in (16, 32, 64, 128, 256)],
+}
+
+
+def load_store_vectors(store_path):
+    """Read the vectors of an existing vector store"""
+    vectors_file = os.path.join(store_path, "vectors.npy")
+    if os.path.exists(vectors_file):
+        return np.ascontiguousarray(np.load(vectors_file), dtype='float32')
+    # Stores saved before vectors.npy existed only have a flat docs.index
+    index = faiss.read_index(os.path.join(store_path, "docs.index"))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def make_synthetic_vectors(count, dimension, seed=42):
+    """Generate clustered random vectors that look a bit like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, count // 500), dimension)).astype('float32')
+    assignments = rng.integers(0, len(centers), size=count)
+    vectors = centers[assignments] + 0.5 * rng.standard_normal((count, dimension)).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(ground_truth, found):
+    """Fraction of the exact top-k neighbours that the index also returned"""
+    hits = 0
+    for truth_row, found_row in zip(ground_truth, found):
+        hits += len(set(truth_row) & set(found_row))
+    return hits / ground_truth.size
+
+
+def run_report(vectors, num_queries=200, k=5):
+    """Print recall@k and per-query latency for every index type and setting"""
+    dimension = vectors.shape[1]
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype('float32')
+    faiss.normalize_L2(queries)
+
+    exact = build_index("flat", dimension, vectors)
+    _, ground_truth = exact.search(queries, k)
+
+    print(f"📊 {len(vectors)} vectors, {len(queries)} queries, recall@{k}")
+    print(f"{'index':<10} {'setting':<16} {'build (s)':>10} {'recall':>8} {'ms/query':>10}")
+    print("-" * 58)
+
+    for index_type, settings in SWEEPS.items():
+        start = time.perf_counter()
+        try:
+            index = build_index(index_type, dimension, vectors)
+        except Exception as e:
+            print(f"{index_type:<10} ❌ could not build: {str(e)}")
+            continue
+        build_time = time.perf_counter() - start
+
+        for setting in settings:
+            params = get_search_params(index, **setting)
+            start = time.perf_counter()
+            for query in queries:
+                _, found = index.search(query.reshape(1, -1), k, params=params)
+            latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            _, found = index.search(queries, k, params=params)
+
+            label = ", ".join(f"{key}={value}" for key, value in setting.items()) or "exact"
+            print(f"{index_type:<10} {label:<16} {build_time:>10.2f} "
+                  f"{recall_at_k(ground_truth, found):>8.3f} {latency_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs. latency report for vector store indexes")
+    parser.add_argument("--store", default="vector_store", help="Vector store directory to read vectors from")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the store")
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        data = make_synthetic_vectors(args.synthetic, args.dimension)
+    else:
+        data = load_store_vectors(args.store)
+
+    run_report(data, num_queries=args.queries, k=args.k)
@@ -0,0 +1,140 @@
+# check_backends.py - Compare the int8 and ONNX inference backends against fp32
+#
+# Usage:
+#   python check_backends.py                 # embeddings of the chunks in ./vector_store
+#   python check_backends.py --threads 4
+#   python check_backends.py --generation    # also compare the generation model
+
+import argparse
+import glob
+import os
+import time
+import numpy as np
+import faiss
+from model_registry import (get_embedding_model, get_model_stats, model_key, quantize_int8,
+                            set_num_threads, BACKENDS, DEFAULT_EMBEDDING_MODEL)
+from local_vector_store import LocalVectorStore
+from benchmark_index import recall_at_k
+
+SAMPLE_QUESTIONS = [
+    "What's our vacation policy?",
+    "How do I submit an expense report?",
+    "Who should I contact for IT issues?",
+    "Can I work from home?",
+    "How many vacation days do I get?",
+    "What is the hotel limit for business travel?",
+    "How do I reset my password?",
+    "What are the core hours for remote workers?",
+]
+
+
+def load_corpus(store_path, limit):
+    """Chunk texts from a vector store, or lines of the sample documents"""
+    if os.path.exists(store_path):
+        store = LocalVectorStore(store_path=store_path, embedding_cache_size=0)
+        texts = [store.texts[i] for i in range(min(limit, len(store.texts)))]
+        if texts:
+            return texts
+    texts = []
+    for path in sorted(glob.glob("sample_docs/*.txt")):
+        with open(path, encoding='utf-8') as f:
+            texts.extend(line.strip() for line in f if line.strip())
+    return texts[:limit]
+
+
+def encode(model, texts):
+    embeddings = np.ascontiguousarray(model.encode(texts, batch_size=32, convert_to_numpy=True,
+                                                   show_progress_bar=False), dtype='float32')
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+
+def check_embeddings(texts, questions, model_name, k):
+    """Print cosine parity, recall@k and latency of every backend against fp32"""
+    results = {}
+    for backend in BACKENDS:
+        try:
+            model = get_embedding_model(model_name, backend=backend)
+        except Exception as e:
+            print(f"{backend:<8} ❌ could not load: {str(e)}")
+            continue
+        encode(model, texts[:8])  # warm up
+        start = time.perf_counter()
+        corpus = encode(model, texts)
+        elapsed = time.perf_counter() - start
+        results[backend] = (corpus, encode(model, questions), elapsed)
+
+    if "torch" not in results:
+        print("❌ fp32 baseline could not be loaded")
+        return
+
+    base_corpus, base_queries, base_time = results["torch"]
+    index = faiss.IndexFlatIP(base_corpus.shape[1])
+    index.add(base_corpus)
+    k = min(k, len(texts))
+    _, ground_truth = index.search(base_queries, k)
+    memory = get_model_stats()['models']
+
+    print(f"📊 {len(texts)} texts, {len(questions)} questions, recall@{k} against fp32")
+    print(f"{'backend':<8} {'cos mean':>9} {'cos min':>9} {'recall':>8} {'ms/text':>9} {'speedup':>8} {'RSS MB':>8}")
+    print("-" * 66)
+    for backend, (corpus, queries, elapsed) in results.items():
+        cosines = (corpus * base_corpus).sum(axis=1)
+        index = faiss.IndexFlatIP(corpus.shape[1])
+        index.add(corpus)
+        _, found = index.search(queries, k)
+        rss = memory.get(model_key(model_name, backend), {}).get('rss_delta_mb', 0)
+        print(f"{backend:<8} {cosines.mean():>9.4f} {cosines.min():>9.4f} {recall_at_k(ground_truth, found):>8.3f} "
+              f"{elapsed * 1000 / len(texts):>9.2f} {base_time / elapsed:>7.2f}x {rss:>8}")
+
+
+def check_generation(questions, model_name, max_new_tokens=40):
+    """Compare greedy int8 generation with fp32: token agreement and latency"""
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    fp32 = AutoModelForCausalLM.from_pretrained(model_name).eval()
+    int8 = quantize_int8(AutoModelForCausalLM.from_pretrained(model_name).eval())
+
+    def generate(model, prompt):
+        inputs = tokenizer(prompt, return_tensors="pt")
+        start = time.perf_counter()
+        with torch.no_grad():
+            output = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                                    pad_token_id=tokenizer.eos_token_id)
+        return output[0][inputs["input_ids"].shape[1]:].tolist(), time.perf_counter() - start
+
+    agreement, fp32_time, int8_time = [], 0.0, 0.0
+    for question in questions:
+        base_tokens, base_elapsed = generate(fp32, question)
+        tokens, elapsed = generate(int8, question)
+        same = sum(a == b for a, b in zip(base_tokens, tokens))
+        agreement.append(same / max(len(base_tokens), len(tokens), 1))
+        fp32_time += base_elapsed
+        int8_time += elapsed
+
+    print(f"\n🧠 {model_name}: int8 vs fp32 over {len(questions)} prompts (greedy, {max_new_tokens} tokens)")
+    print(f"   token agreement: {np.mean(agreement):.3f}")
+    print(f"   latency: fp32 {fp32_time * 1000 / len(questions):.0f} ms, "
+          f"int8 {int8_time * 1000 / len(questions):.0f} ms ({fp32_time / int8_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parity and speed of the inference backends against fp32")
+    parser.add_argument("--store", default="vector_store", help="Vector store directory to read chunks from")
+    parser.add_argument("--limit", type=int, default=1000, help="Maximum number of texts to embed")
+    parser.add_argument("--threads", type=int, default=None, help="torch / ONNX Runtime threads")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--generation", action="store_true", help="Also compare the generation model")
+    parser.add_argument("--generation-model", default="facebook/blenderbot-400M-distill")
+    args = parser.parse_args()
+
+    set_num_threads(args.threads)
+    corpus_texts = load_corpus(args.store, args.limit)
+    if not corpus_texts:
+        parser.error("No texts found: load documents into the store or create sample_docs/ first")
+
+    check_embeddings(corpus_texts, SAMPLE_QUESTIONS, DEFAULT_EMBEDDING_MODEL, args.k)
+    if args.generation:
+        check_generation(SAMPLE_QUESTIONS, args.generation_model)
@@ -0,0 +1,59 @@
+import hashlib
+import numpy as np
+import pytest
+import model_registry
+from local_vector_store import LocalVectorStore
+
+# Scripts that load the real models and use ./vector_store; run them by hand
+collect_ignore = ["test_vector_store.py", "quick_test.py"]
+
+DIMENSION = 16
+FAKE_MODEL = "fake-encoder"
+
+
+class FakeEncoder:
+    """Stands in for a SentenceTransformer: the same text always gets the same random vector"""
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else texts
+        vectors = np.stack([
+            np.random.default_rng(int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16))
+            .standard_normal(DIMENSION).astype('float32')
+            for text in texts
+        ])
+        return vectors[0] if single else vectors
+
+
+@pytest.fixture(autouse=True)
+def fake_encoder(monkeypatch):
+    encoder = FakeEncoder()
+    monkeypatch.setitem(model_registry._models, FAKE_MODEL, encoder)
+    return encoder
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    """Opens LocalVectorStores on one temporary directory with the fake encoder; closes them afterwards"""
+    stores = []
+
+    def open_store(**kwargs):
+        kwargs.setdefault('store_path', str(tmp_path / "store"))
+        kwargs.setdefault('embedding_cache_size', 0)
+        store = LocalVectorStore(dimension=DIMENSION, embedding_model_name=FAKE_MODEL, **kwargs)
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.close()
+
+
+def add_document(store, document_id, count, category=None, **kwargs):
+    """Add count chunks named '<document_id> chunk <i>' and return their texts"""
+    texts = [f"{document_id} chunk {i}" for i in range(count)]
+    metadata = {'document_id': document_id, 'source': f"{document_id}.txt"}
+    if category is not None:
+        metadata['category'] = category
+    store.add_documents(texts, [dict(metadata, chunk_index=i) for i in range(count)], **kwargs)
+    return texts
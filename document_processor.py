@@ -1,188 +1,437 @@
-import os
-import mimetypes
-from pathlib import Path
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from local_vector_store import LocalVectorStore
-from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-
-load_dotenv()
-
-class DocumentProcessor:
-    def __init__(self):
-        # Initialize local vector store
-        print("Initializing local vector store...")
-        self.vector_store = LocalVectorStore()
-        print("Vector store ready!")
-
-        print("Loading SentenceTransformer model...")
-        self.embedding_model = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
-        print("Embedding model loaded.")
-        
-        # Initialize text splitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-        )
-    
-    def process_text_file(self, file_path, document_id):
-        """Process a text file and add to vector database"""
-        try:
-            # Read the file
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            # Split into chunks
-            chunks = self.text_splitter.split_text(content)
-            print(f"Split document into {len(chunks)} chunks")
-            
-            # Prepare data for vector store
-            texts = chunks
-            metadatas = []
-            for i, chunk in enumerate(chunks):
-                metadatas.append({
-                    "text": chunk,
-                    "document_id": document_id,
-                    "chunk_index": i,
-                    "source": file_path
-                })
-            
-            # Embed each chunk
-            embeddings = self.embedding_model.encode(texts)
-
-            # Add to vector store
-            try:
-                self.vector_store.add_documents(texts, metadatas, embeddings=embeddings)
-            except Exception as e:
-                print(f"Error adding documents to vector store: {str(e)}")
-                return False
-
-            print(f"Successfully processed {file_path}")
-            return True
-            
-        except Exception as e:
-            print(f"Error processing {file_path}: {str(e)}")
-            return False
-
-    def detect_file_type(self, file_path):
-        """Detect file type using multiple methods"""
-        # Try MIME type detection
-        mime_type, _ = mimetypes.guess_type(file_path)
-        
-        # Fallback to file extension
-        extension = Path(file_path).suffix.lower()
-        
-        return mime_type, extension
-
-    def process_any_file(self, file_path, document_id):
-        """Process any supported file type"""
-        mime_type, extension = self.detect_file_type(file_path)
-    
-        if extension in ['.txt']:
-            return self.process_text_file(file_path, document_id)
-        elif extension in ['.pdf']:
-            return self.process_pdf_file(file_path, document_id)
-        elif extension in ['.docx']:
-            return self.process_docx_file(file_path, document_id)
-        elif extension in ['.csv']:
-            return self.process_csv_file(file_path, document_id)
-        else:
-            print(f"Unsupported file type: {extension}")
-            return False
-
-    def get_chunking_strategy(self, document_type):
-        """Get optimal chunking strategy based on document type"""
-        strategies = {
-            'policy': RecursiveCharacterTextSplitter(
-                chunk_size=1500, chunk_overlap=300
-            ),
-            'handbook': RecursiveCharacterTextSplitter(
-                chunk_size=2000, chunk_overlap=400
-            ),
-            'csv_data': RecursiveCharacterTextSplitter(
-                chunk_size=800, chunk_overlap=100
-            ),
-            'default': RecursiveCharacterTextSplitter(
-                chunk_size=1000, chunk_overlap=200
-            )
-        }
-        return strategies.get(document_type, strategies['default'])
-    
-    def add_sample_documents(self):
-        """Add some sample company documents"""
-        sample_docs = {
-            "vacation_policy": """
-            Company Vacation Policy
-            
-            All full-time employees are entitled to 15 days of paid vacation per year.
-            Vacation days accrue at a rate of 1.25 days per month.
-            Employees must request vacation at least 2 weeks in advance.
-            Vacation requests should be submitted through the HR portal.
-            Unused vacation days cannot be carried over to the next year.
-            Maximum vacation that can be taken at once is 10 consecutive days.
-            Part-time employees receive prorated vacation based on hours worked.
-            """,
-            
-            "expense_policy": """
-            Expense Reimbursement Policy
-            
-            Employees can be reimbursed for business-related expenses.
-            All expenses must be submitted within 30 days with receipts.
-            Meals are reimbursed up to $50 per day during business travel.
-            Transportation costs for business trips are fully covered.
-            Hotel accommodation is covered up to $200 per night.
-            Submit expense reports through the finance portal at finance.company.com.
-            Approval from manager required for expenses over $500.
-            Personal expenses will not be reimbursed under any circumstances.
-            """,
-            
-            "it_support": """
-            IT Support Guidelines
-            
-            For technical issues, contact IT support at it-help@company.com
-            For urgent issues, call the IT hotline: (555) 123-4567
-            Common issues can be resolved through the self-service portal.
-            New equipment requests should be submitted through IT portal.
-            Software installation requires IT approval for security reasons.
-            Password resets can be done through the company portal.
-            VPN access is required for remote work - contact IT for setup.
-            Regular security training is mandatory for all employees.
-            """,
-            
-            "remote_work": """
-            Remote Work Policy
-            
-            Employees can work remotely up to 3 days per week.
-            Remote work must be pre-approved by direct manager.
-            All remote workers must have reliable internet connection.
-            Company will provide necessary equipment for home office setup.
-            Remote workers must be available during core hours 10am-3pm EST.
-            Monthly in-person team meetings are required.
-            Productivity metrics will be tracked for remote workers.
-            Remote work privileges can be revoked for performance issues.
-            """
-        }
-        
-        # Create sample_docs folder if it doesn't exist
-        os.makedirs("sample_docs", exist_ok=True)
-        
-        # Save and process each document
-        for doc_id, content in sample_docs.items():
-            file_path = f"sample_docs/{doc_id}.txt"
-            with open(file_path, 'w') as f:
-                f.write(content)
-            
-            self.process_text_file(file_path, doc_id)
-        
-        # Print statistics
-        stats = self.vector_store.get_stats()
-        print(f"Vector store now contains {stats['total_documents']} document chunks")
-    
-    def get_vector_store_stats(self):
-        """Get vector store statistics"""
-        return self.vector_store.get_stats()
-    
-    def clear_all_documents(self):
-        """Clear all documents from vector store"""
-        self.vector_store.clear()
+import os
+import re
+import bisect
+import hashlib
+import importlib
+import mimetypes
+import zipfile
+from pathlib import Path
+from local_vector_store import LocalVectorStore
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TEXT_BLOCK_SIZE = 65536
+
+# Topic of a chunk or question; stored with each chunk so searches can be scoped to it
+CATEGORY_KEYWORDS = {
+    'hr_policy': ['vacation', 'leave', 'benefits', 'policy', 'hr'],
+    'it_support': ['password', 'login', 'computer', 'software', 'it', 'technical'],
+    'finance': ['expense', 'reimburse', 'budget', 'cost', 'payment'],
+}
+
+
+def iter_text_pages(file_path):
+    """Yield a text file in blocks (no page numbers)"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for block in iter(lambda: f.read(TEXT_BLOCK_SIZE), ""):
+            yield None, block
+
+
+def iter_pdf_pages(file_path):
+    """Yield (page number, text) for each page of a PDF"""
+    import PyPDF2
+    reader = PyPDF2.PdfReader(file_path)
+    for page_number, page in enumerate(reader.pages, start=1):
+        yield page_number, (page.extract_text() or "") + "\n"
+
+
+def iter_docx_pages(file_path):
+    """Yield (page number, text) for each paragraph of a DOCX, counting explicit page breaks"""
+    import docx
+    document = docx.Document(file_path)
+    page_number = 1
+    for paragraph in document.paragraphs:
+        yield page_number, paragraph.text + "\n"
+        page_number += len(paragraph._p.xpath('.//w:br[@w:type="page"]'))
+
+
+def iter_csv_pages(file_path):
+    """Yield a text summary of a CSV file"""
+    import pandas as pd
+    df = pd.read_csv(file_path)
+    text = f"CSV Data from {os.path.basename(file_path)}:\n\n"
+    text += f"Columns: {', '.join(df.columns)}\n\n"
+    text += f"Total rows: {len(df)}\n\n"
+    text += "Sample data:\n"
+    text += df.head(10).to_string(index=False)
+
+    numeric_cols = df.select_dtypes(include=['number']).columns
+    if len(numeric_cols) > 0:
+        text += "\n\nSummary Statistics:\n"
+        text += df[numeric_cols].describe().to_string()
+    yield None, text
+
+
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Page iterator for each file type. An iterator can be given as "module:function"
+# so a parser is only imported once a file of that type shows up.
+EXTRACTORS = {
+    'txt': {'extensions': ['.txt'], 'mime_types': ['text/plain'], 'iter_pages': iter_text_pages},
+    'pdf': {'extensions': ['.pdf'], 'mime_types': ['application/pdf'], 'iter_pages': iter_pdf_pages},
+    'docx': {'extensions': ['.docx'], 'mime_types': [DOCX_MIME_TYPE], 'iter_pages': iter_docx_pages},
+    'csv': {'extensions': ['.csv'], 'mime_types': ['text/csv', 'application/csv'], 'iter_pages': iter_csv_pages},
+}
+
+
+def register_extractor(file_type, iter_pages, extensions=(), mime_types=()):
+    """Add or replace the page iterator used for a file type"""
+    EXTRACTORS[file_type] = {
+        'extensions': [extension.lower() for extension in extensions],
+        'mime_types': list(mime_types),
+        'iter_pages': iter_pages
+    }
+
+
+def sniff_mime_type(file_path):
+    """MIME type from the file's content: python-magic if available, else magic bytes"""
+    try:
+        import magic
+        return magic.from_file(file_path, mime=True)
+    except Exception:
+        pass  # python-magic or libmagic not installed
+
+    with open(file_path, 'rb') as f:
+        header = f.read(8)
+    if header.startswith(b'%PDF'):
+        return 'application/pdf'
+    if header.startswith(b'PK\x03\x04'):
+        # DOCX files are zip archives with a word/ folder
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                if 'word/document.xml' in archive.namelist():
+                    return DOCX_MIME_TYPE
+        except zipfile.BadZipFile:
+            pass
+        return 'application/zip'
+    return None
+
+
+def detect_file_type(file_path):
+    """Detect file type using multiple methods"""
+    # Try content-based MIME detection, then the file name
+    mime_type = sniff_mime_type(file_path) or mimetypes.guess_type(file_path)[0]
+    
+    # Fallback to file extension
+    extension = Path(file_path).suffix.lower()
+    
+    return mime_type, extension
+
+
+def get_file_type(file_path):
+    """Name of the EXTRACTORS entry that handles a file (None if unsupported)"""
+    mime_type, extension = detect_file_type(file_path)
+
+    # Binary formats are recognised by content, text formats (which sniff as text/plain) by extension
+    if mime_type and not mime_type.startswith('text/'):
+        for file_type, extractor in EXTRACTORS.items():
+            if mime_type in extractor['mime_types']:
+                return file_type
+    for file_type, extractor in EXTRACTORS.items():
+        if extension in extractor['extensions']:
+            return file_type
+    if mime_type and mime_type.startswith('text/') and 'txt' in EXTRACTORS:
+        return 'txt'  # other plain-text formats (markdown, logs, ...)
+    return None
+
+
+def get_extractor(file_type):
+    """Page iterator for a file type, importing it on first use"""
+    iter_pages = EXTRACTORS[file_type]['iter_pages']
+    if isinstance(iter_pages, str):
+        module_name, function_name = iter_pages.split(':')
+        iter_pages = getattr(importlib.import_module(module_name), function_name)
+        EXTRACTORS[file_type]['iter_pages'] = iter_pages
+    return iter_pages
+
+
+def iter_pages(file_path):
+    """Stream (page number, text) pieces of a supported file"""
+    file_type = get_file_type(file_path)
+    if file_type is None:
+        raise ValueError(f"Unsupported file type: {Path(file_path).suffix.lower()}")
+    return get_extractor(file_type)(file_path)
+
+
+def iter_chunks(pages, text_splitter, flush_size=4000):
+    """Split a stream of (page number, text) pieces into (chunk, page number) pairs
+
+    Only the unsplit tail of the text is buffered, so memory depends on the page
+    size rather than the document size. A chunk gets the page it starts on.
+    """
+    buffer = ""
+    offsets, page_numbers = [], []  # where each page starts in the buffer
+
+    def page_at(position):
+        return page_numbers[max(0, bisect.bisect_right(offsets, position) - 1)]
+
+    def split(final):
+        nonlocal buffer, offsets, page_numbers
+        chunks = text_splitter.split_text(buffer)
+        emit = chunks if final else chunks[:-1]
+        cursor = 0
+        for chunk in emit:
+            start = buffer.find(chunk, cursor)
+            start = cursor if start == -1 else start
+            yield chunk, page_at(start)
+            cursor = start + 1
+        if final or not chunks:
+            return
+
+        # Keep the last chunk, the next page may continue it
+        tail = buffer.find(chunks[-1], cursor)
+        tail = cursor if tail == -1 else tail
+        first = max(0, bisect.bisect_right(offsets, tail) - 1)
+        offsets = [0] + [offset - tail for offset in offsets[first + 1:]]
+        page_numbers = page_numbers[first:]
+        buffer = buffer[tail:]
+
+    for page_number, text in pages:
+        offsets.append(len(buffer))
+        page_numbers.append(page_number)
+        buffer += text
+        if len(buffer) >= flush_size:
+            yield from split(final=False)
+
+    if buffer.strip():
+        yield from split(final=True)
+
+
+def categorize_text(text):
+    """Category whose keywords occur most often in text, or 'general'
+
+    Keywords match whole words, or word prefixes for keywords longer than three
+    letters ('expense' matches 'expenses', but 'it' doesn't match 'submit').
+    """
+    counts = dict.fromkeys(CATEGORY_KEYWORDS, 0)
+    for word in re.findall(r"[a-z]+", text.lower()):
+        for category, keywords in CATEGORY_KEYWORDS.items():
+            if any(word == keyword or (len(keyword) > 3 and word.startswith(keyword)) for keyword in keywords):
+                counts[category] += 1
+    category = max(counts, key=counts.get)
+    return category if counts[category] else 'general'
+
+
+def make_text_splitter(chunk_size=1000, chunk_overlap=200):
+    """Character text splitter (langchain is only imported when one is needed)"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
+
+
+def chunk_file(file_path, document_id, text_splitter):
+    """Stream a file into chunks, returning (texts, metadatas, document hash, characters)"""
+    # Hash the extracted text while it streams past
+    hasher = hashlib.sha256()
+    characters = 0
+
+    def hashed(pages):
+        nonlocal characters
+        for page_number, text in pages:
+            hasher.update(text.encode('utf-8'))
+            characters += len(text)
+            yield page_number, text
+
+    texts, metadatas = [], []
+    for chunk, page_number in iter_chunks(hashed(iter_pages(file_path)), text_splitter):
+        metadata = {
+            "document_id": document_id,
+            "chunk_index": len(texts),
+            "source": file_path,
+            "category": categorize_text(chunk)
+        }
+        if page_number is not None:
+            metadata["page"] = page_number
+        texts.append(chunk)
+        metadatas.append(metadata)
+    return texts, metadatas, hasher.hexdigest(), characters
+
+
+class DocumentProcessor:
+    def __init__(self, vector_store=None):
+        # Initialize local vector store (pass one in to share it with a QueryEngine)
+        if vector_store is None:
+            print("Initializing local vector store...")
+            vector_store = LocalVectorStore()
+            print("Vector store ready!")
+        self.vector_store = vector_store
+        
+        # Text splitter is created on first use
+        self.splitter = None
+    
+    @property
+    def text_splitter(self):
+        if self.splitter is None:
+            self.splitter = make_text_splitter(chunk_size=1000, chunk_overlap=200)
+        return self.splitter
+
+    @property
+    def embedding_model(self):
+        """Same shared embedding model the vector store uses"""
+        return self.vector_store.embeddings_model
+
+    def process_file(self, file_path, document_id, flush=True, replace=False):
+        """Stream a file through extraction and chunking and add it to the vector database
+
+        Use flush=False when ingesting many files and checkpoint the store once at the end.
+        Re-ingesting a document only embeds chunks that changed, and an unchanged file is
+        skipped. With replace=True all of the document's chunks are re-embedded and swapped in.
+        """
+        try:
+            texts, metadatas, document_hash, characters = chunk_file(file_path, document_id, self.text_splitter)
+
+            if not texts:
+                print(f"No text could be extracted from {file_path}")
+                return False
+            print(f"Split document into {len(texts)} chunks ({characters:,} characters)")
+
+            # Add to vector store
+            try:
+                if replace:
+                    added = self.vector_store.replace_document(document_id, texts, metadatas,
+                                                               document_hash=document_hash)
+                    if not added:
+                        return False
+                else:
+                    self.vector_store.upsert_document(document_id, texts, metadatas,
+                                                      document_hash=document_hash, flush=flush)
+            except Exception as e:
+                print(f"Error adding documents to vector store: {str(e)}")
+                return False
+
+            print(f"Successfully processed {file_path}")
+            return True
+            
+        except Exception as e:
+            print(f"Error processing {file_path}: {str(e)}")
+            return False
+
+    def process_text_file(self, file_path, document_id, flush=True, replace=False):
+        """Process a text file and add to vector database"""
+        return self.process_file(file_path, document_id, flush=flush, replace=replace)
+
+    def process_pdf_file(self, file_path, document_id, flush=True, replace=False):
+        """Process a PDF page by page and add to vector database"""
+        return self.process_file(file_path, document_id, flush=flush, replace=replace)
+
+    def process_docx_file(self, file_path, document_id, flush=True, replace=False):
+        """Process a Word document and add to vector database"""
+        return self.process_file(file_path, document_id, flush=flush, replace=replace)
+
+    def process_csv_file(self, file_path, document_id, flush=True, replace=False):
+        """Process a CSV file (as a text summary) and add to vector database"""
+        return self.process_file(file_path, document_id, flush=flush, replace=replace)
+
+    def detect_file_type(self, file_path):
+        """Detect file type using multiple methods"""
+        return detect_file_type(file_path)
+
+    def process_any_file(self, file_path, document_id, flush=True, replace=False):
+        """Process any supported file type"""
+        file_type = get_file_type(file_path)
+        if file_type is None:
+            print(f"Unsupported file type: {Path(file_path).suffix.lower()}")
+            return False
+
+        # Formats added with register_extractor() go straight to process_file
+        handler = getattr(self, f"process_{'text' if file_type == 'txt' else file_type}_file", self.process_file)
+        return handler(file_path, document_id, flush=flush, replace=replace)
+
+    def get_chunking_strategy(self, document_type):
+        """Get optimal chunking strategy based on document type"""
+        strategies = {
+            'policy': {'chunk_size': 1500, 'chunk_overlap': 300},
+            'handbook': {'chunk_size': 2000, 'chunk_overlap': 400},
+            'csv_data': {'chunk_size': 800, 'chunk_overlap': 100},
+            'default': {'chunk_size': 1000, 'chunk_overlap': 200}
+        }
+        return make_text_splitter(**strategies.get(document_type, strategies['default']))
+    
+    def add_sample_documents(self):
+        """Add some sample company documents"""
+        sample_docs = {
+            "vacation_policy": """
+            Company Vacation Policy
+            
+            All full-time employees are entitled to 15 days of paid vacation per year.
+            Vacation days accrue at a rate of 1.25 days per month.
+            Employees must request vacation at least 2 weeks in advance.
+            Vacation requests should be submitted through the HR portal.
+            Unused vacation days cannot be carried over to the next year.
+            Maximum vacation that can be taken at once is 10 consecutive days.
+            Part-time employees receive prorated vacation based on hours worked.
+            """,
+            
+            "expense_policy": """
+            Expense Reimbursement Policy
+            
+            Employees can be reimbursed for business-related expenses.
+            All expenses must be submitted within 30 days with receipts.
+            Meals are reimbursed up to $50 per day during business travel.
+            Transportation costs for business trips are fully covered.
+            Hotel accommodation is covered up to $200 per night.
+            Submit expense reports through the finance portal at finance.company.com.
+            Approval from manager required for expenses over $500.
+            Personal expenses will not be reimbursed under any circumstances.
+            """,
+            
+            "it_support": """
+            IT Support Guidelines
+            
+            For technical issues, contact IT support at it-help@company.com
+            For urgent issues, call the IT hotline: (555) 123-4567
+            Common issues can be resolved through the self-service portal.
+            New equipment requests should be submitted through IT portal.
+            Software installation requires IT approval for security reasons.
+            Password resets can be done through the company portal.
+            VPN access is required for remote work - contact IT for setup.
+            Regular security training is mandatory for all employees.
+            """,
+            
+            "remote_work": """
+            Remote Work Policy
+            
+            Employees can work remotely up to 3 days per week.
+            Remote work must be pre-approved by direct manager.
+            All remote workers must have reliable internet connection.
+            Company will provide necessary equipment for home office setup.
+            Remote workers must be available during core hours 10am-3pm EST.
+            Monthly in-person team meetings are required.
+            Productivity metrics will be tracked for remote workers.
+            Remote work privileges can be revoked for performance issues.
+            """
+        }
+        
+        # Create sample_docs folder if it doesn't exist
+        os.makedirs("sample_docs", exist_ok=True)
+        
+        # Save and process each document
+        for doc_id, content in sample_docs.items():
+            file_path = f"sample_docs/{doc_id}.txt"
+            with open(file_path, 'w') as f:
+                f.write(content)
+            
+            self.process_text_file(file_path, doc_id, flush=False)
+
+        # Write everything to disk once
+        self.vector_store.checkpoint()
+        
+        # Print statistics
+        stats = self.vector_store.get_stats()
+        print(f"Vector store now contains {stats['total_documents']} document chunks")
+    
+    def get_vector_store_stats(self):
+        """Get vector store statistics"""
+        return self.vector_store.get_stats()
+    
+    def delete_document(self, document_id):
+        """Remove a document's chunks from the vector store"""
+        return self.vector_store.delete_document(document_id)
+
+    def clear_all_documents(self):
+        """Clear all documents from vector store"""
+        self.vector_store.clear()
@@ -0,0 +1,106 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB,
+    last_used REAL
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used);
+"""
+
+
+class EmbeddingCache:
+    """Disk-backed LRU cache of embeddings keyed by (model name, text hash)
+
+    Vectors are stored as float16 blobs in SQLite. Once more than max_entries
+    vectors are cached, the least recently used ones are evicted.
+    """
+
+    def __init__(self, db_file, max_entries=100000):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock:
+            self.conn.executescript(SCHEMA)
+            self.count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model_name, text):
+        return model_name + ":" + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def __len__(self):
+        return self.count
+
+    def get_many(self, model_name, texts):
+        """Return {position: float32 vector} for every text that is cached"""
+        keys = [self.make_key(model_name, text) for text in texts]
+        found = {}
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            unique_keys = list(set(keys))
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+
+            # Mark hits as recently used
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", ((now, key) for key in found)
+                )
+                self.conn.commit()
+
+            hits = {position: np.frombuffer(found[key], dtype='float16').astype('float32')
+                    for position, key in enumerate(keys) if key in found}
+            self.hits += len(hits)
+            self.misses += len(keys) - len(hits)
+        return hits
+
+    def put_many(self, model_name, texts, vectors):
+        """Cache one vector per text, evicting the least recently used entries past max_entries"""
+        now = time.time()
+        rows = [(self.make_key(model_name, text), np.asarray(vector, dtype='float16').tobytes(), now)
+                for text, vector in zip(texts, vectors)]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self.count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if self.count > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (self.count - self.max_entries,)
+                )
+                self.count = self.max_entries
+            self.conn.commit()
+
+    def get_stats(self):
+        """Hit/miss counters and size of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': self.count,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def clear(self):
+        """Drop every cached embedding"""
+        with self.lock:
+            self.conn.execute("DELETE FROM embeddings")
+            self.conn.commit()
+            self.count = 0
@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchStreamer:
+    """Streamer for model.generate() that splits a batch into per-request text queues
+
+    Works like TextIteratorStreamer, but for every row of the batch: the row's new
+    tokens are decoded as they arrive and finished words are put on its queue.
+    Rows whose queue is None (callers of generate()) are skipped. Each queue ends
+    with None, or with the exception that stopped the batch.
+    """
+
+    def __init__(self, tokenizer, queues):
+        self.tokenizer = tokenizer
+        self.queues = queues
+        self.tokens = [[] for _ in queues]
+        self.sent = [0] * len(queues)  # characters of each row's text already queued
+        self.prompt_seen = False
+        self.ended = False
+
+    def put(self, value):
+        # The first call carries the prompts, the rest one new token per row
+        if not self.prompt_seen:
+            self.prompt_seen = True
+            return
+        for row, token in enumerate(value.reshape(len(self.queues), -1).tolist()):
+            if self.queues[row] is not None:
+                self.tokens[row].extend(token)
+                self.send(row, final=False)
+
+    def send(self, row, final):
+        text = self.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+        # Hold back a word that may still be growing (like TextIteratorStreamer)
+        end = len(text) if final or text.endswith("\n") else text.rfind(" ") + 1
+        if end > self.sent[row]:
+            self.queues[row].put(text[self.sent[row]:end])
+            self.sent[row] = end
+
+    def end(self):
+        if self.ended:
+            return
+        self.ended = True
+        for row, pieces in enumerate(self.queues):
+            if pieces is not None:
+                self.send(row, final=True)
+                pieces.put(None)
+
+    def fail(self, error):
+        if self.ended:
+            return
+        self.ended = True
+        for pieces in self.queues:
+            if pieces is not None:
+                pieces.put(error)
+
+
+class GenerationScheduler:
+    """Batch generate() calls from concurrent callers into one padded batch
+
+    A background thread takes the first waiting prompt, collects whatever else
+    arrives within max_wait_ms (up to max_batch_size prompts), runs a single
+    model.generate() and hands every caller its own answer. Callers of stream()
+    share the same batches and receive their text while it is generated.
+    """
+
+    def __init__(self, model, tokenizer, max_batch_size=8, max_wait_ms=20, max_input_length=1024,
+                 **generate_kwargs):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_input_length = max_input_length
+        self.generate_kwargs = generate_kwargs
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.prompts = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def generate(self, prompt, max_new_tokens=100, timeout=None):
+        """Generate a continuation of prompt (blocks until its batch has run)"""
+        future = Future()
+        self.requests.put((prompt, max_new_tokens, future))
+        return future.result(timeout=timeout)
+
+    def stream(self, prompt, max_new_tokens=100, timeout=None):
+        """Yield the continuation of prompt in pieces as its batch generates it
+
+        timeout limits the wait for each piece, not the whole answer.
+        """
+        pieces = queue.Queue()
+        self.requests.put((prompt, max_new_tokens, pieces))
+        while True:
+            try:
+                piece = pieces.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError("Generation timed out")
+            if piece is None:
+                return
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+
+    def run(self):
+        while True:
+            batch = [self.requests.get()]
+
+            # Wait a little for other callers to join this batch
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Each request waits on a Future (generate) or a queue of pieces (stream)
+            streams = [sink if isinstance(sink, queue.Queue) else None for _, _, sink in batch]
+            streamer = BatchStreamer(self.tokenizer, streams) if any(streams) else None
+            try:
+                answers = self.generate_batch([prompt for prompt, _, _ in batch],
+                                              max(tokens for _, tokens, _ in batch), streamer=streamer)
+            except Exception as e:
+                if streamer is not None:
+                    streamer.fail(e)
+                for _, _, sink in batch:
+                    if isinstance(sink, Future):
+                        sink.set_exception(e)
+                continue
+            if streamer is not None:
+                streamer.end()  # in case generate() didn't
+            for (_, _, sink), answer in zip(batch, answers):
+                if isinstance(sink, Future):
+                    sink.set_result(answer)
+
+    def generate_batch(self, prompts, max_new_tokens, streamer=None):
+        """Run one generate() over several prompts and decode only the new tokens"""
+        import torch
+
+        # Decoder-only models continue from the right, so pad on the left
+        padding_side = self.tokenizer.padding_side
+        self.tokenizer.padding_side = "left"
+        try:
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True,
+                                    max_length=self.max_input_length)
+        finally:
+            self.tokenizer.padding_side = padding_side
+
+        with torch.no_grad():
+            outputs = self.model.generate(
+                inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                max_new_tokens=max_new_tokens,
+                pad_token_id=self.tokenizer.pad_token_id,
+                streamer=streamer,
+                **self.generate_kwargs
+            )
+
+        self.batches += 1
+        self.prompts += len(prompts)
+        prompt_length = inputs["input_ids"].shape[1]
+        return [self.tokenizer.decode(output[prompt_length:], skip_special_tokens=True).strip()
+                for output in outputs]
+
+    def get_stats(self):
+        """Number of batches run and average batch size"""
+        return {
+            'batches': self.batches,
+            'prompts': self.prompts,
+            'average_batch_size': round(self.prompts / self.batches, 2) if self.batches else 0.0,
+            'queued': self.requests.qsize()
+        }
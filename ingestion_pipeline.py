@@ -0,0 +1,262 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from document_processor import chunk_file, make_text_splitter
+
+
+def load_and_chunk(file_path, document_id, chunk_size=1000, chunk_overlap=200):
+    """Extract and split one file (runs in a worker process)"""
+    splitter = make_text_splitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    texts, metadatas, document_hash, characters = chunk_file(file_path, document_id, splitter)
+    if not texts:
+        raise ValueError("Could not extract text from the file or file is empty")
+    return {
+        'file_path': file_path,
+        'document_id': document_id,
+        'document_hash': document_hash,
+        'texts': texts,
+        'metadatas': metadatas,
+        'characters': characters
+    }
+
+
+class IngestionPipeline:
+    """Ingest many files at once: extract/chunk -> embed -> write
+
+    A process pool extracts and chunks files in parallel, one thread embeds chunks of
+    several files per batch and a single writer thread adds them to the vector store.
+    Stages are connected by bounded queues so a slow stage holds back the ones before it.
+
+    progress_callback(event) is called on the thread that runs run(), with event a dict
+    holding 'file_path', 'document_id', 'status' ('chunked', 'embedded', 'written',
+    'skipped', 'cancelled' or 'failed'), 'completed' and 'total', plus 'chunks' or
+    'error'; 'written' events also carry 'embedded', the chunks that were new.
+    A file that fails only fails its own event; if a stage itself breaks, run()
+    stops, writes what was done and raises its error. Written files are only on
+    disk once run() returns.
+
+    cancelled(document_id), if given, is asked just before a file is written; a
+    True answer drops the file.
+    """
+
+    def __init__(self, vector_store, num_workers=None, embed_batch_size=256, queue_size=8,
+                 chunk_size=1000, chunk_overlap=200, progress_callback=None, cancelled=None):
+        self.vector_store = vector_store
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.embed_batch_size = embed_batch_size
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.progress_callback = progress_callback
+        self.cancelled = cancelled
+
+    def run(self, files):
+        """Ingest files, a list of (file_path, document_id), and return a summary dict"""
+        files = list(files)
+        start = time.time()
+        chunk_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        events = queue.Queue()
+        summary = {'total': len(files), 'written': 0, 'skipped': 0, 'cancelled': 0, 'failed': 0, 'chunks': 0}
+        errors = []
+
+        def run_stage(stage, *args):
+            try:
+                stage(*args)
+            except Exception as e:
+                print(f"❌ Ingestion stage {stage.__name__} failed: {str(e)}")
+                errors.append(e)
+
+        embedder = threading.Thread(target=run_stage, args=(self.embed_stage, chunk_queue, write_queue, events),
+                                    daemon=True)
+        writer = threading.Thread(target=run_stage, args=(self.write_stage, write_queue, events), daemon=True)
+        embedder.start()
+        writer.start()
+
+        def report():
+            # Deliver events from the worker threads on this thread
+            while True:
+                try:
+                    event = events.get_nowait()
+                except queue.Empty:
+                    return
+                if event['status'] in ('written', 'skipped', 'cancelled', 'failed'):
+                    summary[event['status']] += 1
+                if event['status'] == 'written':
+                    summary['chunks'] += event['chunks']
+                event['completed'] = (summary['written'] + summary['skipped'] + summary['cancelled']
+                                      + summary['failed'])
+                event['total'] = len(files)
+                if self.progress_callback:
+                    self.progress_callback(event)
+
+        def put(item):
+            # Block while the embedder is behind, but keep reporting progress
+            while embedder.is_alive():
+                try:
+                    chunk_queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    report()
+            if item is not None:
+                events.put({'file_path': item['file_path'], 'document_id': item['document_id'],
+                            'status': 'failed', 'error': "Embedding stage stopped"})
+
+        waiting = deque(files)
+        in_flight = {}
+        with ProcessPoolExecutor(max_workers=self.num_workers) as pool:
+            while (waiting or in_flight) and not errors:
+                # Don't let the pool run too far ahead of the embedder
+                while waiting and len(in_flight) < 2 * self.num_workers:
+                    file_path, document_id = waiting.popleft()
+                    future = pool.submit(load_and_chunk, file_path, document_id,
+                                         self.chunk_size, self.chunk_overlap)
+                    in_flight[future] = (file_path, document_id)
+
+                done, _ = wait(in_flight, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, document_id = in_flight.pop(future)
+                    try:
+                        document = future.result()
+                    except Exception as e:
+                        events.put({'file_path': file_path, 'document_id': document_id,
+                                    'status': 'failed', 'error': str(e)})
+                        continue
+                    events.put({'file_path': file_path, 'document_id': document_id,
+                                'status': 'chunked', 'chunks': len(document['texts'])})
+                    put(document)
+                report()
+
+        put(None)
+        while embedder.is_alive() or writer.is_alive():
+            writer.join(timeout=0.1)
+            report()
+
+        # Everything was added with flush=False; write it as one segment
+        self.vector_store.flush()
+        report()
+        if errors:
+            raise errors[0]
+
+        summary['seconds'] = round(time.time() - start, 2)
+        print(f"📦 Ingested {summary['written']} files ({summary['chunks']} chunks), "
+              f"{summary['skipped']} unchanged, {summary['cancelled']} cancelled, "
+              f"{summary['failed']} failed in {summary['seconds']}s")
+        return summary
+
+    def embed_stage(self, chunk_queue, write_queue, events):
+        """Embed the chunks of several documents per encode call
+
+        The writer's sentinel is sent however this ends, so it never waits forever.
+        """
+        try:
+            batch = []
+            batch_texts = 0
+            finished = False
+            while not finished:
+                # Wait for the next document, then take whatever else is ready
+                item = chunk_queue.get()
+                while True:
+                    if item is None:
+                        finished = True
+                        break
+                    try:
+                        unchanged = self.vector_store.get_document_hash(item['document_id']) == item['document_hash']
+                    except Exception as e:
+                        events.put({'file_path': item['file_path'], 'document_id': item['document_id'],
+                                    'status': 'failed', 'error': str(e)})
+                    else:
+                        if unchanged:
+                            events.put({'file_path': item['file_path'], 'document_id': item['document_id'],
+                                        'status': 'skipped', 'chunks': len(item['texts'])})
+                        else:
+                            batch.append(item)
+                            batch_texts += len(item['texts'])
+                    if batch_texts >= self.embed_batch_size:
+                        break
+                    try:
+                        item = chunk_queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    self.embed_batch(batch, write_queue, events)
+                    batch = []
+                    batch_texts = 0
+        finally:
+            write_queue.put(None)
+
+    def embed_batch(self, batch, write_queue, events):
+        texts = [text for document in batch for text in document['texts']]
+        try:
+            embeddings = self.vector_store.embed_texts(texts)
+        except Exception as e:
+            for document in batch:
+                events.put({'file_path': document['file_path'], 'document_id': document['document_id'],
+                            'status': 'failed', 'error': str(e)})
+            return
+
+        offset = 0
+        for document in batch:
+            count = len(document['texts'])
+            document['embeddings'] = embeddings[offset:offset + count]
+            offset += count
+            events.put({'file_path': document['file_path'], 'document_id': document['document_id'],
+                        'status': 'embedded', 'chunks': count})
+            write_queue.put(document)
+
+    def write_stage(self, write_queue, events):
+        """Single writer: add embedded documents to the vector store one at a time"""
+        while True:
+            document = write_queue.get()
+            if document is None:
+                return
+            event = {'file_path': document['file_path'], 'document_id': document['document_id'],
+                     'chunks': len(document['texts'])}
+            try:
+                if self.cancelled is not None and self.cancelled(document['document_id']):
+                    event.update(status='cancelled')
+                    events.put(event)
+                    continue
+                embedded = self.vector_store.upsert_document(
+                    document['document_id'], document['texts'], document['metadatas'],
+                    document_hash=document['document_hash'], embeddings=document['embeddings'],
+                    flush=False
+                )
+                if embedded is None:
+                    event.update(status='skipped')  # written by someone else meanwhile
+                else:
+                    event.update(status='written', embedded=embedded, characters=document['characters'])
+            except Exception as e:
+                event.update(status='failed', error=str(e))
+            events.put(event)
+
+
+if __name__ == "__main__":
+    import argparse
+    from pathlib import Path
+    from document_processor import get_file_type
+    from local_vector_store import LocalVectorStore
+
+    parser = argparse.ArgumentParser(description="Ingest every supported file under a folder")
+    parser.add_argument("folder")
+    parser.add_argument("--store", default="vector_store", help="Vector store directory")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    paths = sorted(str(path) for path in Path(args.folder).rglob("*") if path.is_file())
+    # Documents are named by their path under the folder, so a.pdf and a.txt stay apart
+    files = [(path, os.path.relpath(path, args.folder)) for path in paths if get_file_type(path)]
+    print(f"Found {len(files)} supported files in {args.folder}")
+
+    def print_progress(event):
+        if event['status'] in ('written', 'skipped', 'failed'):
+            print(f"[{event['completed']}/{event['total']}] {event['status']}: {event['file_path']}"
+                  + (f" ({event['error']})" if event['status'] == 'failed' else ""))
+
+    IngestionPipeline(LocalVectorStore(store_path=args.store), num_workers=args.workers,
+                      progress_callback=print_progress).run(files)
+    print("✅ Done")
@@ -0,0 +1,557 @@
+# job_queue.py - Durable ingestion jobs and the worker process that runs them
+#
+# The worker is the only process that writes the vector store: uploads, sample
+# documents, deletes and clears are all queued as jobs. Uploads queued together
+# run as one IngestionPipeline batch.
+#
+# Usage:
+#   python job_queue.py --store vector_store --threads 2 --workers 2   # run a worker
+
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from ingestion_pipeline import IngestionPipeline
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL DEFAULT 'ingest',
+    file_path TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    not_before REAL NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker_pid INTEGER,
+    error TEXT,
+    chunks INTEGER,
+    embedded INTEGER,
+    created REAL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+CREATE TABLE IF NOT EXISTS workers (
+    name TEXT PRIMARY KEY,
+    pid INTEGER,
+    started REAL
+);
+"""
+
+# queued -> running -> done | failed | cancelled; failed runs are queued again until max_attempts
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+# Progress of a running upload, from the pipeline's events: chunked -> embedded -> written
+STAGES = ("chunked", "embedded", "written")
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+# ingest: chunk and upsert file_path; samples: add the sample documents;
+# delete: remove document_id; clear: remove everything
+JOB_KINDS = ("ingest", "samples", "delete", "clear")
+
+JOB_COLUMNS = ("id", "kind", "file_path", "document_id", "status", "stage", "attempts", "max_attempts", "error",
+               "chunks", "embedded", "created", "started", "finished")
+
+
+def job_event(job):
+    """The IngestionPipeline progress event an upload job's state stands for (None while queued)"""
+    event = {'file_path': job['file_path'], 'document_id': job['document_id']}
+    if job['status'] == 'done' and job['embedded'] is None:
+        event.update(status='skipped', chunks=job['chunks'])
+    elif job['status'] == 'done':
+        event.update(status='written', chunks=job['chunks'], embedded=job['embedded'])
+    elif job['status'] == 'cancelled':
+        event.update(status='cancelled')
+    elif job['status'] == 'failed':
+        event.update(status='failed', error=job['error'] or "Job failed")
+    elif job['status'] == 'running' and job['stage'] in ('chunked', 'embedded'):
+        event.update(status=job['stage'])
+    else:
+        return None
+    return event
+
+
+def pid_alive(pid):
+    """Check whether a process with this pid is still running"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Ingestion jobs in SQLite, so they survive the UI (or the worker) going away
+
+    Any process can submit jobs and poll them; a single worker process claims
+    them in queue order, uploads several at a time. Failed jobs are retried with
+    exponential backoff up to max_attempts times.
+    """
+
+    def __init__(self, db_file, retry_backoff=5.0):
+        self.db_file = db_file
+        self.retry_backoff = retry_backoff  # seconds before the first retry, doubled after each
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.lock = threading.RLock()
+        # Autocommit, so claim() can take the write lock up front with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None, timeout=30)
+        with self.lock:
+            self.conn.executescript(SCHEMA)
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+            if "kind" not in columns:
+                # Queues created before jobs had kinds only held uploads
+                self.conn.execute("ALTER TABLE jobs ADD COLUMN kind TEXT NOT NULL DEFAULT 'ingest'")
+            if "stage" not in columns:
+                self.conn.execute("ALTER TABLE jobs ADD COLUMN stage TEXT")
+
+    def row_to_job(self, row):
+        return dict(zip(JOB_COLUMNS, row)) if row else None
+
+    def submit(self, file_path, document_id, max_attempts=3, kind="ingest"):
+        """Queue a file for ingestion (or another kind of job) and return the job id"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'. Choose one of {JOB_KINDS}")
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (kind, file_path, document_id, status, max_attempts, created) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (kind, file_path, document_id, max_attempts, time.time())
+            )
+            return cursor.lastrowid
+
+    def submit_samples(self):
+        return self.submit("", "", max_attempts=1, kind="samples")
+
+    def submit_delete(self, document_id):
+        return self.submit("", document_id, max_attempts=1, kind="delete")
+
+    def submit_clear(self):
+        return self.submit("", "", max_attempts=1, kind="clear")
+
+    def wait(self, job_id, timeout=None, poll_interval=0.2):
+        """Block until a job is done, failed or cancelled and return it
+
+        Returns the job as it is if timeout seconds pass first.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return job
+            if deadline is not None and time.time() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.row_to_job(row)
+
+    def list_jobs(self, limit=20, status=None):
+        """Most recent jobs first"""
+        query = f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [self.row_to_job(row) for row in rows]
+
+    def claim(self, worker_pid=None):
+        """Mark the oldest runnable job as running and return it (None if there is none)"""
+        jobs = self.claim_batch(1, worker_pid)
+        return jobs[0] if jobs else None
+
+    def claim_batch(self, max_jobs=16, worker_pid=None):
+        """Mark the oldest runnable job as running, plus the uploads queued right behind it
+        if it is an upload, and return them oldest first ([] if there is nothing to run)
+
+        The batch stops at the first job of another kind, so a delete or clear still
+        runs after the uploads queued before it, and at a second upload of a document
+        already in the batch, so the later upload is the one that sticks.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT id, kind, document_id FROM jobs WHERE status = 'queued' AND not_before <= ? "
+                    "ORDER BY id LIMIT ?", (now, max_jobs)
+                ).fetchall()
+                job_ids = []
+                documents = set()
+                for job_id, kind, document_id in rows:
+                    if job_ids and (kind != "ingest" or rows[0][1] != "ingest" or document_id in documents):
+                        break
+                    job_ids.append(job_id)
+                    documents.add(document_id)
+                for job_id in job_ids:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'running', stage = NULL, attempts = attempts + 1, started = ?, "
+                        "finished = NULL, worker_pid = ? WHERE id = ?", (now, worker_pid or os.getpid(), job_id)
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [self.get(job_id) for job_id in job_ids]
+
+    def set_stage(self, job_id, stage):
+        """Record how far a running upload got (one of STAGES)"""
+        with self.lock:
+            self.conn.execute("UPDATE jobs SET stage = ? WHERE id = ? AND status = 'running'", (stage, job_id))
+
+    def complete(self, job_id, chunks=None, embedded=None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'done', error = NULL, chunks = ?, embedded = ?, finished = ? WHERE id = ?",
+                (chunks, embedded, time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        """Record a failed attempt; the job is queued again unless it is out of attempts"""
+        now = time.time()
+        with self.lock:
+            attempts, max_attempts = self.conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if attempts < max_attempts:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, not_before = ? WHERE id = ?",
+                    (error, now + self.retry_backoff * 2 ** (attempts - 1), job_id)
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished = ? WHERE id = ?", (error, now, job_id)
+                )
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or ask the worker to drop a running one before it is written
+
+        Returns False if the job already finished.
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            if cursor.rowcount:
+                return True
+            cursor = self.conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,)
+            )
+            return bool(cursor.rowcount)
+
+    def cancel_requested(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_cancelled(self, job_id):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ?", (time.time(), job_id)
+            )
+
+    def retry(self, job_id):
+        """Queue a failed or cancelled job again with a fresh set of attempts"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, not_before = 0, cancel_requested = 0, "
+                "error = NULL, finished = NULL WHERE id = ? AND status IN ('failed', 'cancelled')", (job_id,)
+            )
+            return bool(cursor.rowcount)
+
+    def recover(self):
+        """Requeue jobs left running by a worker that died; returns how many"""
+        with self.lock:
+            rows = self.conn.execute("SELECT id, worker_pid FROM jobs WHERE status = 'running'").fetchall()
+        recovered = 0
+        for job_id, pid in rows:
+            if not pid_alive(pid):
+                self.fail(job_id, "Worker stopped while running this job")
+                recovered += 1
+        return recovered
+
+    def register_worker(self, pid=None):
+        """Become the worker unless another live one is registered (only one may write the store)"""
+        pid = pid or os.getpid()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT pid FROM workers WHERE name = 'ingest'").fetchone()
+                if row and row[0] != pid and pid_alive(row[0]):
+                    self.conn.execute("COMMIT")
+                    return False
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO workers (name, pid, started) VALUES ('ingest', ?, ?)", (pid, time.time())
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def worker_alive(self):
+        with self.lock:
+            row = self.conn.execute("SELECT pid FROM workers WHERE name = 'ingest'").fetchone()
+        return bool(row and pid_alive(row[0]))
+
+    def get_stats(self, window_seconds=600):
+        """Queue depth per status and throughput of the jobs finished in the last window"""
+        since = time.time() - window_seconds
+        with self.lock:
+            counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            finished, chunks, busy = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0), COALESCE(SUM(finished - started), 0) "
+                "FROM jobs WHERE status = 'done' AND kind = 'ingest' AND finished >= ?", (since,)
+            ).fetchone()
+        stats = {status: counts.get(status, 0) for status in STATUSES}
+        stats.update({
+            'depth': stats['queued'] + stats['running'],
+            'files_per_minute': round(finished * 60 / window_seconds, 2),
+            'chunks_per_second': round(chunks / busy, 1) if busy else 0.0,
+            'seconds_per_file': round(busy / finished, 2) if finished else 0.0,
+            'worker_alive': self.worker_alive()
+        })
+        return stats
+
+
+class IngestionWorker:
+    """Run queued jobs: uploads in batches through an IngestionPipeline, the rest
+    through a DocumentProcessor
+
+    This is the process that writes the vector store; everyone else queues jobs
+    and reloads the store once they are done.
+    """
+
+    def __init__(self, job_queue, doc_processor, poll_interval=1.0, batch_size=16, num_workers=None):
+        self.job_queue = job_queue
+        self.doc_processor = doc_processor
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size  # uploads claimed at once
+        self.num_workers = num_workers  # extraction processes per batch
+
+    def run(self, stop_event=None):
+        if not self.job_queue.register_worker():
+            print("Another ingestion worker is already running, exiting")
+            return
+        recovered = self.job_queue.recover()
+        if recovered:
+            print(f"♻️ Requeued {recovered} jobs left running by a previous worker")
+        print("👷 Ingestion worker waiting for jobs")
+        while stop_event is None or not stop_event.is_set():
+            jobs = self.job_queue.claim_batch(self.batch_size)
+            if not jobs:
+                time.sleep(self.poll_interval)
+                continue
+            if jobs[0]['kind'] == "ingest":
+                self.ingest(jobs)
+            else:
+                self.process(jobs[0])
+
+    def process(self, job):
+        """Run a sample, delete or clear job"""
+        print(f"⚙️ Job {job['id']}: {job['kind']} {job['document_id']}".rstrip())
+        try:
+            if job['kind'] == "delete":
+                chunks, embedded = self.doc_processor.delete_document(job['document_id']), 0
+            elif job['kind'] == "samples":
+                self.doc_processor.add_sample_documents()
+                chunks, embedded = None, None
+            elif job['kind'] == "clear":
+                self.doc_processor.clear_all_documents()
+                chunks, embedded = None, None
+            else:
+                raise ValueError(f"Unknown job kind '{job['kind']}'")
+        except Exception as e:
+            print(f"❌ Job {job['id']} failed: {str(e)}")
+            self.job_queue.fail(job['id'], str(e))
+            return
+        self.job_queue.complete(job['id'], chunks=chunks, embedded=embedded)
+        print(f"✅ Job {job['id']} done" + (f" ({chunks} chunks)" if chunks is not None else ""))
+
+    def ingest(self, jobs):
+        """Run a batch of upload jobs through an IngestionPipeline
+
+        Pipeline events move each job along STAGES. Unchanged, cancelled and failed
+        files finish their job right away; written ones once the pipeline has
+        flushed them to disk, so nobody reloads the store before they are in it.
+        """
+        by_document = {job['document_id']: job for job in jobs}
+        written = []
+        finished = set()
+        print(f"⚙️ Jobs {', '.join(str(job['id']) for job in jobs)}: ingest {len(jobs)} files")
+
+        def on_progress(event):
+            job = by_document[event['document_id']]
+            status = event['status']
+            if status in STAGES:
+                self.job_queue.set_stage(job['id'], status)
+                if status == 'written':
+                    written.append((job, event))
+                return
+            if status == 'skipped':
+                self.job_queue.complete(job['id'], chunks=event['chunks'], embedded=None)
+                print(f"✅ Job {job['id']} done, {os.path.basename(job['file_path'])} is unchanged")
+            elif status == 'cancelled':
+                self.job_queue.mark_cancelled(job['id'])
+                print(f"🚫 Job {job['id']} cancelled")
+            else:
+                self.job_queue.fail(job['id'], event['error'])
+                print(f"❌ Job {job['id']} failed: {event['error']}")
+            finished.add(job['id'])
+
+        pipeline = IngestionPipeline(
+            self.doc_processor.vector_store, num_workers=self.num_workers, progress_callback=on_progress,
+            # Last chance to cancel before the store is touched
+            cancelled=lambda document_id: self.job_queue.cancel_requested(by_document[document_id]['id'])
+        )
+        try:
+            pipeline.run([(job['file_path'], job['document_id']) for job in jobs])
+        except Exception as e:
+            error = f"Ingestion pipeline failed: {str(e)}"
+            print(f"❌ {error}")
+            for job in jobs:
+                if job['id'] not in finished:
+                    self.job_queue.fail(job['id'], error)
+            return
+
+        for job, event in written:
+            self.job_queue.complete(job['id'], chunks=event['chunks'], embedded=event['embedded'])
+            print(f"✅ Job {job['id']} done ({event['chunks']} chunks)")
+
+
+class QueuedDocumentProcessor:
+    """Stands in for a DocumentProcessor in processes that only read the store
+
+    Uploads, sample documents, deletes and clears are queued for the worker; each
+    call waits for its jobs and then reloads the store.
+    """
+
+    def __init__(self, job_queue, vector_store, store_path="vector_store", timeout=900, poll_interval=0.2):
+        self.job_queue = job_queue
+        self.vector_store = vector_store
+        self.store_path = store_path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    def run(self, job_id):
+        """Wait for a job and return it, raising if it didn't finish"""
+        ensure_worker(self.job_queue, self.store_path)
+        job = self.job_queue.wait(job_id, timeout=self.timeout)
+        if job['status'] in ('queued', 'running'):
+            raise TimeoutError(f"Job {job_id} is still {job['status']} after {self.timeout}s")
+        if job['status'] != 'done':
+            raise RuntimeError(job['error'] or f"Job {job_id} was {job['status']}")
+        self.vector_store.refresh()
+        return job
+
+    def ingest_files(self, files, progress_callback=None):
+        """Queue (file_path, document_id) uploads, wait for them and return an ingestion summary
+
+        Same summary and progress events as IngestionPipeline.run(), read off the
+        jobs as the worker moves them along. The jobs carry on if this gives up.
+        """
+        start = time.time()
+        job_ids = [self.job_queue.submit(file_path, document_id) for file_path, document_id in files]
+        ensure_worker(self.job_queue, self.store_path)
+        summary = {'total': len(job_ids), 'written': 0, 'skipped': 0, 'cancelled': 0, 'failed': 0, 'chunks': 0}
+        reported = {}  # job id -> status of the last event sent
+        finished = set()
+        while len(finished) < len(job_ids):
+            if time.time() - start >= self.timeout:
+                raise TimeoutError(f"{len(job_ids) - len(finished)} uploads are still queued or running "
+                                   f"after {self.timeout}s")
+            time.sleep(self.poll_interval)
+            for job_id in job_ids:
+                if job_id in finished:
+                    continue
+                event = job_event(self.job_queue.get(job_id))
+                if event is None or reported.get(job_id) == event['status']:
+                    continue
+                reported[job_id] = event['status']
+                if event['status'] in ('written', 'skipped', 'cancelled', 'failed'):
+                    finished.add(job_id)
+                    summary[event['status']] += 1
+                if event['status'] == 'written':
+                    summary['chunks'] += event['chunks']
+                event.update(completed=len(finished), total=len(job_ids))
+                if progress_callback:
+                    progress_callback(event)
+
+        self.vector_store.refresh()
+        summary['seconds'] = round(time.time() - start, 2)
+        return summary
+
+    def add_sample_documents(self):
+        self.run(self.job_queue.submit_samples())
+
+    def delete_document(self, document_id):
+        """Remove a document's chunks; returns how many were deleted"""
+        return self.run(self.job_queue.submit_delete(document_id))['chunks']
+
+    def clear_all_documents(self):
+        self.run(self.job_queue.submit_clear())
+
+    def get_vector_store_stats(self):
+        return self.vector_store.get_stats()
+
+
+# Worker started by ensure_worker() from this process
+_worker_process = None
+
+
+def start_worker_process(store_path="vector_store", threads=None):
+    """Start a worker in a separate process so ingestion doesn't compete with queries for the GIL"""
+    command = [sys.executable, os.path.abspath(__file__), "--store", store_path]
+    if threads:
+        command += ["--threads", str(threads)]
+    return subprocess.Popen(command, cwd=os.getcwd())
+
+
+def ensure_worker(job_queue, store_path="vector_store"):
+    """Start a worker unless one is registered or the one we started is still coming up"""
+    global _worker_process
+    if job_queue.worker_alive():
+        return False
+    if _worker_process is not None and _worker_process.poll() is None:
+        return False
+    _worker_process = start_worker_process(store_path)
+    print(f"👷 Started ingestion worker (pid {_worker_process.pid})")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+    from model_registry import set_num_threads
+    from document_processor import DocumentProcessor
+    from local_vector_store import LocalVectorStore
+
+    parser = argparse.ArgumentParser(description="Run queued ingestion jobs")
+    parser.add_argument("--store", default="vector_store", help="Vector store directory")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch threads (default: half the cores, leaving the rest for queries)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes extracting uploads (default: half the cores)")
+    parser.add_argument("--batch", type=int, default=16, help="Most uploads run as one pipeline batch")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between polls of an empty queue")
+    args = parser.parse_args()
+
+    # Ingestion is background work; let interactive queries win CPU contention
+    os.nice(10)
+    set_num_threads(args.threads or max(1, (os.cpu_count() or 2) // 2))
+
+    queue = JobQueue(os.path.join(args.store, "jobs.db"))
+    processor = DocumentProcessor(vector_store=LocalVectorStore(store_path=args.store))
+    IngestionWorker(queue, processor, poll_interval=args.poll, batch_size=args.batch,
+                    num_workers=args.workers or max(1, (os.cpu_count() or 2) // 2)).run()
@@ -0,0 +1,163 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lexical_postings (
+    term TEXT,
+    id INTEGER,
+    tf INTEGER,
+    PRIMARY KEY (term, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lexical_lengths (
+    id INTEGER PRIMARY KEY,
+    length INTEGER
+);
+"""
+
+# Words, numbers and compound tokens such as $500, 555-0100, 10.0.0.1 or it@company.com
+TOKEN_PATTERN = re.compile(r"\$?\w+(?:[-.@/]\w+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can could do does for from had has have how i if in is it its
+me my of on or our should so that the their them there these they this to was we what when
+where which who why will with would you your s t
+""".split())
+
+
+def tokenize(text):
+    """Lowercased terms of a text; compound tokens also yield their parts ('$500' -> '$500', '500')"""
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        parts = re.findall(r"\w+", token)
+        if len(parts) > 1 or parts[0] != token:
+            terms.extend(part for part in parts if part not in STOPWORDS)
+    return terms
+
+
+class LexicalIndex:
+    """Incremental BM25 inverted index kept in the metadata database
+
+    Postings share the MetadataStore's connection, so they become durable on the
+    same commit as the chunk rows and are truncated and compacted with them.
+    """
+
+    def __init__(self, metadata, k1=1.2, b=0.75):
+        self.metadata = metadata
+        self.conn = metadata.conn
+        self.lock = metadata.lock
+        self.k1 = k1
+        self.b = b
+        with self.lock:
+            if not metadata.read_only:
+                self.conn.executescript(SCHEMA)
+            self.load_totals()
+
+    def load_totals(self):
+        """Re-read the number of indexed chunks, their total length and the next id to index"""
+        with self.lock:
+            count, total_length, max_id = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(MAX(id) + 1, 0) FROM lexical_lengths"
+            ).fetchone()
+        self.count = count
+        self.total_length = total_length
+        self.next_id = max_id
+
+    def add(self, start_id, texts):
+        """Index texts under ids start_id, start_id + 1, ... (durable on the next commit)"""
+        postings = []
+        lengths = []
+        for offset, text in enumerate(texts):
+            terms = tokenize(text)
+            lengths.append((start_id + offset, len(terms)))
+            postings.extend((term, start_id + offset, tf) for term, tf in Counter(terms).items())
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO lexical_postings (term, id, tf) VALUES (?, ?, ?)", postings)
+            self.conn.executemany("INSERT OR REPLACE INTO lexical_lengths (id, length) VALUES (?, ?)", lengths)
+            # Ids are only ever appended, so the totals can be updated without a scan
+            self.count += len(lengths)
+            self.total_length += sum(length for _, length in lengths)
+            self.next_id = max(self.next_id, start_id + len(lengths))
+
+    def search(self, query, k=10, exclude=(), include=None):
+        """Top k (id, bm25 score, coverage) for a query
+
+        coverage is the fraction of the query's distinct terms found in the chunk.
+        include, if given, is the set of ids allowed in the results.
+        """
+        terms = set(tokenize(query))
+        if not terms or not self.count:
+            return []
+        average_length = self.total_length / self.count
+
+        scores = {}
+        matched = Counter()
+        with self.lock:
+            for term in terms:
+                rows = self.conn.execute(
+                    "SELECT p.id, p.tf, l.length FROM lexical_postings p "
+                    "JOIN lexical_lengths l ON l.id = p.id WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (self.count - len(rows) + 0.5) / (len(rows) + 0.5))
+                for idx, tf, length in rows:
+                    if idx in exclude or (include is not None and idx not in include):
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+                    matched[idx] += 1
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(idx, score, matched[idx] / len(terms)) for idx, score in top]
+
+    def truncate(self, count):
+        """Drop postings of ids >= count"""
+        with self.lock:
+            self.conn.execute("DELETE FROM lexical_postings WHERE id >= ?", (count,))
+            self.conn.execute("DELETE FROM lexical_lengths WHERE id >= ?", (count,))
+            self.load_totals()
+
+    def compact(self, dead_ids):
+        """Drop dead_ids and renumber the rest to 0..n-1 like MetadataStore.compact (caller commits)"""
+        with self.lock:
+            conn = self.conn
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS lexical_dead (id INTEGER PRIMARY KEY)")
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS lexical_id_map (old_id INTEGER PRIMARY KEY, new_id INTEGER)")
+            conn.execute("DELETE FROM lexical_dead")
+            conn.execute("DELETE FROM lexical_id_map")
+            conn.executemany("INSERT INTO lexical_dead (id) VALUES (?)", ((int(i),) for i in dead_ids))
+            conn.execute(
+                "INSERT INTO lexical_id_map (old_id, new_id) "
+                "SELECT id, ROW_NUMBER() OVER (ORDER BY id) - 1 FROM lexical_lengths "
+                "WHERE id NOT IN (SELECT id FROM lexical_dead)"
+            )
+            conn.execute("CREATE TEMP TABLE lexical_postings_new AS "
+                         "SELECT p.term, m.new_id AS id, p.tf FROM lexical_postings p "
+                         "JOIN lexical_id_map m ON m.old_id = p.id")
+            conn.execute("CREATE TEMP TABLE lexical_lengths_new AS "
+                         "SELECT m.new_id AS id, l.length FROM lexical_lengths l "
+                         "JOIN lexical_id_map m ON m.old_id = l.id")
+            conn.execute("DELETE FROM lexical_postings")
+            conn.execute("DELETE FROM lexical_lengths")
+            conn.execute("INSERT INTO lexical_postings (term, id, tf) SELECT term, id, tf FROM lexical_postings_new")
+            conn.execute("INSERT INTO lexical_lengths (id, length) SELECT id, length FROM lexical_lengths_new")
+            conn.execute("DROP TABLE lexical_postings_new")
+            conn.execute("DROP TABLE lexical_lengths_new")
+            self.load_totals()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM lexical_postings")
+            self.conn.execute("DELETE FROM lexical_lengths")
+            self.load_totals()
+
+    def get_stats(self):
+        return {
+            'chunks': self.count,
+            'average_length': round(self.total_length / self.count, 1) if self.count else 0.0
+        }
@@ -1,114 +1,1381 @@
-import faiss
-import numpy as np
-import pickle
-import os
-from sentence_transformers import SentenceTransformer
-
-class LocalVectorStore:
-    def __init__(self, dimension=768, store_path="vector_store"):
-        self.dimension = dimension
-        self.store_path = store_path
-        #self.embeddings_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.embeddings_model = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
-        
-        # Create storage directory
-        os.makedirs(store_path, exist_ok=True)
-        
-        # Initialize or load existing index
-        self.index_file = os.path.join(store_path, "docs.index")
-        self.metadata_file = os.path.join(store_path, "metadata.pkl")
-        
-        if os.path.exists(self.index_file) and os.path.exists(self.metadata_file):
-            self.load_index()
-        else:
-            self.index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
-            self.texts = []
-            self.metadata = []
-    
-    def get_embedding(self, text):
-        """Generate embedding using HuggingFace model"""
-        embedding = self.embeddings_model.encode(text)
-        return embedding
-    
-    def add_documents(self, texts, metadatas, embeddings=None):
-        """Add documents to the vector store"""
-        print(f"Adding {len(texts)} documents to vector store...")
-
-        if embeddings is None:
-            embeddings = []
-            for text in texts:
-                embedding = self.get_embedding(text)
-                embeddings.append(embedding)
-
-        embeddings = np.array(embeddings).astype('float32')
-
-        # Normalize for cosine similarity
-        faiss.normalize_L2(embeddings)
-
-        # Add to index
-        try:
-            self.index.add(embeddings)
-        except Exception as e:
-            print(f"Error adding to index: {str(e)}")
-            return  # Exit if adding to index fails
-
-        self.texts.extend(texts)
-        self.metadata.extend(metadatas)
-
-        # Save automatically
-        self.save_index()
-        print(f"✅ Successfully added documents. Total documents: {len(self.texts)}")
-
-    
-    def search(self, query, k=3, score_threshold=0.5):
-        """Search for similar documents"""
-        if len(self.texts) == 0:
-            return []
-        
-        query_embedding = self.get_embedding(query)
-        query_embedding = np.array([query_embedding]).astype('float32')
-        faiss.normalize_L2(query_embedding)
-        
-        scores, indices = self.index.search(query_embedding, min(k, len(self.texts)))
-        
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx != -1 and score >= score_threshold:  # Valid result with good score
-                results.append({
-                    'text': self.texts[idx],
-                    'metadata': self.metadata[idx],
-                    'score': float(score)
-                })
-        
-        return results
-    
-    def save_index(self):
-        """Save the vector store"""
-        faiss.write_index(self.index, self.index_file)
-        with open(self.metadata_file, 'wb') as f:
-            pickle.dump({'texts': self.texts, 'metadata': self.metadata}, f)
-    
-    def load_index(self):
-        """Load the vector store"""
-        self.index = faiss.read_index(self.index_file)
-        with open(self.metadata_file, 'rb') as f:
-            data = pickle.load(f)
-            self.texts = data['texts']
-            self.metadata = data['metadata']
-        print(f"Loaded vector store with {len(self.texts)} documents")
-    
-    def clear(self):
-        """Clear all documents"""
-        self.index = faiss.IndexFlatIP(self.dimension)
-        self.texts = []
-        self.metadata = []
-        self.save_index()
-        print("Vector store cleared")
-    
-    def get_stats(self):
-        """Get statistics about the vector store"""
-        return {
-            'total_documents': len(self.texts),
-            'index_size': self.index.ntotal,
-            'dimension': self.dimension
-        }
\ No newline at end of file
+import faiss
+import numpy as np
+import pickle
+import os
+import math
+import glob
+import threading
+import hashlib
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from model_registry import get_embedding_model, model_key, DEFAULT_EMBEDDING_MODEL, DEFAULT_EMBEDDING_BACKEND
+from embedding_cache import EmbeddingCache
+from metadata_store import MetadataStore
+from rwlock import ReadWriteLock, FileLock
+from lexical_index import LexicalIndex
+
+# Supported index backends. "flat" is an exact brute-force scan, the others are
+# approximate-nearest-neighbor indexes that trade a little recall for speed.
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# FAISS warns when an IVF quantizer is trained on fewer than ~39 points per list
+MIN_POINTS_PER_CENTROID = 39
+
+# Rows of memory-mapped vectors scored per matrix multiply during a flat search
+SEARCH_BLOCK_ROWS = 65536
+
+
+def build_index(index_type, dimension, vectors=None, nlist=None, pq_m=64, pq_nbits=8,
+                hnsw_m=32, ef_construction=200):
+    """Create (and train, if needed) a FAISS index of the given type"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose one of {INDEX_TYPES}")
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
+
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+
+    else:
+        if vectors is None or len(vectors) == 0:
+            raise ValueError(f"Index type '{index_type}' needs training vectors")
+        if nlist is None:
+            nlist = default_nlist(len(vectors))
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_nbits,
+                                     faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+
+    if vectors is not None and len(vectors) > 0:
+        index.add(vectors)
+    return index
+
+
+def default_nlist(num_vectors):
+    """Pick a number of IVF lists (~4*sqrt(n)) that still has enough training points per list"""
+    nlist = int(4 * math.sqrt(num_vectors))
+    nlist = min(nlist, num_vectors // MIN_POINTS_PER_CENTROID)
+    return max(1, nlist)
+
+
+def content_hash(text):
+    """Stable hash identifying a chunk or document by its content"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def write_atomic(path, write):
+    """Write a file through a temporary name so readers never see a partial file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def get_search_params(index, nprobe=None, ef_search=None, id_selector=None):
+    """Build per-query FAISS search parameters for the given index
+
+    id_selector (a faiss.IDSelector) restricts the results to the ids it selects.
+    """
+    if not isinstance(index, faiss.Index):
+        return None
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVF) and (nprobe is not None or id_selector is not None):
+        params = faiss.SearchParametersIVF(nprobe=min(nprobe or index.nprobe, index.nlist))
+    elif isinstance(index, faiss.IndexHNSW) and (ef_search is not None or id_selector is not None):
+        params = faiss.SearchParametersHNSW(efSearch=ef_search or index.hnsw.efSearch)
+    else:
+        return None
+    if id_selector is not None:
+        params.sel = id_selector
+    return params
+
+
+def merge_top_k(scores_a, ids_a, scores_b, ids_b, k):
+    """Merge two sets of per-query search results and keep the best k"""
+    scores = np.hstack([scores_a, scores_b])
+    ids = np.hstack([ids_a, ids_b])
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+def load_npy(path, use_mmap=True):
+    """Load a .npy file, memory-mapped when possible"""
+    try:
+        return np.load(path, mmap_mode='r' if use_mmap else None)
+    except ValueError:
+        # Empty arrays can't be memory-mapped
+        return np.load(path)
+
+
+class MmapFlatIndex:
+    """Exact inner-product index over a memory-mapped vectors.npy plus an in-memory tail
+
+    Checkpointed vectors are never copied into RAM, so every process on the host shares
+    them through the page cache. Vectors added since the checkpoint live in a small
+    IndexFlatIP. Implements the part of the FAISS index API LocalVectorStore uses.
+    """
+
+    def __init__(self, dimension, base=None):
+        self.d = dimension
+        self.base = base
+        self.tail = faiss.IndexFlatIP(dimension)
+
+    @classmethod
+    def load(cls, path, dimension, use_mmap=True):
+        """Open a vectors.npy file written by save()"""
+        base = load_npy(path, use_mmap)
+        return cls(dimension, base if len(base) else None)
+
+    @property
+    def base_count(self):
+        return 0 if self.base is None else len(self.base)
+
+    @property
+    def ntotal(self):
+        return self.base_count + self.tail.ntotal
+
+    def add(self, vectors):
+        self.tail.add(np.ascontiguousarray(vectors, dtype='float32'))
+
+    def iter_blocks(self, block_rows=SEARCH_BLOCK_ROWS):
+        """Yield (start_id, float32 block) over every stored vector"""
+        for start in range(0, self.base_count, block_rows):
+            yield start, np.asarray(self.base[start:start + block_rows], dtype='float32')
+        if self.tail.ntotal:
+            yield self.base_count, self.tail.reconstruct_n(0, self.tail.ntotal)
+
+    def search(self, queries, k, params=None, exclude=None):
+        """Exact top k; exclude is an optional sorted array of ids that are never returned"""
+        queries = np.ascontiguousarray(queries, dtype='float32')
+        best_scores = np.full((len(queries), k), -np.inf, dtype='float32')
+        best_ids = np.full((len(queries), k), -1, dtype='int64')
+        if exclude is None:
+            exclude = np.zeros(0, dtype='int64')
+
+        for start in range(0, self.base_count, SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.base[start:start + SEARCH_BLOCK_ROWS], dtype='float32')
+            scores = queries @ block.T
+            lo, hi = np.searchsorted(exclude, [start, start + len(block)])
+            scores[:, exclude[lo:hi] - start] = -np.inf
+            top = min(k, scores.shape[1])
+            candidates = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            best_scores, best_ids = merge_top_k(
+                best_scores, best_ids,
+                np.take_along_axis(scores, candidates, axis=1), candidates + start, k
+            )
+
+        if self.tail.ntotal:
+            tail_exclude = exclude[np.searchsorted(exclude, self.base_count):] - self.base_count
+            tail_params = None
+            if len(tail_exclude):
+                selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(tail_exclude))
+                tail_params = faiss.SearchParameters(sel=selector)
+            scores, ids = self.tail.search(queries, min(k, self.tail.ntotal), params=tail_params)
+            ids = np.where(ids >= 0, ids + self.base_count, -1)
+            best_scores, best_ids = merge_top_k(best_scores, best_ids, scores, ids, k)
+
+        best_ids[np.isneginf(best_scores)] = -1  # fewer than k ids left after excluding
+        return best_scores, best_ids
+
+    def search_subset(self, queries, ids, k):
+        """Exact search over the vectors in ids (sorted) only, reading just those rows"""
+        queries = np.ascontiguousarray(queries, dtype='float32')
+        best_scores = np.full((len(queries), k), -np.inf, dtype='float32')
+        best_ids = np.full((len(queries), k), -1, dtype='int64')
+
+        for start in range(0, len(ids), SEARCH_BLOCK_ROWS):
+            block_ids = ids[start:start + SEARCH_BLOCK_ROWS]
+            scores = queries @ self.reconstruct_batch(block_ids).T
+            top = min(k, scores.shape[1])
+            candidates = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            best_scores, best_ids = merge_top_k(
+                best_scores, best_ids,
+                np.take_along_axis(scores, candidates, axis=1), block_ids[candidates], k
+            )
+        return best_scores, best_ids
+
+    def reconstruct_batch(self, ids):
+        """Vectors of the given ids (sorted), as float32 rows"""
+        split = np.searchsorted(ids, self.base_count)
+        parts = []
+        if split:
+            parts.append(np.asarray(self.base[ids[:split]], dtype='float32'))
+        if split < len(ids):
+            parts.append(self.tail.reconstruct_batch(ids[split:] - self.base_count))
+        if not parts:
+            return np.zeros((0, self.d), dtype='float32')
+        return np.vstack(parts)
+
+    def reconstruct_n(self, start, n):
+        end = start + n
+        parts = []
+        if start < self.base_count:
+            parts.append(np.asarray(self.base[start:min(end, self.base_count)], dtype='float32'))
+        if end > self.base_count:
+            tail_start = max(start - self.base_count, 0)
+            parts.append(self.tail.reconstruct_n(tail_start, end - self.base_count - tail_start))
+        if not parts:
+            return np.zeros((0, self.d), dtype='float32')
+        return np.vstack(parts)
+
+    def snapshot(self):
+        """Copy that doesn't change when more vectors are added to this index"""
+        copy = MmapFlatIndex(self.d, self.base)
+        if self.tail.ntotal:
+            copy.add(self.tail.reconstruct_n(0, self.tail.ntotal))
+        return copy
+
+    def save(self, path, dtype='float32', keep=None):
+        """Stream vectors into a .npy file without materializing them all in RAM
+
+        keep is an optional boolean mask over vector ids; only those rows are written.
+        """
+        tmp_path = path + ".tmp"
+        count = self.ntotal if keep is None else int(keep.sum())
+        if count == 0:
+            write_atomic(path, lambda f: np.save(f, np.zeros((0, self.d), dtype=dtype)))
+            return
+
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(count, self.d))
+        position = 0
+        for start, block in self.iter_blocks():
+            if keep is not None:
+                block = block[keep[start:start + len(block)]]
+            out[position:position + len(block)] = block
+            position += len(block)
+        out.flush()
+        del out
+        os.replace(tmp_path, path)
+
+
+class TextStore:
+    """Chunk texts kept in an offset-indexed blob file and decoded only when accessed
+
+    texts.bin holds the UTF-8 bytes of every checkpointed chunk back to back and
+    texts_offsets.npy the start of each one, so looking up a search hit reads just
+    that slice. Texts added since the checkpoint are kept in a plain list.
+    """
+
+    def __init__(self, blob_file=None, offsets_file=None, use_mmap=True):
+        self.blob = None
+        self.offsets = np.zeros(1, dtype='int64')
+        self.extra = []
+
+        if blob_file and os.path.exists(blob_file) and os.path.exists(offsets_file):
+            self.offsets = load_npy(offsets_file, use_mmap)
+            if os.path.getsize(blob_file) > 0:
+                self.blob = np.memmap(blob_file, dtype=np.uint8, mode='r')
+
+    @property
+    def base_count(self):
+        return len(self.offsets) - 1
+
+    def __len__(self):
+        return self.base_count + len(self.extra)
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if idx >= self.base_count:
+            return self.extra[idx - self.base_count]
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        if start == end:
+            return ""
+        return bytes(self.blob[start:end]).decode('utf-8')
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def extend(self, texts):
+        self.extra.extend(texts)
+
+    def snapshot(self):
+        """Copy that doesn't change when more texts are added to this store"""
+        copy = TextStore()
+        copy.blob = self.blob
+        copy.offsets = self.offsets
+        copy.extra = list(self.extra)
+        return copy
+
+    @staticmethod
+    def write(texts, blob_file, offsets_file):
+        """Write texts to a blob file plus an offsets index"""
+        offsets = [0]
+
+        def write_blob(f):
+            for text in texts:
+                data = text.encode('utf-8')
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+
+        write_atomic(blob_file, write_blob)
+        write_atomic(offsets_file, lambda f: np.save(f, np.array(offsets, dtype='int64')))
+
+
+class LocalVectorStore:
+    def __init__(self, dimension=768, store_path="vector_store", index_type="flat",
+                 nlist=None, pq_m=64, pq_nbits=8, hnsw_m=32, ef_construction=200,
+                 nprobe=16, ef_search=64, train_threshold=None,
+                 embedding_model_name=DEFAULT_EMBEDDING_MODEL, batch_size=64,
+                 auto_flush=True, max_segments=16, use_mmap=True, vector_dtype='float32',
+                 compaction_ratio=0.2, embedding_cache_size=100000, embedding_backend=None,
+                 exact_filter_limit=20000, read_only=False):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}'. Choose one of {INDEX_TYPES}")
+
+        self.dimension = dimension
+        self.store_path = store_path
+        # A read-only store loads what is on disk without writing anything (see reload())
+        self.read_only = read_only
+        # Embedding model is shared process-wide and loaded on first use
+        self.embedding_model_name = embedding_model_name
+        self.embedding_backend = embedding_backend  # None uses EMBEDDING_BACKEND (default "torch")
+        self.batch_size = batch_size
+
+        # Index settings
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        # Filtered searches over at most this many chunks score them exactly instead of
+        # asking the ANN index to skip everything else
+        self.exact_filter_limit = exact_filter_limit
+
+        # IVF indexes keep vectors in a flat index until there are enough of them to train on
+        if train_threshold is None:
+            train_threshold = MIN_POINTS_PER_CENTROID * nlist if nlist else 10000
+            if index_type == "ivf_pq":
+                # PQ codebooks need at least one training point per centroid
+                train_threshold = max(train_threshold, 2 ** pq_nbits)
+        self.train_threshold = train_threshold
+
+        # Persistence: a full checkpoint plus small append-only segment files
+        # holding everything added since
+        self.auto_flush = auto_flush  # write a segment after every add_documents call
+        self.max_segments = max_segments  # merge segments into a checkpoint past this count
+        self.pending = []  # (embeddings, texts, metadatas) not yet written to disk
+        self.segment_seq = 0  # sequence number of the last segment written
+
+        # Checkpointed vectors and texts are memory-mapped instead of read into RAM
+        self.use_mmap = use_mmap
+        self.vector_dtype = vector_dtype  # 'float16' halves the size of vectors.npy
+        self.index_read_only = False  # True while an IVF index is memory-mapped
+
+        # Deleted chunks are tombstoned and skipped by search until compact() drops them.
+        # A background compaction starts once this fraction of the store is deleted.
+        self.compaction_ratio = compaction_ratio
+        self.tombstones = set()
+        self.tombstone_cache = None  # see tombstone_filter()
+        self.compaction_thread = None
+
+        # lock serializes writers; maintenance_lock is held while checkpointing or
+        # compacting (always taken before lock). Searches only take the read side of
+        # rw_lock, which writers take for the short moments they change in-memory state.
+        self.lock = threading.RLock()
+        self.maintenance_lock = threading.RLock()
+        self.rw_lock = ReadWriteLock()
+        # Only one process writes the store at a time (see writing()). It stays held
+        # while additions are pending, since their ids aren't on disk yet.
+        self.write_lock = FileLock(os.path.join(store_path, "write.lock"))
+        self.pending_hold = False
+
+        # Create storage directory
+        self.segments_path = os.path.join(store_path, "segments")
+        os.makedirs(self.segments_path, exist_ok=True)
+
+        # Checkpoint files. vectors.npy is the source of truth for the raw vectors;
+        # docs.index is only written for ANN index types.
+        self.index_file = os.path.join(store_path, "docs.index")
+        self.vectors_file = os.path.join(store_path, "vectors.npy")
+        self.texts_file = os.path.join(store_path, "texts.bin")
+        self.offsets_file = os.path.join(store_path, "texts_offsets.npy")
+        self.legacy_metadata_file = os.path.join(store_path, "metadata.pkl")
+
+        # Chunk metadata lives in SQLite, indexed by document_id and source
+        self.metadata = MetadataStore(os.path.join(store_path, "metadata.db"), read_only=read_only)
+        # BM25 keyword index over the chunk texts, kept in the same database
+        self.lexical = LexicalIndex(self.metadata)
+        # Runs the dense half of a hybrid search next to the lexical half
+        self.search_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid-search")
+
+        # Embeddings of texts seen before, shared by ingestion and queries (0 disables).
+        # Survives clear() so re-ingesting the same documents is cheap.
+        self.embedding_cache = None
+        if embedding_cache_size:
+            self.embedding_cache = EmbeddingCache(os.path.join(store_path, "embedding_cache.db"),
+                                                  max_entries=embedding_cache_size)
+
+        # Version of the on-disk store the in-memory state matches (see refresh())
+        self.loaded_version = None
+        if read_only:
+            self.load_index(read_only=True)
+            self.loaded_version = self.get_version()
+            return
+
+        # Initialize or load existing index. Loading may truncate, migrate and
+        # checkpoint, so it is a write too.
+        self.write_lock.acquire()
+        try:
+            has_checkpoint = os.path.exists(self.vectors_file) or os.path.exists(self.legacy_metadata_file)
+            if has_checkpoint or self.list_segments():
+                self.load_index()
+            else:
+                self.reset_storage()
+                if len(self.metadata) or self.lexical.count:
+                    # Rows left over from a deleted store
+                    self.lexical.clear()
+                    self.metadata.clear()
+            self.loaded_version = self.get_version()
+        finally:
+            self.write_lock.release()
+
+    @property
+    def embeddings_model(self):
+        """Shared embedding model from the model registry"""
+        return get_embedding_model(self.embedding_model_name, backend=self.embedding_backend)
+
+    @property
+    def embedding_cache_key(self):
+        """Model name the embedding cache files vectors under (backends differ slightly)"""
+        return model_key(self.embedding_model_name, self.embedding_backend or DEFAULT_EMBEDDING_BACKEND)
+
+    def reset_storage(self):
+        """Start with an empty in-memory store"""
+        self.vectors = MmapFlatIndex(self.dimension)
+        self.index = self.create_empty_index()
+        self.index_read_only = False
+        self.texts = TextStore()
+
+    def create_empty_index(self):
+        """Create the starting index (the flat vectors themselves for IVF types that still need training)"""
+        if self.index_type == "hnsw":
+            return build_index("hnsw", self.dimension, hnsw_m=self.hnsw_m,
+                               ef_construction=self.ef_construction)
+        return self.vectors
+
+    def is_flat_index(self):
+        """Check whether the current index is still a brute-force flat index"""
+        return self.index is self.vectors
+
+    def ensure_writable_index(self):
+        """Load a memory-mapped (read-only) IVF index into RAM before modifying it"""
+        if self.index_read_only:
+            index = faiss.read_index(self.index_file)
+            with self.rw_lock.write():
+                self.index = index
+                self.index_read_only = False
+
+    def maybe_train_index(self):
+        """Train and migrate to the configured ANN index once enough vectors are stored"""
+        if self.index_type == "flat" or not self.is_flat_index():
+            return False
+        if self.index_type != "hnsw" and self.index.ntotal < self.train_threshold:
+            return False
+
+        print(f"Building {self.index_type} index over {self.index.ntotal} vectors...")
+        vectors = self.vectors.reconstruct_n(0, self.vectors.ntotal)
+        index = build_index(
+            self.index_type, self.dimension, vectors,
+            nlist=self.nlist, pq_m=self.pq_m, pq_nbits=self.pq_nbits,
+            hnsw_m=self.hnsw_m, ef_construction=self.ef_construction
+        )
+        with self.rw_lock.write():
+            self.index = index
+        print(f"✅ Migrated vector store to {self.index_type} index")
+        return True
+
+    def get_embedding(self, text):
+        """Generate embedding using HuggingFace model"""
+        embedding = self.embeddings_model.encode(text)
+        return embedding
+
+    def embed_texts(self, texts, batch_size=None):
+        """Encode many texts in batches and return a normalized float32 matrix
+
+        Texts found in the embedding cache are not encoded again.
+        """
+        batch_size = batch_size or self.batch_size
+        embeddings = np.zeros((len(texts), self.dimension), dtype='float32')
+
+        cached = {}
+        if self.embedding_cache is not None and texts:
+            cached = self.embedding_cache.get_many(self.embedding_cache_key, texts)
+            for position, vector in cached.items():
+                embeddings[position] = vector
+
+        missing = [position for position in range(len(texts)) if position not in cached]
+        for start in range(0, len(missing), batch_size):
+            positions = missing[start:start + batch_size]
+            batch = [texts[position] for position in positions]
+            encoded = np.asarray(self.embeddings_model.encode(
+                batch, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False
+            ), dtype='float32')
+            faiss.normalize_L2(encoded)
+            embeddings[positions] = encoded
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(self.embedding_cache_key, batch, encoded)
+
+        # Cached vectors come back as float16, so normalize everything again
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
+    @contextmanager
+    def writing(self):
+        """Hold self.lock and the cross-process write lock while changing the store
+
+        If another process wrote since we loaded, its changes are reloaded first:
+        adding on top of stale state would reuse its vector ids and the next
+        checkpoint would overwrite its segments.
+        """
+        with self.lock:
+            self.acquire_write_lock()
+            try:
+                yield
+            finally:
+                self.release_write_lock()
+
+    def acquire_write_lock(self):
+        """Take the write lock, catching up with other processes' writes (caller holds the lock)"""
+        if self.read_only:
+            raise RuntimeError("Vector store was opened read-only")
+        self.write_lock.acquire()
+        try:
+            if self.write_lock.depth == 1 and self.get_version() != self.loaded_version:
+                self.reload()
+        except Exception:
+            self.write_lock.release()
+            raise
+
+    def release_write_lock(self):
+        """Release the write lock unless additions are still pending (caller holds the lock)"""
+        if self.pending and not self.pending_hold:
+            self.write_lock.acquire()
+            self.pending_hold = True
+        elif not self.pending and self.pending_hold:
+            self.write_lock.release()
+            self.pending_hold = False
+        if self.write_lock.depth == 1:
+            self.metadata.commit()  # another process can't write to metadata.db while we hold a transaction
+        self.write_lock.release()
+
+    def add_documents(self, texts, metadatas, embeddings=None, batch_size=None, flush=None):
+        """Add documents to the vector store
+
+        The new vectors are written as a small segment file. Pass flush=False (or set
+        auto_flush=False) during bulk ingestion and call flush()/checkpoint() once at the end.
+        """
+        print(f"Adding {len(texts)} documents to vector store...")
+
+        if embeddings is None:
+            embeddings = self.embed_texts(texts, batch_size=batch_size)
+
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+
+        # Normalize for cosine similarity
+        faiss.normalize_L2(embeddings)
+
+        # Every chunk carries the hash of its text for deduplication
+        metadatas = [meta if 'content_hash' in meta else dict(meta, content_hash=content_hash(text))
+                     for text, meta in zip(texts, metadatas)]
+
+        if flush is None:
+            flush = self.auto_flush
+
+        with self.writing():
+            # Add to index
+            start_id = self.vectors.ntotal
+            if not self.is_flat_index():
+                self.ensure_writable_index()
+            with self.rw_lock.write():
+                try:
+                    if not self.is_flat_index():
+                        self.index.add(embeddings)
+                    self.vectors.add(embeddings)
+                except Exception as e:
+                    print(f"Error adding to index: {str(e)}")
+                    return False  # Exit if adding to index fails
+
+                self.texts.extend(texts)
+                self.metadata.put(start_id, metadatas)
+            self.lexical.add(start_id, texts)
+            self.bump_version()
+            self.pending.append((embeddings, list(texts), list(metadatas)))
+
+            if self.maybe_train_index():
+                # The index was rebuilt, so a full checkpoint is needed anyway
+                self.checkpoint()
+            elif flush:
+                self.flush_pending()
+        print(f"✅ Successfully added documents. Total documents: {len(self)}")
+        return True
+
+
+    def search(self, query, k=3, score_threshold=0.5, nprobe=None, ef_search=None, filters=None):
+        """Search for similar documents
+
+        nprobe (IVF) and ef_search (HNSW) override the store defaults for this query only.
+        filters restricts the search to matching chunks, e.g. {"document_id": "handbook"}
+        (see MetadataStore.ids_matching).
+        """
+        return self.search_batch([query], k=k, score_threshold=score_threshold,
+                                 nprobe=nprobe, ef_search=ef_search, filters=filters)[0]
+
+    def search_tiered(self, query, k=3, thresholds=(0.45, 0.3), query_embedding=None,
+                      nprobe=None, ef_search=None, hybrid=False, filters=None):
+        """Embed and search once, grouping the results into confidence bands
+
+        Returns {threshold: results} with thresholds in descending order. A result lands
+        in the highest band its score reaches, so the first non-empty band holds what
+        searching each threshold in turn would have returned. With hybrid=True the
+        search is search_hybrid() and chunks containing every query keyword are moved
+        up to the top band, provided their dense score reaches the lowest threshold.
+        filters is passed on to the search.
+        Each band holds at most k results.
+        """
+        thresholds = sorted(thresholds, reverse=True)
+        if hybrid:
+            # Band a larger fused pool and only then cut to k, so keyword-only hits that
+            # reach no band can't take the places of dense hits that do
+            pool = max(4 * k, 20)
+            results = self.search_hybrid(query, k=pool, candidates=pool, score_threshold=thresholds[-1],
+                                         query_embedding=query_embedding, nprobe=nprobe, ef_search=ef_search,
+                                         filters=filters)
+        else:
+            query_embeddings = None if query_embedding is None else np.reshape(query_embedding, (1, -1))
+            results = self.search_batch([query], k=k, score_threshold=thresholds[-1],
+                                        query_embeddings=query_embeddings,
+                                        nprobe=nprobe, ef_search=ef_search, filters=filters)[0]
+
+        bands = {threshold: [] for threshold in thresholds}
+        for result in results:
+            # An exact keyword match alone isn't enough: "policy" is in half the chunks
+            if result.get('coverage') == 1 and result['score'] >= thresholds[-1]:
+                bands[thresholds[0]].append(result)
+                continue
+            threshold = next((t for t in thresholds if result['score'] >= t), None)
+            if threshold is not None:
+                bands[threshold].append(result)
+        return {threshold: results[:k] for threshold, results in bands.items()}
+
+    def search_batch(self, queries, k=3, score_threshold=0.5, nprobe=None, ef_search=None,
+                     query_embeddings=None, filters=None):
+        """Search for many queries at once with one encode call and one index search
+
+        Returns one list of results per query, in the same order as queries. Pass
+        query_embeddings if the queries were embedded already. With filters only
+        the matching chunks are searched (see search_candidates()).
+        """
+        if len(self.texts) == 0 or len(queries) == 0:
+            return [[] for _ in queries]
+
+        if query_embeddings is None:
+            query_embeddings = self.embed_texts(list(queries))
+        else:
+            query_embeddings = np.ascontiguousarray(query_embeddings, dtype='float32')
+
+        nprobe = nprobe if nprobe is not None else self.nprobe
+        ef_search = ef_search if ef_search is not None else self.ef_search
+        with self.rw_lock.read():
+            tombstones = self.tombstones
+            if filters:
+                candidate_ids = self.candidate_ids(filters)
+                if not len(candidate_ids):
+                    return [[] for _ in queries]
+                k_search = min(2 * k, len(candidate_ids))
+                scores, indices = self.search_candidates(query_embeddings, candidate_ids, k_search,
+                                                         nprobe=nprobe, ef_search=ef_search)
+            else:
+                # Deleted chunks are skipped inside the search, so k_search doesn't grow with
+                # them; the extra neighbours make up for dropped duplicate chunk texts
+                k_search = min(2 * k, self.vectors.ntotal)
+                if tombstones and self.is_flat_index():
+                    scores, indices = self.vectors.search(query_embeddings, k_search,
+                                                          exclude=self.tombstone_filter(tombstones)[0])
+                else:
+                    selector = self.tombstone_filter(tombstones)[1] if tombstones else None
+                    params = get_search_params(self.index, nprobe=nprobe, ef_search=ef_search, id_selector=selector)
+                    scores, indices = self.index.search(query_embeddings, k_search, params=params)
+
+            hits = []
+            for row_scores, row_indices in zip(scores, indices):
+                hits.append([(int(idx), float(score)) for score, idx in zip(row_scores, row_indices)
+                             if idx != -1 and int(idx) not in tombstones and score >= score_threshold])
+
+            # Fetch metadata for every hit with a single query
+            metadata_by_id = self.metadata.get_many({idx for row_hits in hits for idx, _ in row_hits})
+
+            return [self.make_results([(idx, {'score': score}) for idx, score in row_hits], metadata_by_id, k)
+                    for row_hits in hits]
+
+    def tombstone_filter(self, tombstones):
+        """(sorted id array, FAISS selector of everything else) for a tombstone set, cached per set"""
+        cached = self.tombstone_cache
+        if cached is None or cached[0] is not tombstones:
+            ids = np.fromiter(sorted(tombstones), dtype='int64', count=len(tombstones))
+            batch = faiss.IDSelectorBatch(ids)
+            # batch is kept in the tuple; the IDSelectorNot only points at it
+            cached = self.tombstone_cache = (tombstones, ids, batch, faiss.IDSelectorNot(batch))
+        return cached[1], cached[3]
+
+    def candidate_ids(self, filters):
+        """Sorted ids of the live, loaded chunks matching filters (read lock held)"""
+        ids = np.array(self.metadata.ids_matching(filters), dtype='int64')
+        # Rows another instance added that we haven't loaded yet have no vectors here
+        ids = ids[ids < self.vectors.ntotal]
+        if self.tombstones:
+            ids = ids[~np.isin(ids, np.fromiter(self.tombstones, dtype='int64'))]
+        return ids
+
+    def search_candidates(self, query_embeddings, ids, k, nprobe=None, ef_search=None):
+        """Search only the vectors in ids (sorted) rather than filtering a global top k (read lock held)
+
+        Flat stores and candidate sets of up to exact_filter_limit chunks are scored
+        exactly, touching only those rows. Larger sets go through the ANN index with
+        an IDSelector so every other vector is skipped while it searches.
+        """
+        if self.is_flat_index() or len(ids) <= self.exact_filter_limit:
+            return self.vectors.search_subset(query_embeddings, ids, k)
+        selector = faiss.IDSelectorBatch(ids)
+        params = get_search_params(self.index, nprobe=nprobe, ef_search=ef_search, id_selector=selector)
+        return self.index.search(query_embeddings, k, params=params)
+
+    def make_results(self, hits, metadata_by_id, k):
+        """Result dicts for (id, fields) hits, best first, skipping repeated chunk texts (read lock held)"""
+        results = []
+        seen_hashes = set()
+        for idx, fields in hits:
+            metadata = metadata_by_id.get(idx, {})
+            chunk_hash = metadata.get('content_hash', idx)
+            if chunk_hash in seen_hashes:
+                continue  # same text already returned from another document
+            seen_hashes.add(chunk_hash)
+            results.append(dict({'id': idx, 'text': self.texts[idx], 'metadata': metadata}, **fields))
+            if len(results) == k:
+                break
+        return results
+
+    def search_lexical(self, query, k=3, filters=None):
+        """BM25 keyword search; no embedding, so much cheaper than search()
+
+        Each result's 'score' is its BM25 score and 'coverage' the fraction of the
+        query's terms it contains.
+        """
+        with self.rw_lock.read():
+            include = set(self.candidate_ids(filters).tolist()) if filters else None
+            # Postings of chunks another instance added but we haven't loaded yet are skipped
+            hits = [hit for hit in self.lexical.search(query, k=2 * k, exclude=self.tombstones, include=include)
+                    if hit[0] < self.vectors.ntotal]
+            metadata_by_id = self.metadata.get_many(idx for idx, _, _ in hits)
+            return self.make_results([(idx, {'score': score, 'coverage': coverage})
+                                      for idx, score, coverage in hits], metadata_by_id, k)
+
+    def search_hybrid(self, query, k=3, score_threshold=0.3, rrf_k=60, candidates=None,
+                      query_embedding=None, nprobe=None, ef_search=None, filters=None):
+        """Dense and BM25 search run concurrently and merged by reciprocal rank fusion
+
+        score_threshold only filters the dense candidates. Results are ordered by
+        'fused_score' and carry the dense cosine 'score' (computed for keyword-only
+        hits too), 'lexical_score' and 'coverage' (0 when the keywords didn't match).
+        """
+        candidates = candidates or max(2 * k, 10)
+
+        def dense_search():
+            embedding = query_embedding if query_embedding is not None else self.embed_texts([query])[0]
+            embedding = np.ascontiguousarray(embedding, dtype='float32').reshape(1, -1)
+            return embedding, self.search_batch([query], k=candidates, score_threshold=score_threshold,
+                                                nprobe=nprobe, ef_search=ef_search,
+                                                query_embeddings=embedding, filters=filters)[0]
+
+        # Embedding the query is the slow part; the keyword search runs meanwhile. No lock
+        # is held while waiting, so a queued writer can't deadlock the two halves.
+        dense_future = self.search_pool.submit(dense_search)
+        lexical = self.search_lexical(query, k=candidates, filters=filters)
+        embedding, dense = dense_future.result()
+
+        fused = {}
+        for rank, result in enumerate(dense):
+            entry = fused.setdefault(result['id'], dict(result, lexical_score=0.0, coverage=0.0, fused_score=0.0))
+            entry['fused_score'] += 1 / (rrf_k + rank + 1)
+        for rank, result in enumerate(lexical):
+            entry = fused.get(result['id'])
+            if entry is None:
+                entry = fused[result['id']] = dict(result, score=None, fused_score=0.0)
+            entry['lexical_score'] = result['score']
+            entry['coverage'] = result['coverage']
+            entry['fused_score'] += 1 / (rrf_k + rank + 1)
+
+        results = sorted(fused.values(), key=lambda entry: entry['fused_score'], reverse=True)[:k]
+        keyword_only = [entry for entry in results if entry['score'] is None]
+        if keyword_only:
+            with self.rw_lock.read():
+                for entry in keyword_only:
+                    entry['score'] = float(self.vectors.reconstruct_n(entry['id'], 1)[0] @ embedding[0])
+        return results
+
+    def list_segments(self):
+        """Segment files on disk, oldest first"""
+        return sorted(glob.glob(os.path.join(self.segments_path, "segment_*.pkl")))
+
+    def segment_number(self, segment_file):
+        """Sequence number encoded in a segment file name"""
+        return int(os.path.basename(segment_file)[len("segment_"):-len(".pkl")])
+
+    def flush(self):
+        """Append all pending additions to disk as one new segment"""
+        with self.writing():
+            return self.flush_pending()
+
+    def flush_pending(self):
+        """Write self.pending as a segment (caller holds the lock)"""
+        if not self.pending:
+            return None
+
+        embeddings = np.vstack([item[0] for item in self.pending])
+        texts = [text for item in self.pending for text in item[1]]
+        metadatas = [meta for item in self.pending for meta in item[2]]
+        start_id = self.vectors.ntotal - len(embeddings)
+
+        self.segment_seq += 1
+        segment_file = os.path.join(self.segments_path, f"segment_{self.segment_seq:06d}.pkl")
+        write_atomic(segment_file, lambda f: pickle.dump({
+            'start_id': start_id, 'embeddings': embeddings, 'texts': texts, 'metadata': metadatas
+        }, f))
+        self.metadata.commit()
+        self.pending = []
+
+        # Merge once too many small segments pile up
+        if len(self.list_segments()) >= self.max_segments:
+            self.checkpoint()
+        return segment_file
+
+    def checkpoint(self):
+        """Write the full store and drop the segments it now contains"""
+        # A running compaction rewrites everything anyway
+        if not self.maintenance_lock.acquire(blocking=False):
+            print("Compaction in progress, checkpoint skipped")
+            return
+        try:
+            with self.writing():
+                self.write_checkpoint()
+        finally:
+            self.maintenance_lock.release()
+
+    def write_checkpoint(self):
+        """Write vectors, texts and (for ANN types) docs.index, then re-open them"""
+        self.vectors.save(self.vectors_file, dtype=self.vector_dtype)
+        TextStore.write(self.texts, self.texts_file, self.offsets_file)
+        if not self.is_flat_index():
+            self.ensure_writable_index()
+            index_tmp = self.index_file + ".tmp"
+            faiss.write_index(self.index, index_tmp)
+            os.replace(index_tmp, self.index_file)
+        elif os.path.exists(self.index_file):
+            os.remove(self.index_file)  # stale ANN index or a pre-mmap flat index
+        self.metadata.set_state('checkpoint_seq', self.segment_seq)
+        self.metadata.commit()
+        self.pending = []
+
+        if os.path.exists(self.legacy_metadata_file):
+            os.remove(self.legacy_metadata_file)  # migrated into metadata.db
+
+        for segment_file in self.list_segments():
+            os.remove(segment_file)
+
+        # Re-open the fresh files so the in-memory tails can be released
+        vectors = MmapFlatIndex.load(self.vectors_file, self.dimension, self.use_mmap)
+        texts = TextStore(self.texts_file, self.offsets_file, self.use_mmap)
+        with self.rw_lock.write():
+            if self.is_flat_index():
+                self.index = vectors
+            self.vectors = vectors
+            self.texts = texts
+
+    def save_index(self):
+        """Save the vector store"""
+        self.checkpoint()
+
+    def load_legacy_index(self, data):
+        """Load a store saved before the memory-mapped layout (texts pickled with the metadata)"""
+        index = faiss.read_index(self.index_file)
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.make_direct_map()  # needed to reconstruct IVF vectors
+        self.vectors = MmapFlatIndex(self.dimension)
+        if index.ntotal:
+            self.vectors.add(index.reconstruct_n(0, index.ntotal))
+        self.index = self.vectors if isinstance(faiss.downcast_index(index), faiss.IndexFlat) else index
+        self.texts = TextStore()
+        self.texts.extend(data['texts'])
+
+    def load_checkpoint(self):
+        """Open the memory-mapped vectors and texts of the last checkpoint"""
+        self.vectors = MmapFlatIndex.load(self.vectors_file, self.dimension, self.use_mmap)
+        self.texts = TextStore(self.texts_file, self.offsets_file, self.use_mmap)
+        self.index = self.vectors
+        if self.index_type != "flat" and os.path.exists(self.index_file):
+            self.load_ann_index()
+
+    def load_index(self, read_only=False):
+        """Load the vector store
+
+        With read_only=True the checkpoint and segments are read as they are: nothing
+        is truncated, migrated or checkpointed (the writing process does that).
+        """
+        migrate = False
+        self.reset_storage()
+
+        if os.path.exists(self.legacy_metadata_file):
+            if read_only:
+                raise RuntimeError("Store has not been migrated from metadata.pkl yet")
+            # Older stores pickled the metadata (and before that the texts too)
+            with open(self.legacy_metadata_file, 'rb') as f:
+                data = pickle.load(f)
+            self.segment_seq = data.get('segment_seq', 0)
+            if 'texts' in data:
+                self.load_legacy_index(data)
+            else:
+                self.load_checkpoint()
+            self.metadata.clear()
+            self.metadata.extend(data['metadata'])
+            migrate = True
+        elif os.path.exists(self.vectors_file):
+            self.segment_seq = int(self.metadata.get_state('checkpoint_seq', 0))
+            self.load_checkpoint()
+
+        # Replay segments written after the checkpoint
+        checkpoint_seq = self.segment_seq
+        for segment_file in self.list_segments():
+            seq = self.segment_number(segment_file)
+            if seq <= checkpoint_seq:
+                continue  # already merged into the checkpoint
+            with open(segment_file, 'rb') as f:
+                segment = pickle.load(f)
+            start_id = segment.get('start_id', self.vectors.ntotal)
+            if start_id < self.vectors.ntotal:
+                continue  # checkpoint was written but the segment not yet removed
+            if not self.is_flat_index():
+                self.ensure_writable_index()
+                self.index.add(segment['embeddings'])
+            self.vectors.add(segment['embeddings'])
+            self.texts.extend(segment['texts'])
+            if not read_only:
+                self.metadata.put(start_id, segment['metadata'])
+            self.segment_seq = seq
+        if read_only:
+            self.tombstones = self.metadata.get_tombstones()
+            return
+        # Drop metadata rows whose vectors never made it to disk
+        self.metadata.truncate(self.vectors.ntotal)
+        self.lexical.truncate(self.vectors.ntotal)
+        if self.lexical.next_id < self.vectors.ntotal:
+            # Stores written before the keyword index existed (or a legacy migration)
+            print(f"Building keyword index for {self.vectors.ntotal - self.lexical.next_id} chunks...")
+            self.lexical.add(self.lexical.next_id,
+                             [self.texts[idx] for idx in range(self.lexical.next_id, self.vectors.ntotal)])
+        self.metadata.commit()
+        self.tombstones = self.metadata.get_tombstones()
+        print(f"Loaded vector store with {len(self)} documents")
+
+        # Migrate an existing flat store to the configured ANN index
+        if self.maybe_train_index() or migrate:
+            self.checkpoint()
+
+    def load_ann_index(self):
+        """Load docs.index, memory-mapping IVF inverted lists when enabled"""
+        if self.use_mmap:
+            self.index = faiss.read_index(self.index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            # Memory-mapped inverted lists are read-only; ensure_writable_index reloads before adds
+            self.index_read_only = faiss.try_extract_index_ivf(self.index) is not None
+        else:
+            self.index = faiss.read_index(self.index_file)
+
+    def delete_document(self, document_id):
+        """Remove every chunk of a document from search results
+
+        The chunks are tombstoned right away; compact() reclaims their space later.
+        Returns the number of chunks deleted.
+        """
+        with self.writing():
+            self.flush_pending()  # pending chunks must be on disk before they can be tombstoned
+            ids = self.metadata.ids_for_document(document_id)
+            self.metadata.delete_document_hash(document_id)
+            self.tombstone(ids)
+
+        if ids:
+            print(f"🗑 Deleted {len(ids)} chunks of '{document_id}'")
+            self.maybe_compact()
+        return len(ids)
+
+    def replace_document(self, document_id, texts, metadatas, embeddings=None, document_hash=None):
+        """Swap the chunks of a document for new ones without a full rebuild"""
+        if embeddings is None:
+            embeddings = self.embed_texts(texts)
+
+        with self.writing():
+            old_ids = self.metadata.ids_for_document(document_id)
+            if not self.add_documents(texts, metadatas, embeddings=embeddings, flush=True):
+                return False
+            if document_hash is not None:
+                self.metadata.set_document_hash(document_id, document_hash, metadatas[0].get('source') if metadatas else None)
+            self.tombstone(old_ids)
+
+        self.maybe_compact()
+        return True
+
+    def get_document_hash(self, document_id):
+        """Content hash of a document as of its last ingest (None if never ingested)"""
+        return self.metadata.get_document_hash(document_id)
+
+    def upsert_document(self, document_id, texts, metadatas, document_hash=None, embeddings=None, flush=True):
+        """Idempotently (re-)ingest a document, embedding only chunks that aren't stored yet
+
+        If document_hash matches the last ingest nothing happens. Otherwise chunks this
+        document already has are kept, chunks whose text is stored under another document
+        reuse that vector, and only the rest are embedded. Chunks that are gone from the
+        document are deleted. Pass embeddings (one row per text) if they were computed
+        already. Returns the number of chunks embedded (here or by the caller), or None if
+        the document was unchanged.
+        """
+        hashes = [content_hash(text) for text in texts]
+
+        # Another writer may change the document while we embed; then start over
+        while True:
+            # Work out which chunks are new
+            with self.writing():
+                if document_hash is not None and self.metadata.get_document_hash(document_id) == document_hash:
+                    print(f"⏭ '{document_id}' is unchanged, skipping")
+                    return None
+
+                self.flush_pending()
+                existing = defaultdict(list)
+                backfill = {}
+                stored_chunks = self.metadata.chunk_hashes_for_document(document_id)
+                for idx, chunk_hash in stored_chunks:
+                    if chunk_hash is None:  # stored before chunks were hashed
+                        chunk_hash = backfill[idx] = content_hash(self.texts[idx])
+                    existing[chunk_hash].append(idx)
+                if backfill:
+                    self.metadata.set_content_hashes(backfill)
+                    stored_chunks = self.metadata.chunk_hashes_for_document(document_id)
+
+                kept = {}  # vector id -> new chunk position
+                new_positions = []
+                for position, chunk_hash in enumerate(hashes):
+                    if existing.get(chunk_hash):
+                        kept[existing[chunk_hash].pop(0)] = position
+                    else:
+                        new_positions.append(position)
+                removed = [idx for ids in existing.values() for idx in ids]
+
+                # Identical chunks stored under other documents already have a vector
+                stored = self.metadata.ids_for_hashes(hashes[p] for p in new_positions)
+                vectors_by_hash = {chunk_hash: self.vectors.reconstruct_n(idx, 1)[0]
+                                   for chunk_hash, idx in stored.items()}
+
+            supplied = set()
+            if embeddings is not None:
+                for position in new_positions:
+                    if hashes[position] not in vectors_by_hash:
+                        vectors_by_hash[hashes[position]] = embeddings[position]
+                        supplied.add(hashes[position])
+
+            # Embed each remaining distinct chunk text once, outside the lock
+            to_embed = {}
+            for position in new_positions:
+                if hashes[position] not in vectors_by_hash:
+                    to_embed.setdefault(hashes[position], texts[position])
+            if to_embed:
+                embedded = self.embed_texts(list(to_embed.values()))
+                vectors_by_hash.update(zip(to_embed.keys(), embedded))
+
+            with self.writing():
+                if self.metadata.chunk_hashes_for_document(document_id) != stored_chunks:
+                    continue  # ids or chunks changed meanwhile (a compaction renumbers them)
+
+                if new_positions:
+                    added = self.add_documents(
+                        [texts[p] for p in new_positions],
+                        [dict(metadatas[p], content_hash=hashes[p]) for p in new_positions],
+                        embeddings=np.array([vectors_by_hash[hashes[p]] for p in new_positions]),
+                        flush=flush
+                    )
+                    if not added:
+                        raise RuntimeError(f"Could not add chunks of '{document_id}' to the index")
+                if kept:
+                    self.metadata.set_chunk_indexes(
+                        {idx: metadatas[position].get('chunk_index', position) for idx, position in kept.items()}
+                    )
+                self.metadata.set_document_hash(
+                    document_id, document_hash, metadatas[0].get('source') if metadatas else None
+                )
+                self.tombstone(removed)
+                if flush:
+                    self.metadata.commit()
+                break
+
+        embedded = len(to_embed) + len(supplied)
+        print(f"📄 '{document_id}': {embedded} chunks embedded, "
+              f"{len(new_positions) - embedded} reused, {len(kept)} unchanged, {len(removed)} removed")
+        if removed:
+            self.maybe_compact()
+        return embedded
+
+    def tombstone(self, ids):
+        """Mark vector ids as deleted (caller holds the lock)"""
+        if not ids:
+            return
+        self.metadata.add_tombstones(ids)
+        self.bump_version()
+        self.metadata.commit()
+        # Swap in a new set so a search that already grabbed the old one isn't affected
+        self.tombstones = self.tombstones | set(ids)
+
+    def has_chunks(self, content_hashes):
+        """Check that every chunk with these content hashes is still in the store"""
+        content_hashes = set(content_hashes)
+        return len(self.metadata.ids_for_hashes(content_hashes)) == len(content_hashes)
+
+    def get_version(self):
+        """Counter that changes whenever chunks are added or deleted
+
+        It is kept in SQLite, so committed changes made through other store
+        instances are visible too.
+        """
+        return int(self.metadata.get_state('version', 0))
+
+    def bump_version(self):
+        """Record that the searchable content changed (caller holds the lock)"""
+        version = self.metadata.increment_state('version')
+        if version == self.loaded_version + 1:
+            # Nobody else wrote in between, so memory still matches the store
+            self.loaded_version = version
+
+    @classmethod
+    def open_reader(cls, store_path="vector_store", **kwargs):
+        """Open a store read-only, creating an empty one first if there is none yet
+
+        For processes that leave writes to the ingestion worker and pick them up
+        with refresh().
+        """
+        if not os.path.exists(os.path.join(store_path, "metadata.db")):
+            cls(store_path=store_path, **kwargs).close()
+        return cls(store_path=store_path, read_only=True, **kwargs)
+
+    def refresh(self):
+        """Reload if another store instance (or process) committed changes since we loaded
+
+        The new state is read while searches keep running on the current one and is
+        swapped in under the write lock. Nothing is written, so any process may call
+        this. Returns True if the store was reloaded.
+        """
+        if self.get_version() == self.loaded_version:
+            return False
+
+        # Never make a search wait for a writer or a compaction; the next one retries
+        if not self.maintenance_lock.acquire(blocking=False):
+            return False
+        if not self.lock.acquire(blocking=False):
+            self.maintenance_lock.release()
+            return False
+        try:
+            if self.get_version() == self.loaded_version or self.write_lock.is_held():
+                return False  # up to date, or our own additions aren't written yet
+            # The writing process holds the lock while it changes files
+            if not self.write_lock.acquire(shared=True, blocking=False):
+                return False
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Error refreshing vector store: {str(e)}")
+                return False
+            finally:
+                self.write_lock.release()
+        finally:
+            self.lock.release()
+            self.maintenance_lock.release()
+        return True
+
+    def reload(self):
+        """Replace the in-memory state with what is on disk (caller holds the lock and write_lock)"""
+        version = self.get_version()
+        fresh = LocalVectorStore(
+            dimension=self.dimension, store_path=self.store_path, index_type=self.index_type,
+            nlist=self.nlist, pq_m=self.pq_m, pq_nbits=self.pq_nbits, hnsw_m=self.hnsw_m,
+            ef_construction=self.ef_construction, nprobe=self.nprobe, ef_search=self.ef_search,
+            train_threshold=self.train_threshold, embedding_model_name=self.embedding_model_name,
+            batch_size=self.batch_size, max_segments=self.max_segments,
+            use_mmap=self.use_mmap, vector_dtype=self.vector_dtype, embedding_cache_size=0,
+            embedding_backend=self.embedding_backend, read_only=True
+        )
+        with self.rw_lock.write():
+            self.vectors = fresh.vectors
+            self.index = fresh.index
+            self.index_read_only = fresh.index_read_only
+            self.texts = fresh.texts
+            self.tombstones = fresh.tombstones
+            self.segment_seq = fresh.segment_seq
+            self.metadata.count = fresh.metadata.count
+            self.lexical.load_totals()
+            self.loaded_version = version
+        fresh.close()
+        print(f"🔄 Reloaded vector store at version {version}: {len(self)} documents")
+
+    def maybe_compact(self):
+        """Start a background compaction once enough of the store is deleted"""
+        if self.vectors.ntotal and len(self.tombstones) >= self.compaction_ratio * self.vectors.ntotal:
+            self.compact(background=True)
+
+    def compact(self, background=False):
+        """Rewrite the store without deleted chunks and renumber the rest
+
+        Copying vectors and texts (and retraining an ANN index) happens without the
+        store lock, so searches and adds keep running; only the final switch-over
+        takes it. With background=True this runs in a daemon thread.
+        """
+        if background:
+            if self.compaction_thread is None or not self.compaction_thread.is_alive():
+                self.compaction_thread = threading.Thread(
+                    target=self.compact, name="vector-store-compaction", daemon=True
+                )
+                self.compaction_thread.start()
+            return self.compaction_thread
+
+        with self.maintenance_lock:
+            # Snapshot the current contents. The write lock is kept until the switch-over
+            # so no other process adds to the files being replaced.
+            with self.lock:
+                self.acquire_write_lock()
+                self.flush_pending()
+                dead = set(self.tombstones)
+                if not dead:
+                    self.release_write_lock()
+                    return False
+                snapshot_count = self.vectors.ntotal
+                vectors = self.vectors.snapshot()
+                texts = self.texts.snapshot()
+                was_trained = not self.is_flat_index()
+
+            try:
+                self.rewrite_compacted(dead, snapshot_count, vectors, texts, was_trained)
+            finally:
+                with self.lock:
+                    self.release_write_lock()
+            print(f"✅ Compaction done. {len(self)} documents remain")
+            return True
+
+    def rewrite_compacted(self, dead, snapshot_count, vectors, texts, was_trained):
+        """Write the store without the dead ids and switch over to it (compact() holds write_lock)"""
+        print(f"🧹 Compacting vector store: dropping {len(dead)} deleted chunks...")
+        keep = np.ones(snapshot_count, dtype=bool)
+        keep[np.fromiter(dead, dtype='int64', count=len(dead))] = False
+        live_count = int(keep.sum())
+
+        # Write the compacted checkpoint next to the current one
+        vectors.save(self.vectors_file + ".compact", dtype=self.vector_dtype, keep=keep)
+        TextStore.write((text for idx, text in enumerate(texts) if keep[idx]),
+                        self.texts_file + ".compact", self.offsets_file + ".compact")
+        new_vectors = MmapFlatIndex.load(self.vectors_file + ".compact", self.dimension, self.use_mmap)
+        new_index = new_vectors
+        if was_trained and (self.index_type == "hnsw" or live_count >= self.train_threshold):
+            new_index = build_index(
+                self.index_type, self.dimension, new_vectors.reconstruct_n(0, new_vectors.ntotal),
+                nlist=self.nlist, pq_m=self.pq_m, pq_nbits=self.pq_nbits,
+                hnsw_m=self.hnsw_m, ef_construction=self.ef_construction
+            )
+            faiss.write_index(new_index, self.index_file + ".compact")
+
+        # Switch over, carrying along anything added meanwhile. Ids are renumbered
+        # on disk here, so searches wait for the whole switch-over.
+        with self.lock, self.rw_lock.write():
+            self.flush_pending()
+            total = self.vectors.ntotal
+            delta_vectors = self.vectors.reconstruct_n(snapshot_count, total - snapshot_count)
+            delta_texts = [self.texts[idx] for idx in range(snapshot_count, total)]
+
+            os.replace(self.vectors_file + ".compact", self.vectors_file)
+            os.replace(self.texts_file + ".compact", self.texts_file)
+            os.replace(self.offsets_file + ".compact", self.offsets_file)
+            if new_index is not new_vectors:
+                os.replace(self.index_file + ".compact", self.index_file)
+            elif os.path.exists(self.index_file):
+                os.remove(self.index_file)  # too few vectors left to keep an IVF index trained
+
+            self.metadata.compact(dead)
+            self.lexical.compact(dead)
+            self.metadata.set_state('checkpoint_seq', self.segment_seq)
+            self.bump_version()  # ids changed, so other processes must reload
+            self.metadata.commit()
+            for segment_file in self.list_segments():
+                os.remove(segment_file)
+
+            self.vectors = new_vectors
+            self.texts = TextStore(self.texts_file, self.offsets_file, self.use_mmap)
+            self.index = new_index
+            self.index_read_only = False
+            self.tombstones = self.metadata.get_tombstones()
+
+            if delta_texts:
+                delta_ids = range(live_count, live_count + len(delta_texts))
+                delta_metadata = self.metadata.get_many(delta_ids)
+                if not self.is_flat_index():
+                    self.index.add(delta_vectors)
+                self.vectors.add(delta_vectors)
+                self.texts.extend(delta_texts)
+                self.pending.append((delta_vectors, delta_texts, [delta_metadata.get(i, {}) for i in delta_ids]))
+                self.flush_pending()
+
+    def clear(self):
+        """Clear all documents"""
+        with self.maintenance_lock, self.writing(), self.rw_lock.write():
+            self.reset_storage()
+            self.lexical.clear()
+            self.metadata.clear()
+            self.tombstones = set()
+            self.bump_version()
+            self.write_checkpoint()
+        print("Vector store cleared")
+
+    def close(self):
+        """Release the database connection and the write lock
+
+        Waits for a background compaction first; it needs both.
+        """
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+        self.search_pool.shutdown(wait=False)
+        self.metadata.close()
+        self.write_lock.close()
+
+    def __len__(self):
+        """Number of live (not deleted) chunks"""
+        return len(self.texts) - len(self.tombstones)
+
+    def get_stats(self):
+        """Get statistics about the vector store"""
+        return {
+            'total_documents': len(self),
+            'deleted_documents': len(self.tombstones),
+            'index_size': self.index.ntotal,
+            'dimension': self.dimension,
+            'index_type': self.index_type,
+            'index_trained': not self.is_flat_index() or self.index_type == "flat",
+            'segments': len(self.list_segments()),
+            'memory_mapped': isinstance(self.vectors.base, np.memmap),
+            'pending_documents': sum(len(item[1]) for item in self.pending),
+            'embedding_cache': self.embedding_cache.get_stats() if self.embedding_cache is not None else None,
+            'lexical_index': self.lexical.get_stats()
+        }
@@ -0,0 +1,340 @@
+import json
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+
+# Metadata keys with their own (indexed) columns; anything else is kept as JSON
+COLUMNS = ("document_id", "source", "chunk_index", "content_hash", "category")
+SELECT_COLUMNS = "id, " + ", ".join(COLUMNS) + ", extra"
+
+CHUNKS_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY,
+    document_id TEXT,
+    source TEXT,
+    chunk_index INTEGER,
+    content_hash TEXT,
+    category TEXT,
+    extra TEXT
+);
+"""
+
+CHUNKS_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_chunks_document_id ON chunks(document_id);
+CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source);
+CREATE INDEX IF NOT EXISTS idx_chunks_content_hash ON chunks(content_hash);
+CREATE INDEX IF NOT EXISTS idx_chunks_category ON chunks(category);
+"""
+
+SCHEMA = CHUNKS_TABLE.format(name="chunks") + """
+CREATE TABLE IF NOT EXISTS store_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS tombstones (
+    id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS documents (
+    document_id TEXT PRIMARY KEY,
+    content_hash TEXT,
+    source TEXT
+);
+"""
+
+# Live chunks only
+NOT_DELETED = "id NOT IN (SELECT id FROM tombstones)"
+
+# Columns search results can be filtered on
+FILTER_COLUMNS = ("document_id", "source", "category")
+
+
+class MetadataStore:
+    """Chunk metadata in SQLite, keyed by vector id and fetched lazily
+
+    Supports len(), store[id] and extend() like the plain list it replaces. Rows
+    written by extend() become durable on commit(), which the vector store calls
+    when it flushes the matching vectors.
+    """
+
+    def __init__(self, db_file, read_only=False):
+        self.db_file = db_file
+        self.read_only = read_only
+        self.lock = threading.RLock()
+        if read_only:
+            # Can't write (or take SQLite's write lock) by accident
+            uri = f"file:{pathname2url(os.path.abspath(db_file))}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock:
+            if not read_only:
+                self.conn.executescript(SCHEMA)
+                self.migrate_schema()
+                self.create_indexes()
+            self.count = self.conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM chunks").fetchone()[0]
+
+    def migrate_schema(self):
+        """Add columns introduced after a database was created"""
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(chunks)")}
+        for column in ("content_hash", "category"):
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE chunks ADD COLUMN {column} TEXT")
+                self.conn.commit()
+
+    def create_indexes(self):
+        for statement in CHUNKS_INDEXES.split(";"):
+            if statement.strip():
+                self.conn.execute(statement)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        row = self.get_many([idx]).get(idx)
+        if row is None:
+            raise IndexError(f"No metadata for vector id {idx}")
+        return row
+
+    def __iter__(self):
+        with self.lock:
+            rows = self.conn.execute(f"SELECT {SELECT_COLUMNS} FROM chunks ORDER BY id").fetchall()
+        for row in rows:
+            yield self.row_to_dict(row)
+
+    def row_to_dict(self, row):
+        """Turn a chunks row back into the original metadata dict"""
+        metadata = {key: value for key, value in zip(COLUMNS, row[1:-1]) if value is not None}
+        if row[-1]:
+            metadata.update(json.loads(row[-1]))
+        return metadata
+
+    def put(self, start_id, metadatas):
+        """Insert (or overwrite) metadata rows for ids start_id, start_id + 1, ..."""
+        rows = []
+        for offset, metadata in enumerate(metadatas):
+            # Chunk text lives in the text store, don't keep a second copy here
+            extra = {k: v for k, v in metadata.items() if k not in COLUMNS and k != "text"}
+            rows.append(
+                (start_id + offset,)
+                + tuple(metadata.get(column) for column in COLUMNS)
+                + (json.dumps(extra) if extra else None,)
+            )
+        placeholders = ", ".join("?" * (len(COLUMNS) + 2))
+        with self.lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO chunks ({SELECT_COLUMNS}) VALUES ({placeholders})", rows
+            )
+            self.count = max(self.count, start_id + len(rows))
+
+    def extend(self, metadatas):
+        """Append metadata rows after the last id"""
+        self.put(self.count, metadatas)
+
+    def get_many(self, ids):
+        """Fetch metadata for several vector ids with one query"""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {SELECT_COLUMNS} FROM chunks WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        return {row[0]: self.row_to_dict(row) for row in rows}
+
+    def ids_for_document(self, document_id):
+        """Vector ids of every live chunk of a document"""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id FROM chunks WHERE document_id = ? AND {NOT_DELETED} ORDER BY id",
+                (document_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def ids_matching(self, filters):
+        """Vector ids of every live chunk matching all filters, in id order
+
+        filters maps a FILTER_COLUMNS name to a value or a list of accepted values,
+        e.g. {"document_id": "handbook"} or {"category": ["hr_policy", "finance"]}.
+        """
+        clauses, params = [], []
+        for column, values in filters.items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Cannot filter on '{column}' (use one of {', '.join(FILTER_COLUMNS)})")
+            values = [values] if isinstance(values, str) else list(values)
+            clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+        clauses.append(NOT_DELETED)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id FROM chunks WHERE {' AND '.join(clauses)} ORDER BY id", params
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def document_ids(self):
+        """Distinct document ids with live chunks in the store"""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT DISTINCT document_id FROM chunks WHERE {NOT_DELETED}"
+            ).fetchall()
+        return [row[0] for row in rows if row[0] is not None]
+
+    def chunk_hashes_for_document(self, document_id):
+        """(id, content_hash) of every live chunk of a document, in id order"""
+        with self.lock:
+            return self.conn.execute(
+                f"SELECT id, content_hash FROM chunks WHERE document_id = ? AND {NOT_DELETED} ORDER BY id",
+                (document_id,)
+            ).fetchall()
+
+    def ids_for_hashes(self, content_hashes):
+        """Map each content hash that's already stored (in any document) to one live vector id"""
+        content_hashes = list(set(content_hashes))
+        found = {}
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(content_hashes), 500):
+                batch = content_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT content_hash, MIN(id) FROM chunks WHERE content_hash IN ({placeholders}) "
+                    f"AND {NOT_DELETED} GROUP BY content_hash", batch
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def set_content_hashes(self, hashes_by_id):
+        """Fill in content hashes for rows written before hashing existed"""
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE chunks SET content_hash = ? WHERE id = ?",
+                ((content_hash, int(idx)) for idx, content_hash in hashes_by_id.items())
+            )
+
+    def set_chunk_indexes(self, chunk_indexes_by_id):
+        """Update the position of chunks that were kept across a re-ingest"""
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE chunks SET chunk_index = ? WHERE id = ?",
+                ((chunk_index, int(idx)) for idx, chunk_index in chunk_indexes_by_id.items())
+            )
+
+    def get_document_hash(self, document_id):
+        """Content hash recorded the last time a document was ingested"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content_hash FROM documents WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_document_hash(self, document_id, content_hash, source=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents (document_id, content_hash, source) VALUES (?, ?, ?)",
+                (document_id, content_hash, source)
+            )
+
+    def delete_document_hash(self, document_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+
+    def add_tombstones(self, ids):
+        """Mark vector ids as deleted (durable on the next commit)"""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tombstones (id) VALUES (?)", ((int(i),) for i in ids)
+            )
+
+    def get_tombstones(self):
+        """Set of deleted vector ids"""
+        with self.lock:
+            rows = self.conn.execute("SELECT id FROM tombstones").fetchall()
+        return {row[0] for row in rows}
+
+    def compact(self, dead_ids):
+        """Drop the rows of dead_ids and renumber the rest to 0..n-1, keeping their order
+
+        Tombstones that are not in dead_ids (chunks deleted while a compaction was
+        running) are carried over under their new ids. The caller commits.
+        """
+        with self.lock:
+            conn = self.conn
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS compact_dead (id INTEGER PRIMARY KEY)")
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS id_map (old_id INTEGER PRIMARY KEY, new_id INTEGER)")
+            conn.execute("DELETE FROM compact_dead")
+            conn.execute("DELETE FROM id_map")
+            conn.executemany("INSERT INTO compact_dead (id) VALUES (?)", ((int(i),) for i in dead_ids))
+            conn.execute(
+                "INSERT INTO id_map (old_id, new_id) "
+                "SELECT id, ROW_NUMBER() OVER (ORDER BY id) - 1 FROM chunks "
+                "WHERE id NOT IN (SELECT id FROM compact_dead)"
+            )
+
+            conn.execute("DROP TABLE IF EXISTS chunks_new")
+            conn.execute(CHUNKS_TABLE.format(name="chunks_new"))
+            conn.execute(
+                f"INSERT INTO chunks_new ({SELECT_COLUMNS}) "
+                "SELECT m.new_id, " + "".join(f"c.{column}, " for column in COLUMNS) + "c.extra "
+                "FROM chunks c JOIN id_map m ON m.old_id = c.id"
+            )
+            conn.execute("DROP TABLE chunks")
+            conn.execute("ALTER TABLE chunks_new RENAME TO chunks")
+            self.create_indexes()
+
+            remaining = conn.execute(
+                "SELECT m.new_id FROM tombstones t JOIN id_map m ON m.old_id = t.id "
+                "WHERE t.id NOT IN (SELECT id FROM compact_dead)"
+            ).fetchall()
+            conn.execute("DELETE FROM tombstones")
+            conn.executemany("INSERT INTO tombstones (id) VALUES (?)", remaining)
+
+            self.count = conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM chunks").fetchone()[0]
+
+    def get_state(self, key, default=None):
+        """Read a value from the store_state table"""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM store_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key, value):
+        """Write a value to the store_state table (durable on the next commit)"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO store_state (key, value) VALUES (?, ?)", (key, str(value))
+            )
+
+    def increment_state(self, key):
+        """Atomically add one to an integer value in store_state and return the new value"""
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO store_state (key, value) VALUES (?, '0')", (key,))
+            self.conn.execute(
+                "UPDATE store_state SET value = CAST(value AS INTEGER) + 1 WHERE key = ?", (key,)
+            )
+            row = self.conn.execute("SELECT value FROM store_state WHERE key = ?", (key,)).fetchone()
+        return int(row[0])
+
+    def truncate(self, count):
+        """Delete rows (and tombstones) with ids >= count"""
+        with self.lock:
+            self.conn.execute("DELETE FROM chunks WHERE id >= ?", (count,))
+            self.conn.execute("DELETE FROM tombstones WHERE id >= ?", (count,))
+            self.count = min(self.count, count)
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def clear(self):
+        """Delete every metadata row"""
+        with self.lock:
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM tombstones")
+            self.conn.execute("DELETE FROM documents")
+            self.conn.commit()
+            self.count = 0
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Inference backends: "torch" (fp32), "int8" (dynamic quantization) and, for
+# embeddings, "onnx" (ONNX Runtime, pip install -r requirements-onnx.txt).
+# Defaults can be set in the environment.
+BACKENDS = ("torch", "int8", "onnx")
+DEFAULT_EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+DEFAULT_GENERATION_BACKEND = os.getenv("GENERATION_BACKEND", "torch")
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "onnx_models")
+
+# Process-wide cache of loaded models, keyed by name
+_models = {}
+_model_stats = {}
+_registry_lock = threading.Lock()
+_model_locks = {}
+_num_threads = None
+
+
+def _current_rss_bytes():
+    """Resident set size of this process (0 if it can't be read)"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def _parameter_bytes(model):
+    """Bytes held by a torch model's parameters and buffers"""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+    except AttributeError:
+        return 0
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def get_model(name, loader):
+    """Return the model registered under name, loading it once with loader()"""
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        model_lock = _model_locks.setdefault(name, threading.Lock())
+
+    # Only one thread loads a given model; others wait and reuse it
+    with model_lock:
+        model = _models.get(name)
+        if model is not None:
+            return model
+
+        print(f"Loading model {name}...")
+        rss_before = _current_rss_bytes()
+        start = time.time()
+        model = loader()
+        _model_stats[name] = {
+            'load_seconds': round(time.time() - start, 2),
+            'parameter_mb': round(_parameter_bytes(model) / 1024 ** 2, 1),
+            'rss_delta_mb': round(max(0, _current_rss_bytes() - rss_before) / 1024 ** 2, 1),
+        }
+        _models[name] = model
+        print(f"✅ Model {name} loaded ({_model_stats[name]['parameter_mb']} MB)")
+        return model
+
+
+def set_num_threads(num_threads=None):
+    """Limit the threads torch (and ONNX Runtime sessions created later) use
+
+    Defaults to the TORCH_NUM_THREADS environment variable; does nothing if unset.
+    """
+    global _num_threads
+    num_threads = num_threads or int(os.getenv("TORCH_NUM_THREADS", "0"))
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+        _num_threads = num_threads
+    return _num_threads
+
+
+def model_key(name, backend="torch"):
+    """Registry key of a model loaded with a given backend"""
+    return name if backend == "torch" else f"{name}@{backend}"
+
+
+def quantize_int8(model):
+    """Dynamically quantize the Linear layers of a torch model to int8"""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxSentenceEncoder:
+    """SentenceTransformer-compatible encode() running the transformer in ONNX Runtime
+
+    The model is exported to ONNX on first use and cached under ONNX_CACHE_DIR.
+    Token embeddings are mean-pooled like the sentence-transformers models we use.
+    """
+
+    def __init__(self, model_name, cache_dir=ONNX_CACHE_DIR, num_threads=None):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        onnx_file = os.path.join(cache_dir, model_name.replace("/", "__") + ".onnx")
+        if not os.path.exists(onnx_file):
+            self.export(model_name, onnx_file)
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(onnx_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def export(self, model_name, onnx_file):
+        import torch
+        from transformers import AutoModel
+
+        print(f"Exporting {model_name} to ONNX...")
+        os.makedirs(os.path.dirname(onnx_file), exist_ok=True)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = self.tokenizer(["export sample"], return_tensors="pt")
+        tmp_file = onnx_file + ".tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                model, (sample["input_ids"], sample["attention_mask"]), tmp_file,
+                input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+                dynamic_axes={name: {0: "batch", 1: "sequence"}
+                              for name in ("input_ids", "attention_mask", "last_hidden_state")},
+                opset_version=14
+            )
+        os.replace(tmp_file, onnx_file)
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        import numpy as np
+
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            inputs = self.tokenizer(sentences[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=384, return_tensors="np")
+            feed = {name: inputs[name].astype("int64") for name in self.input_names}
+            token_embeddings = self.session.run(None, feed)[0]
+            # Mean pooling over real (non-padding) tokens
+            mask = inputs["attention_mask"][..., None].astype("float32")
+            batches.append((token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None))
+
+        embeddings = np.vstack(batches) if batches else np.zeros((0, 0), dtype="float32")
+        return embeddings[0] if single else embeddings
+
+
+def get_embedding_model(model_name=DEFAULT_EMBEDDING_MODEL, backend=None):
+    """Shared embedding model for model_name, loaded with the given inference backend"""
+    backend = backend or DEFAULT_EMBEDDING_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose one of {BACKENDS}")
+
+    def load():
+        set_num_threads()
+        if backend == "onnx":
+            return OnnxSentenceEncoder(model_name, num_threads=_num_threads)
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+        return quantize_int8(model) if backend == "int8" else model
+
+    return get_model(model_key(model_name, backend), load)
+
+
+def get_cross_encoder(model_name=DEFAULT_RERANKER_MODEL, backend=None):
+    """Shared cross-encoder (reranking) model, loaded with the "torch" or "int8" backend"""
+    backend = backend or DEFAULT_EMBEDDING_BACKEND
+    if backend not in ("torch", "int8"):
+        raise ValueError(f"Unsupported reranker backend '{backend}'. Choose 'torch' or 'int8'")
+
+    def load():
+        set_num_threads()
+        from sentence_transformers import CrossEncoder
+        model = CrossEncoder(model_name, max_length=512, device="cpu")
+        if backend == "int8":
+            model.model = quantize_int8(model.model)
+        return model
+
+    return get_model(model_key(model_name, backend), load)
+
+
+def is_loaded(name):
+    """Check whether a model has already been loaded"""
+    return name in _models
+
+
+def get_model_stats():
+    """Memory and load-time statistics for every loaded model"""
+    return {
+        'models': {name: dict(info) for name, info in _model_stats.items()},
+        'process_rss_mb': round(_current_rss_bytes() / 1024 ** 2, 1)
+    }
@@ -1,294 +1,518 @@
-import os
-from local_vector_store import LocalVectorStore
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
-import torch
-from dotenv import load_dotenv
-
-load_dotenv()
-
-class QueryEngine:
-    def __init__(self):
-        # Initialize local vector store
-        print("Loading vector store for search...")
-        self.vector_store = LocalVectorStore()
-        
-        # Initialize text generation model (runs locally!)
-        print("Loading text generation model...")
-        model_name = "facebook/blenderbot-400M-distill"  # Good for Q&A
-        
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForCausalLM.from_pretrained(model_name)
-        
-        # Add padding token if not present
-        if self.tokenizer.pad_token is None:
-            self.tokenizer.pad_token = self.tokenizer.eos_token
-        
-        print("Models loaded successfully!")
-
-    def search_documents(self, question, top_k=5):
-        """Search for relevant documents using the question"""
-        try:
-            # Preprocess the question for better search results
-            processed_question = self.preprocess_question(question)
-
-            # Lower threshold to be more inclusive
-            #search_results = self.vector_store.search(processed_question, k=top_k, score_threshold=0.1)
-            # Updated threshold strategy
-            search_results = self.vector_store.search(processed_question, k=top_k, score_threshold=0.45)
-
-            # Optional fallback for edge cases
-            if len(search_results) == 0:
-                print("⚠️ No results found with high threshold. Trying relaxed search...")
-                search_results = self.vector_store.search(processed_question, k=top_k, score_threshold=0.3)
-
-
-            # Format results
-            relevant_chunks = []
-            for result in search_results:
-                relevant_chunks.append({
-                    'text': result['text'],
-                    'source': result['metadata'].get('source', 'unknown.txt'),  # FIXED
-                    'score': result['score']
-                })
-
-
-            return relevant_chunks
-
-        except Exception as e:
-            print(f"Error searching documents: {str(e)}")
-            return []
-
-    def generate_answer_simple(self, question, relevant_chunks):
-        """Generate a simple answer using template matching (fallback)"""
-        if not relevant_chunks:
-            return "⚠️ I couldn't find relevant information to answer your question. Please try rephrasing or ensure the document is loaded."
-
-        # Combine relevant context
-        context = "\n\n".join([chunk['text'] for chunk in relevant_chunks])
-        context_lower = context.lower()
-        question_lower = question.lower()
-
-        # Helper function to match any keyword
-        def match_keywords(keywords):
-            return any(keyword in question_lower for keyword in keywords)
-
-        def keywords_in_context(keywords):
-            return any(keyword in context_lower for keyword in keywords)
-
-        # Template responses based on category
-        if match_keywords(["vacation", "time off", "pto"]):
-            if keywords_in_context(["vacation", "time off", "pto"]):
-                if "15 days" in context or "20 vacation days" in context:
-                    answer = "Based on our company policy, full-time employees are entitled to 15–20 days of paid vacation per year. Vacation must be requested 2 weeks in advance through the HR portal. Up to 5 days may be carried over."
-                else:
-                    answer = f"📌 Vacation Policy:\n{context[:400]}..."
-            else:
-                answer = "⚠️ Vacation policy information was not clearly found in the current documents."
-
-        elif match_keywords(["expense", "reimburse", "travel", "cost"]):
-            if keywords_in_context(["expense", "reimburse", "travel"]):
-                answer = "For expense reimbursement, submit expenses within 30 days with receipts. Covered items include travel, meals, and lodging. Use the finance portal to submit requests."
-            else:
-                answer = "⚠️ Expense policy details were not located in the context."
-
-        elif match_keywords(["it", "tech", "support", "help", "technical", "computer"]):
-            if keywords_in_context(["support", "help", "tech", "it", "portal"]):
-                answer = "For IT support, contact help@techcorp.com or call (555) 123-TECH. The emergency IT line (555-911-TECH) is available 24/7. Visit portal.techcorp.com for routine requests."
-            else:
-                answer = "⚠️ No IT support details found in the matched content."
-
-        elif match_keywords(["remote", "work from home", "telework"]):
-            if keywords_in_context(["remote", "work from home", "telework"]):
-                answer = "Employees can work remotely up to 3 days per week with manager approval. A stable internet connection is required. Video call attire should remain professional."
-            else:
-                answer = "⚠️ Remote work information is missing in the current search result."
-
-        elif match_keywords(["holiday", "public holiday", "office closed"]):
-            if keywords_in_context(["holiday", "new year's day", "thanksgiving"]):
-                answer = f"📆 Company Holidays:\n{context[:400]}..."
-            else:
-                answer = "⚠️ Couldn't find holiday details in the current documents."
-
-        elif match_keywords(["dress code", "attire", "what to wear"]):
-            if keywords_in_context(["dress", "attire", "jeans", "business casual"]):
-                answer = f"👔 Dress Code Policy:\n{context[:400]}..."
-            else:
-                answer = "⚠️ Dress code policy was not clearly found. Please verify the document includes this section."
-
-        elif match_keywords(["sick leave", "sick days", "illness", "health"]):
-            if keywords_in_context(["sick", "illness", "doctor"]):
-                answer = f"🤒 Sick Leave Policy:\n{context[:400]}..."
-            else:
-                answer = "⚠️ Sick leave details were not located in the current content."
-
-        elif match_keywords(["performance review", "appraisal", "evaluation", "check-in"]):
-            if keywords_in_context(["review", "check-in", "evaluation", "goal setting"]):
-                answer = f"📈 Performance Review Schedule:\n{context[:400]}..."
-            else:
-                answer = "⚠️ No performance review information found in the matched content."
-
-        elif match_keywords(["who", "contact", "call", "email"]):
-            if keywords_in_context(["email", "contact", "call", "@", "phone"]):
-                answer = f"📞 Contact Info:\n{context[:400]}..."
-            else:
-                answer = "⚠️ Contact details not found in the current document sections."
-
-        else:
-            # Use top chunk for fallback
-            top_chunk = relevant_chunks[0]
-            source_name = os.path.basename(top_chunk.get('source', 'unknown.txt'))
-            answer = f"{top_chunk['text'][:300]}...\n\n📚 Source: {source_name}"
-
-
-        # Add source information
-        sources = list(set(chunk.get('source', 'unknown.txt') for chunk in relevant_chunks))
-        if sources:
-            source_names = [os.path.basename(src) for src in sources]
-            answer += f"\n\n📚 Sources: {', '.join(source_names)}"
-
-        return answer
-
-
-    def ask_question(self, question, use_advanced=False):
-        """Main method to ask a question and get an answer"""
-        print(f"Question: {question}")
-
-        # Search with high threshold first
-        relevant_chunks = self.vector_store.search(
-            self.preprocess_question(question),
-            k=5,
-            score_threshold=0.45
-        )
-
-        # Relax threshold only if no results
-        if not relevant_chunks:
-            print("⚠️ No high-confidence matches found. Trying relaxed threshold...")
-            relevant_chunks = self.vector_store.search(
-                self.preprocess_question(question),
-                k=5,
-                score_threshold=0.3
-            )
-
-        print(f"Found {len(relevant_chunks)} relevant chunks")
-
-        if not relevant_chunks:
-            return "⚠️ Sorry, I couldn't find a confident answer to your question. Try rephrasing or check if the document is loaded."
-
-        # Warn if low match score
-        if relevant_chunks[0]['score'] < 0.45:
-            print("⚠️ Warning: Top result has a low confidence score.")
-
-        # Answer generation
-        try:
-            if use_advanced:
-                answer = self.generate_answer_advanced(question, relevant_chunks)
-            else:
-                answer = self.generate_answer_simple(question, relevant_chunks)
-        except Exception as e:
-            print(f"⚠️ Error generating answer: {str(e)}. Falling back to simple method.")
-            answer = self.generate_answer_simple(question, relevant_chunks)
-
-        return answer
-
-
-
-    def generate_answer_advanced(self, question, relevant_chunks):
-        """Generate answer using HuggingFace model with RAG prompt"""
-        if not relevant_chunks:
-            return self.generate_answer_simple(question, relevant_chunks)
-        
-        try:
-            # Combine top 3 chunks for richer context
-            top_chunks = relevant_chunks[:3]
-            context = "\n\n".join([chunk['text'].strip() for chunk in top_chunks])
-            
-            # Improved RAG-style prompt
-            prompt = f"""
-    You are an assistant answering questions based on the provided company documentation.
-
-    Context:
-    {context}
-
-    Question: {question}
-    Answer:"""
-
-            # Tokenize prompt
-            inputs = self.tokenizer.encode(prompt, return_tensors="pt", max_length=1024, truncation=True)
-
-            # Create Attention Mask
-            attention_mask = (inputs != 0).long()  # Create attention mask
-
-            # Generate output
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    inputs,
-                    attention_mask=attention_mask,  # Pass the attention mask
-                    max_length=inputs.shape[1] + 100,
-                    temperature=0.7,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    do_sample=True
-                )
-
-            # Decode model output
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-
-            # Extract answer after "Answer:" or fallback
-            if "Answer:" in response:
-                answer = response.split("Answer:")[-1].strip()
-            else:
-                answer = response[len(prompt):].strip()
-
-            # Fallback to simple generation if the model fails
-            if len(answer) < 10:
-                return self.generate_answer_simple(question, relevant_chunks)
-
-            # Append sources
-            sources = list(set([chunk['source'] for chunk in relevant_chunks]))
-            if sources:
-                source_names = [os.path.basename(src) for src in sources]
-                answer += f"\n\n📚 Sources: {', '.join(source_names)}"
-
-            return answer
-
-        except Exception as e:
-            print(f"Error with advanced generation, falling back to simple: {str(e)}")
-            return self.generate_answer_simple(question, relevant_chunks)
-
-    
-    def get_vector_store_stats(self):
-        """Get vector store statistics"""
-        return self.vector_store.get_stats()
-            
-    # Add to query_engine.py for better question understanding
-    def preprocess_question(self, question):
-        """Preprocess question for better search results"""
-        # Expand common abbreviations
-        abbreviations = {
-            "PTO": "paid time off vacation",
-            "HR": "human resources",
-            "IT": "information technology technical support",
-            "FAQ": "frequently asked questions",
-        }
-        
-        processed_question = question
-        for abbrev, expansion in abbreviations.items():
-            processed_question = processed_question.replace(abbrev, expansion)
-        
-        return processed_question
-
-    def get_question_category(self, question):
-        """Categorize question to improve search strategy"""
-        question_lower = question.lower()
-        
-        categories = {
-            'hr_policy': ['vacation', 'leave', 'benefits', 'policy', 'hr'],
-            'it_support': ['password', 'login', 'computer', 'software', 'it', 'technical'],
-            'finance': ['expense', 'reimburse', 'budget', 'cost', 'payment'],
-            'general': []
-        }
-        
-        for category, keywords in categories.items():
-            if any(keyword in question_lower for keyword in keywords):
-                return category
-        
-        return 'general'
+import os
+from local_vector_store import LocalVectorStore
+from document_processor import categorize_text
+from model_registry import (get_model, get_model_stats, is_loaded, model_key, quantize_int8, set_num_threads,
+                            DEFAULT_EMBEDDING_BACKEND, DEFAULT_GENERATION_BACKEND)
+from answer_cache import AnswerCache, SemanticAnswerCache
+from reranker import Reranker
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Confidence bands for retrieval, most confident first
+SEARCH_THRESHOLDS = (0.45, 0.3)
+
+NO_ANSWER = "⚠️ Sorry, I couldn't find a confident answer to your question. Try rephrasing or check if the document is loaded."
+
+class QueryEngine:
+    def __init__(self, vector_store=None, answer_cache_size=256, answer_cache_ttl=3600, answer_cache_path=None,
+                 semantic_cache_size=512, semantic_cache_threshold=0.9,
+                 generation_batch_size=8, generation_max_wait_ms=20, generation_backend=None,
+                 hybrid_search=True, category_filter=False,
+                 rerank=False, rerank_candidates=50, rerank_budget_ms=300, rerank_min_score=0.0):
+        # Initialize local vector store (pass one in to share it with a DocumentProcessor)
+        if vector_store is None:
+            print("Loading vector store for search...")
+            vector_store = LocalVectorStore()
+        self.vector_store = vector_store
+        # Combine dense search with BM25 so exact terms (VPN, $500, phone numbers) are found
+        self.hybrid_search = hybrid_search
+        # Opt-in: search only chunks of the question's guessed category first (e.g. finance
+        # questions scan the finance chunks), falling back to everything. The guess is a
+        # keyword count, and a miss costs a second search, so it is off by default
+        self.category_filter = category_filter
+
+        # Optional second stage: a cross-encoder reorders the top rerank_candidates
+        # search results, spending at most rerank_budget_ms per question
+        self.reranker = Reranker(budget_ms=rerank_budget_ms) if rerank else None
+        self.rerank_candidates = rerank_candidates
+        # Reranked chunks scoring below this are left out of the generation prompt
+        self.rerank_min_score = rerank_min_score
+
+        # Answers to repeated questions; answer_cache_path adds an on-disk tier
+        self.answer_cache = AnswerCache(max_entries=answer_cache_size, ttl_seconds=answer_cache_ttl,
+                                        disk_path=answer_cache_path)
+        # Answers to differently worded versions of earlier questions (size 0 disables)
+        self.semantic_cache = None
+        if semantic_cache_size:
+            self.semantic_cache = SemanticAnswerCache(self.vector_store.dimension,
+                                                      threshold=semantic_cache_threshold,
+                                                      max_entries=semantic_cache_size)
+        
+        # Text generation model (runs locally!), loaded the first time advanced mode is used
+        self.model_name = "facebook/blenderbot-400M-distill"  # Good for Q&A
+
+        # "int8" quantizes the Linear layers dynamically; ONNX export is only
+        # supported for the embedding model
+        self.generation_backend = generation_backend or DEFAULT_GENERATION_BACKEND
+        if self.generation_backend not in ("torch", "int8"):
+            raise ValueError(f"Unsupported generation backend '{self.generation_backend}'. Choose 'torch' or 'int8'")
+        self.generation_batch_size = generation_batch_size
+        self.generation_max_wait_ms = generation_max_wait_ms
+
+    # Models are shared with every other QueryEngine in this process
+
+    @property
+    def tokenizer(self):
+        """Tokenizer of the generation model, loaded on first use"""
+        def load():
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            # Add padding token if not present
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            return tokenizer
+
+        return get_model(f"{self.model_name}:tokenizer", load)
+
+    @property
+    def model(self):
+        """Generation model, loaded on first use"""
+        def load():
+            from transformers import AutoModelForCausalLM
+            set_num_threads()
+            model = AutoModelForCausalLM.from_pretrained(self.model_name)
+            return quantize_int8(model) if self.generation_backend == "int8" else model
+
+        return get_model(model_key(self.model_name, self.generation_backend), load)
+
+    @property
+    def scheduler(self):
+        """Batches concurrent advanced-mode generations into one generate() call
+
+        Process-wide like the model; the settings of the first engine apply.
+        """
+        def load():
+            from generation_scheduler import GenerationScheduler
+            return GenerationScheduler(
+                self.model, self.tokenizer,
+                max_batch_size=self.generation_batch_size,
+                max_wait_ms=self.generation_max_wait_ms,
+                temperature=0.7,
+                do_sample=True
+            )
+
+        return get_model(f"{model_key(self.model_name, self.generation_backend)}:scheduler", load)
+
+    def warm_up(self, include_generation=False):
+        """Load the models in a background thread so the first question doesn't wait"""
+        def load():
+            self.vector_store.embeddings_model
+            if include_generation:
+                self.scheduler
+
+        if self.reranker is not None:
+            self.reranker.warm_up()
+
+        loaded = is_loaded(model_key(self.vector_store.embedding_model_name,
+                                     self.vector_store.embedding_backend or DEFAULT_EMBEDDING_BACKEND))
+        if include_generation:
+            loaded = loaded and is_loaded(f"{model_key(self.model_name, self.generation_backend)}:scheduler")
+        if loaded:
+            return None
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    def search_documents(self, question, top_k=5, filters=None):
+        """Search for relevant documents using the question
+
+        filters limits the search to matching chunks, e.g. {'document_id': 'expense_policy'}.
+        """
+        try:
+            self.vector_store.refresh()
+            search_results = self.find_chunks(question, top_k, filters=filters)
+
+
+            # Format results
+            relevant_chunks = []
+            for result in search_results:
+                relevant_chunks.append({
+                    'text': result['text'],
+                    'source': result['metadata'].get('source', 'unknown.txt'),  # FIXED
+                    'score': result['score'],
+                    'rerank_score': result.get('rerank_score')
+                })
+
+
+            return relevant_chunks
+
+        except Exception as e:
+            print(f"Error searching documents: {str(e)}")
+            return []
+
+    def find_chunks(self, question, k, filters=None, question_embedding=None):
+        """Best k chunks for a question: the most confident search band, reranked if enabled"""
+        # Preprocess the question for better search results
+        processed_question = self.preprocess_question(question)
+        if self.reranker is None:
+            # One search, results grouped into high (0.45) and relaxed (0.3) confidence bands
+            return self.pick_band(self.search_bands(processed_question, k, filters, question_embedding))
+
+        candidates = self.pick_band(self.search_bands(processed_question, max(k, self.rerank_candidates),
+                                                      filters, question_embedding))
+        return self.reranker.rerank(question, candidates, k)
+
+    def search_bands(self, processed_question, k, filters=None, question_embedding=None):
+        """search_tiered() over the chunks matching filters, or the question's category if none are given
+
+        A category search without high-confidence results is repeated over every chunk.
+        The query embedding is cached, but the index and BM25 searches both run again.
+        """
+        def search(filters):
+            return self.vector_store.search_tiered(processed_question, k=k, thresholds=SEARCH_THRESHOLDS,
+                                                   query_embedding=question_embedding,
+                                                   hybrid=self.hybrid_search, filters=filters)
+
+        if filters is None and self.category_filter:
+            category = self.get_question_category(processed_question)
+            if category != 'general':
+                bands = search({'category': category})
+                if bands[SEARCH_THRESHOLDS[0]]:
+                    print(f"🏷️ Searched '{category}' chunks")
+                    return bands
+        return search(filters)
+
+    def pick_band(self, bands):
+        """Results of the most confident non-empty band from search_tiered"""
+        for band, (threshold, results) in enumerate(bands.items()):
+            if results:
+                if band > 0:
+                    print(f"⚠️ No high-confidence matches found. Using results above {threshold}")
+                return results
+        return []
+
+    def generate_answer_simple(self, question, relevant_chunks):
+        """Generate a simple answer using template matching (fallback)"""
+        if not relevant_chunks:
+            return "⚠️ I couldn't find relevant information to answer your question. Please try rephrasing or ensure the document is loaded."
+
+        # Combine relevant context
+        context = "\n\n".join([chunk['text'] for chunk in relevant_chunks])
+        context_lower = context.lower()
+        question_lower = question.lower()
+
+        # Helper function to match any keyword
+        def match_keywords(keywords):
+            return any(keyword in question_lower for keyword in keywords)
+
+        def keywords_in_context(keywords):
+            return any(keyword in context_lower for keyword in keywords)
+
+        # Template responses based on category
+        if match_keywords(["vacation", "time off", "pto"]):
+            if keywords_in_context(["vacation", "time off", "pto"]):
+                if "15 days" in context or "20 vacation days" in context:
+                    answer = "Based on our company policy, full-time employees are entitled to 15–20 days of paid vacation per year. Vacation must be requested 2 weeks in advance through the HR portal. Up to 5 days may be carried over."
+                else:
+                    answer = f"📌 Vacation Policy:\n{context[:400]}..."
+            else:
+                answer = "⚠️ Vacation policy information was not clearly found in the current documents."
+
+        elif match_keywords(["expense", "reimburse", "travel", "cost"]):
+            if keywords_in_context(["expense", "reimburse", "travel"]):
+                answer = "For expense reimbursement, submit expenses within 30 days with receipts. Covered items include travel, meals, and lodging. Use the finance portal to submit requests."
+            else:
+                answer = "⚠️ Expense policy details were not located in the context."
+
+        elif match_keywords(["it", "tech", "support", "help", "technical", "computer"]):
+            if keywords_in_context(["support", "help", "tech", "it", "portal"]):
+                answer = "For IT support, contact help@techcorp.com or call (555) 123-TECH. The emergency IT line (555-911-TECH) is available 24/7. Visit portal.techcorp.com for routine requests."
+            else:
+                answer = "⚠️ No IT support details found in the matched content."
+
+        elif match_keywords(["remote", "work from home", "telework"]):
+            if keywords_in_context(["remote", "work from home", "telework"]):
+                answer = "Employees can work remotely up to 3 days per week with manager approval. A stable internet connection is required. Video call attire should remain professional."
+            else:
+                answer = "⚠️ Remote work information is missing in the current search result."
+
+        elif match_keywords(["holiday", "public holiday", "office closed"]):
+            if keywords_in_context(["holiday", "new year's day", "thanksgiving"]):
+                answer = f"📆 Company Holidays:\n{context[:400]}..."
+            else:
+                answer = "⚠️ Couldn't find holiday details in the current documents."
+
+        elif match_keywords(["dress code", "attire", "what to wear"]):
+            if keywords_in_context(["dress", "attire", "jeans", "business casual"]):
+                answer = f"👔 Dress Code Policy:\n{context[:400]}..."
+            else:
+                answer = "⚠️ Dress code policy was not clearly found. Please verify the document includes this section."
+
+        elif match_keywords(["sick leave", "sick days", "illness", "health"]):
+            if keywords_in_context(["sick", "illness", "doctor"]):
+                answer = f"🤒 Sick Leave Policy:\n{context[:400]}..."
+            else:
+                answer = "⚠️ Sick leave details were not located in the current content."
+
+        elif match_keywords(["performance review", "appraisal", "evaluation", "check-in"]):
+            if keywords_in_context(["review", "check-in", "evaluation", "goal setting"]):
+                answer = f"📈 Performance Review Schedule:\n{context[:400]}..."
+            else:
+                answer = "⚠️ No performance review information found in the matched content."
+
+        elif match_keywords(["who", "contact", "call", "email"]):
+            if keywords_in_context(["email", "contact", "call", "@", "phone"]):
+                answer = f"📞 Contact Info:\n{context[:400]}..."
+            else:
+                answer = "⚠️ Contact details not found in the current document sections."
+
+        else:
+            # Use top chunk for fallback
+            top_chunk = relevant_chunks[0]
+            source_name = os.path.basename(top_chunk.get('source', 'unknown.txt'))
+            answer = f"{top_chunk['text'][:300]}...\n\n📚 Source: {source_name}"
+
+
+        # Add source information
+        sources = list(set(chunk.get('source', 'unknown.txt') for chunk in relevant_chunks))
+        if sources:
+            source_names = [os.path.basename(src) for src in sources]
+            answer += f"\n\n📚 Sources: {', '.join(source_names)}"
+
+        return answer
+
+
+    def ask_question(self, question, use_advanced=False):
+        """Main method to ask a question and get an answer"""
+        print(f"Question: {question}")
+
+        answer, version, question_embedding = self.lookup_cached_answer(question, use_advanced)
+        if answer is not None:
+            return answer
+
+        relevant_chunks = self.retrieve_chunks(question, question_embedding)
+        if not relevant_chunks:
+            return NO_ANSWER
+
+        # Answer generation
+        try:
+            if use_advanced:
+                answer = self.generate_answer_advanced(question, relevant_chunks)
+            else:
+                answer = self.generate_answer_simple(question, relevant_chunks)
+        except Exception as e:
+            print(f"⚠️ Error generating answer: {str(e)}. Falling back to simple method.")
+            answer = self.generate_answer_simple(question, relevant_chunks)
+
+        self.remember_answer(question, use_advanced, version, question_embedding, answer, relevant_chunks)
+        return answer
+
+    def ask_question_stream(self, question, use_advanced=False):
+        """Like ask_question, but yields the answer in pieces as it is generated
+
+        Cached and simple-mode answers arrive as a single piece; advanced mode
+        yields text as the model produces it.
+        """
+        print(f"Question: {question}")
+
+        answer, version, question_embedding = self.lookup_cached_answer(question, use_advanced)
+        if answer is not None:
+            yield answer
+            return
+
+        relevant_chunks = self.retrieve_chunks(question, question_embedding)
+        if not relevant_chunks:
+            yield NO_ANSWER
+            return
+
+        if use_advanced:
+            pieces = []
+            for piece in self.stream_answer_advanced(question, relevant_chunks):
+                pieces.append(piece)
+                yield piece
+            answer = "".join(pieces)
+        else:
+            answer = self.generate_answer_simple(question, relevant_chunks)
+            yield answer
+
+        self.remember_answer(question, use_advanced, version, question_embedding, answer, relevant_chunks)
+
+    def lookup_cached_answer(self, question, use_advanced):
+        """Check the answer caches; returns (answer or None, store version, question embedding)"""
+        # Cached answers are only valid for the store version they were computed on
+        version = self.vector_store.get_version()
+        answer = self.answer_cache.get(question, use_advanced, version)
+        if answer is not None:
+            print("⚡ Answer cache hit")
+            return answer, version, None
+
+        # A near-duplicate question answered from chunks that are all still stored
+        question_embedding = None
+        if self.semantic_cache is not None:
+            question_embedding = self.vector_store.embed_texts([self.preprocess_question(question)])[0]
+            entry = self.semantic_cache.lookup(question_embedding, use_advanced,
+                                               is_valid=self.vector_store.has_chunks)
+            if entry is not None:
+                print(f"⚡ Semantic cache hit ({entry['score']:.2f}): '{entry['question']}'")
+                self.answer_cache.put(question, use_advanced, version, entry['answer'])
+                return entry['answer'], version, question_embedding
+        return None, version, question_embedding
+
+    def retrieve_chunks(self, question, question_embedding=None):
+        """Chunks to answer a question from"""
+        # Pick up documents added through another store instance or process
+        self.vector_store.refresh()
+
+        # Search once; use the high-confidence band and fall back to the relaxed one
+        relevant_chunks = self.find_chunks(question, 5, question_embedding=question_embedding)
+
+        print(f"Found {len(relevant_chunks)} relevant chunks")
+
+        # Warn if low match score (keyword matches are confident whatever their dense score)
+        if (relevant_chunks and relevant_chunks[0]['score'] < SEARCH_THRESHOLDS[0]
+                and relevant_chunks[0].get('coverage') != 1):
+            print("⚠️ Warning: Top result has a low confidence score.")
+        return relevant_chunks
+
+    def remember_answer(self, question, use_advanced, version, question_embedding, answer, relevant_chunks):
+        """Put a freshly generated answer into the answer caches"""
+        self.answer_cache.put(question, use_advanced, version, answer)
+        if question_embedding is not None:
+            chunk_hashes = [chunk['metadata'].get('content_hash') for chunk in relevant_chunks]
+            self.semantic_cache.put(question_embedding, use_advanced, question, answer,
+                                    [chunk_hash for chunk_hash in chunk_hashes if chunk_hash])
+
+    def build_prompt(self, question, relevant_chunks):
+        """RAG prompt for the generation model"""
+        # Combine top 3 chunks for richer context
+        top_chunks = relevant_chunks[:3]
+        # Skip chunks the reranker judged irrelevant (the best one is always kept)
+        top_chunks = top_chunks[:1] + [chunk for chunk in top_chunks[1:]
+                                       if chunk.get('rerank_score') is None
+                                       or chunk['rerank_score'] >= self.rerank_min_score]
+        context = "\n\n".join([chunk['text'].strip() for chunk in top_chunks])
+        
+        # Improved RAG-style prompt
+        return f"""
+    You are an assistant answering questions based on the provided company documentation.
+
+    Context:
+    {context}
+
+    Question: {question}
+    Answer:"""
+
+    def add_sources(self, answer, relevant_chunks):
+        """Append the source file names to an answer"""
+        sources = list(set([chunk.get('source', chunk.get('metadata', {}).get('source', 'unknown.txt'))
+                            for chunk in relevant_chunks]))
+        if sources:
+            source_names = [os.path.basename(src) for src in sources]
+            answer += f"\n\n📚 Sources: {', '.join(source_names)}"
+        return answer
+
+    def generate_answer_advanced(self, question, relevant_chunks):
+        """Generate answer using HuggingFace model with RAG prompt"""
+        if not relevant_chunks:
+            return self.generate_answer_simple(question, relevant_chunks)
+        
+        try:
+            prompt = self.build_prompt(question, relevant_chunks)
+
+            # Generate output, batched with other users' questions
+            answer = self.scheduler.generate(prompt, max_new_tokens=100)
+
+            # Fallback to simple generation if the model fails
+            if len(answer) < 10:
+                return self.generate_answer_simple(question, relevant_chunks)
+
+            # Append sources
+            return self.add_sources(answer, relevant_chunks)
+
+        except Exception as e:
+            print(f"Error with advanced generation, falling back to simple: {str(e)}")
+            return self.generate_answer_simple(question, relevant_chunks)
+
+    def stream_answer_advanced(self, question, relevant_chunks):
+        """Yield the model's answer piece by piece while it is being generated
+
+        Goes through the scheduler, so streamed answers are batched with other users' questions.
+        """
+        try:
+            prompt = self.build_prompt(question, relevant_chunks)
+            pieces = self.scheduler.stream(prompt, max_new_tokens=100)
+        except Exception as e:
+            print(f"Error with advanced generation, falling back to simple: {str(e)}")
+            yield self.generate_answer_simple(question, relevant_chunks)
+            return
+
+        streamed = ""
+        try:
+            for piece in pieces:
+                # Keep leading whitespace out of the answer
+                if not streamed:
+                    piece = piece.lstrip()
+                streamed += piece
+                if piece:
+                    yield piece
+        except Exception as e:
+            print(f"Error with advanced generation, falling back to simple: {str(e)}")
+
+        # Fallback to simple generation if the model fails
+        if len(streamed.strip()) < 10:
+            simple = self.generate_answer_simple(question, relevant_chunks)
+            yield ("\n\n" + simple) if streamed else simple
+            return
+
+        # Append sources
+        yield self.add_sources("", relevant_chunks)
+
+    
+    def get_vector_store_stats(self):
+        """Get vector store statistics"""
+        self.vector_store.refresh()
+        return self.vector_store.get_stats()
+
+    def get_model_stats(self):
+        """Get memory usage of the models loaded in this process"""
+        return get_model_stats()
+
+    def get_generation_stats(self):
+        """Get batching statistics of the generation scheduler (zeros until it is loaded)"""
+        # Reading self.scheduler would load the generation model just to report on it
+        if not is_loaded(f"{model_key(self.model_name, self.generation_backend)}:scheduler"):
+            return {'batches': 0, 'prompts': 0, 'average_batch_size': 0.0, 'queued': 0}
+        return self.scheduler.get_stats()
+
+    def get_cache_stats(self):
+        """Get answer cache hit rates"""
+        stats = self.answer_cache.get_stats()
+        stats['semantic'] = self.semantic_cache.get_stats() if self.semantic_cache is not None else None
+        return stats
+
+    def get_reranker_stats(self):
+        """Reranker latency and cache statistics (None when reranking is off)"""
+        return self.reranker.get_stats() if self.reranker is not None else None
+            
+    # Add to query_engine.py for better question understanding
+    def preprocess_question(self, question):
+        """Preprocess question for better search results"""
+        # Expand common abbreviations
+        abbreviations = {
+            "PTO": "paid time off vacation",
+            "HR": "human resources",
+            "IT": "information technology technical support",
+            "FAQ": "frequently asked questions",
+        }
+        
+        processed_question = question
+        for abbrev, expansion in abbreviations.items():
+            processed_question = processed_question.replace(abbrev, expansion)
+        
+        return processed_question
+
+    def get_question_category(self, question):
+        """Categorize question to improve search strategy"""
+        return categorize_text(question)
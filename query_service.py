@@ -0,0 +1,368 @@
+# query_service.py - HTTP API around QueryEngine and the ingestion job queue
+#
+# Usage:
+#   python query_service.py --port 8000 --workers 4   # starts a job_queue.py worker for writes
+#   QUERY_SERVICE_URL=http://localhost:8000 streamlit run streamlit_app.py
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from local_vector_store import LocalVectorStore
+from query_engine import QueryEngine
+from document_processor import get_file_type
+from job_queue import JobQueue, ensure_worker, job_event, FINISHED_STATUSES
+from model_registry import is_loaded, model_key, DEFAULT_EMBEDDING_BACKEND
+from metadata_store import FILTER_COLUMNS
+
+UPLOAD_DIR = "uploads"
+MAX_TOP_K = 100
+JOB_POLL_INTERVAL = 0.25  # seconds between checks on queued writes
+
+
+def valid_filters(filters):
+    """Check that filters looks like {"document_id": "handbook", "category": ["finance", ...]}"""
+    if not isinstance(filters, dict):
+        return False
+    return all(column in FILTER_COLUMNS and (
+        isinstance(values, str) or (isinstance(values, list) and all(isinstance(value, str) for value in values))
+    ) for column, values in filters.items())
+
+
+class QueryService:
+    """asyncio HTTP service that runs the blocking model calls in a thread pool
+
+    At most max_concurrency requests use the pool at once; up to max_queued more
+    wait for a slot and anything beyond that is turned away with 503. Each call
+    gets request_timeout seconds. Uploads, sample documents and deletes are queued
+    for the ingestion worker process, the only writer of the store; those requests
+    wait up to ingest_timeout for their jobs without holding a pool thread.
+    """
+
+    def __init__(self, store_path="vector_store", max_workers=4, max_concurrency=8, max_queued=32,
+                 request_timeout=60, ingest_timeout=900, rerank=False):
+        self.store_path = store_path
+        self.rerank = rerank
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self.job_queue = JobQueue(os.path.join(store_path, "jobs.db"))
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.request_timeout = request_timeout
+        self.ingest_timeout = ingest_timeout
+        self.semaphore = None  # created on the event loop in start()
+        self.query_engine = None
+        self.ready = False
+        self.started = time.time()
+        self.counters = {'in_flight': 0, 'waiting': 0, 'served': 0, 'rejected': 0,
+                         'timed_out': 0, 'failed': 0}
+
+    def make_app(self):
+        app = web.Application(client_max_size=200 * 1024 * 1024)
+        app.router.add_get("/health", self.health)
+        app.router.add_get("/ready", self.readiness)
+        app.router.add_get("/stats", self.stats)
+        app.router.add_post("/search", self.search)
+        app.router.add_post("/ask", self.ask)
+        app.router.add_post("/ingest", self.ingest)
+        app.router.add_post("/samples", self.add_samples)
+        app.router.add_post("/warm_up", self.warm_up)
+        app.router.add_delete("/documents/{document_id}", self.delete_document)
+        app.router.add_delete("/documents", self.clear_documents)
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.stop)
+        return app
+
+    async def start(self, app):
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Load in the background so /health answers while the models load
+        app['loader'] = asyncio.get_running_loop().create_task(self.load())
+
+    async def load(self):
+        def load_engines():
+            # The worker writes the store; queries pick its changes up with refresh()
+            vector_store = LocalVectorStore.open_reader(store_path=self.store_path)
+            query_engine = QueryEngine(vector_store=vector_store, rerank=self.rerank)
+            query_engine.vector_store.embeddings_model
+            if query_engine.reranker is not None:
+                query_engine.reranker.model
+            return query_engine
+
+        try:
+            loop = asyncio.get_running_loop()
+            self.query_engine = await loop.run_in_executor(self.executor, load_engines)
+            self.ready = True
+            print("✅ Query service ready")
+        except Exception as e:
+            print(f"❌ Could not load the query engine: {str(e)}")
+
+    async def stop(self, app):
+        app['loader'].cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for one of the max_concurrency slots, or fail fast when the queue is full"""
+        if not self.ready:
+            raise web.HTTPServiceUnavailable(text="Models are still loading")
+        if self.semaphore.locked() and self.counters['waiting'] >= self.max_queued:
+            self.counters['rejected'] += 1
+            raise web.HTTPServiceUnavailable(text="Too many requests", headers={'Retry-After': '1'})
+
+        self.counters['waiting'] += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.counters['waiting'] -= 1
+        self.counters['in_flight'] += 1
+        try:
+            yield
+            self.counters['served'] += 1
+        except web.HTTPGatewayTimeout:
+            self.counters['timed_out'] += 1
+            raise
+        except Exception:
+            self.counters['failed'] += 1
+            raise
+        finally:
+            self.counters['in_flight'] -= 1
+            self.semaphore.release()
+
+    async def call(self, function, *args, timeout=None):
+        """Run a blocking call in the pool and give up waiting after timeout seconds
+
+        A call that times out keeps its thread until it finishes; the client just
+        stops waiting for it.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self.executor, function, *args),
+                timeout or self.request_timeout
+            )
+        except asyncio.TimeoutError:
+            raise web.HTTPGatewayTimeout(text="Request timed out")
+
+    async def run(self, function, *args, timeout=None):
+        """call() inside a concurrency slot"""
+        async with self.slot():
+            return await self.call(function, *args, timeout=timeout)
+
+    async def run_jobs(self, job_ids):
+        """Wait for queued jobs to finish and reload the store; returns the jobs
+
+        The worker runs them. Past ingest_timeout the request gets a 504 but the
+        jobs carry on.
+        """
+        await self.call(ensure_worker, self.job_queue, self.store_path)
+        deadline = time.monotonic() + self.ingest_timeout
+        finished = {}
+        while len(finished) < len(job_ids):
+            if time.monotonic() >= deadline:
+                raise web.HTTPGatewayTimeout(text=f"{len(job_ids) - len(finished)} jobs are still running")
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            for job_id in job_ids:
+                if job_id not in finished:
+                    job = await self.call(self.job_queue.get, job_id)
+                    if job['status'] in FINISHED_STATUSES:
+                        finished[job_id] = job
+        await self.call(self.query_engine.vector_store.refresh)
+        return [finished[job_id] for job_id in job_ids]
+
+    async def run_job(self, job_id):
+        """run_jobs() for one job, failing the request if the job did"""
+        [job] = await self.run_jobs([job_id])
+        if job['status'] != 'done':
+            raise web.HTTPInternalServerError(text=job['error'] or f"Job was {job['status']}")
+        return job
+
+    async def read_json(self, request, *required):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="Body must be JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="Body must be a JSON object")
+        missing = [field for field in required if not body.get(field)]
+        if missing:
+            raise web.HTTPBadRequest(text=f"Missing field(s): {', '.join(missing)}")
+        return body
+
+    async def health(self, request):
+        """Liveness: the event loop is responding"""
+        return web.json_response({'status': 'ok', 'uptime_seconds': round(time.time() - self.started, 1)})
+
+    async def readiness(self, request):
+        """Readiness: the store and the embedding model are loaded"""
+        if not self.ready:
+            return web.json_response({'ready': False}, status=503)
+        vector_store = self.query_engine.vector_store
+        return web.json_response({
+            'ready': True,
+            'embedding_model_loaded': is_loaded(model_key(
+                vector_store.embedding_model_name, vector_store.embedding_backend or DEFAULT_EMBEDDING_BACKEND
+            )),
+            'documents': len(vector_store)
+        })
+
+    async def stats(self, request):
+        service = dict(self.counters, max_concurrency=self.max_concurrency, max_queued=self.max_queued)
+        if not self.ready:
+            return web.json_response({'service': service, 'ready': False})
+        # The getters read SQLite (and may reload the store), so keep them off the event loop
+        return web.json_response(dict({'service': service}, **await self.call(self.engine_stats)))
+
+    def engine_stats(self):
+        return {
+            'vector_store': self.query_engine.get_vector_store_stats(),
+            'models': self.query_engine.get_model_stats(),
+            'answer_cache': self.query_engine.get_cache_stats(),
+            'reranker': self.query_engine.get_reranker_stats(),
+            'generation': self.query_engine.get_generation_stats()
+        }
+
+    async def search(self, request):
+        """{"question": ..., "top_k": 5, "filters": {"document_id": ...}} -> {"results": [{"text", "source", "score"}]}"""
+        body = await self.read_json(request, 'question')
+        top_k = body.get('top_k', 5)
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K:
+            raise web.HTTPBadRequest(text=f"top_k must be an integer from 1 to {MAX_TOP_K}")
+        filters = body.get('filters')
+        if filters is not None and not valid_filters(filters):
+            raise web.HTTPBadRequest(text=f"filters must map {', '.join(FILTER_COLUMNS)} to a string or a list of strings")
+        results = await self.run(self.query_engine.search_documents, body['question'], top_k, filters)
+        return web.json_response({'results': results})
+
+    async def ask(self, request):
+        """{"question": ..., "use_advanced": false, "stream": false} -> {"answer": ...}
+
+        With "stream": true the answer is sent as plain text while it is generated.
+        """
+        body = await self.read_json(request, 'question')
+        use_advanced = bool(body.get('use_advanced', False))
+        if not body.get('stream'):
+            answer = await self.run(self.query_engine.ask_question, body['question'], use_advanced)
+            return web.json_response({'answer': answer})
+
+        async with self.slot():
+            pieces = self.query_engine.ask_question_stream(body['question'], use_advanced)
+            response = web.StreamResponse(headers={'Content-Type': 'text/plain; charset=utf-8'})
+            await response.prepare(request)
+            deadline = time.monotonic() + self.request_timeout
+            try:
+                while True:
+                    # Each step of the generator blocks, so it runs in the pool too
+                    piece = await self.call(next, pieces, None, timeout=max(deadline - time.monotonic(), 0.001))
+                    if piece is None:
+                        break
+                    await response.write(piece.encode('utf-8'))
+            except web.HTTPGatewayTimeout:
+                # Headers are already sent, so say so in the body
+                await response.write("\n\n⚠️ Answer timed out".encode('utf-8'))
+            await response.write_eof()
+            return response
+
+    async def ingest(self, request):
+        """Multipart upload of one or more files -> ingestion summary with per-file events"""
+        if not self.ready:
+            raise web.HTTPServiceUnavailable(text="Models are still loading")
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        staged = []  # (temporary path, final path, name)
+        try:
+            reader = await request.multipart()
+            async for part in reader:
+                if not part.filename:
+                    continue
+                name = os.path.basename(part.filename)
+                # Receive under a unique name that keeps the extension, so a rejected or
+                # broken upload never replaces (or deletes) an earlier file of that name
+                fd, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload-", suffix=f"-{name}")
+                staged.append((temp_path, os.path.join(UPLOAD_DIR, name), name))
+                with os.fdopen(fd, 'wb') as f:
+                    while True:
+                        data = await part.read_chunk()
+                        if not data:
+                            break
+                        f.write(data)
+                if not get_file_type(temp_path):
+                    raise web.HTTPUnsupportedMediaType(text=f"Unsupported file type: {name}")
+        except BaseException:
+            for temp_path, _, _ in staged:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            raise
+        if not staged:
+            raise web.HTTPBadRequest(text="No files uploaded")
+
+        # Every file is accepted; move them into place atomically, so a job that is
+        # reading an earlier upload of the same name keeps reading a whole file
+        files = []
+        for temp_path, file_path, name in staged:
+            os.replace(temp_path, file_path)
+            files.append((file_path, name))  # the extension keeps a.pdf and a.txt apart
+
+        start = time.time()
+        job_ids = [await self.call(self.job_queue.submit, file_path, document_id) for file_path, document_id in files]
+        jobs = await self.run_jobs(job_ids)
+
+        # Same summary and progress events as IngestionPipeline.run()
+        summary = {'total': len(jobs), 'written': 0, 'skipped': 0, 'cancelled': 0, 'failed': 0, 'chunks': 0}
+        events = []
+        for job in sorted(jobs, key=lambda job: job['finished'] or 0):
+            event = job_event(job)
+            if event['status'] == 'written':
+                summary['chunks'] += event['chunks']
+            summary[event['status']] += 1
+            event.update(completed=len(events) + 1, total=len(jobs))
+            events.append(event)
+        summary['seconds'] = round(time.time() - start, 2)
+        return web.json_response(dict(summary, events=events))
+
+    async def add_samples(self, request):
+        if not self.ready:
+            raise web.HTTPServiceUnavailable(text="Models are still loading")
+        await self.run_job(await self.call(self.job_queue.submit_samples))
+        return web.json_response({'status': 'ok'})
+
+    async def warm_up(self, request):
+        """Start loading the generation model ({"include_generation": true})"""
+        if self.ready:
+            body = await self.read_json(request) if request.can_read_body else {}
+            self.query_engine.warm_up(include_generation=bool(body.get('include_generation', False)))
+        return web.json_response({'ready': self.ready})
+
+    async def delete_document(self, request):
+        if not self.ready:
+            raise web.HTTPServiceUnavailable(text="Models are still loading")
+        job = await self.run_job(await self.call(self.job_queue.submit_delete, request.match_info['document_id']))
+        return web.json_response({'deleted_chunks': job['chunks']})
+
+    async def clear_documents(self, request):
+        if not self.ready:
+            raise web.HTTPServiceUnavailable(text="Models are still loading")
+        await self.run_job(await self.call(self.job_queue.submit_clear))
+        return web.json_response({'status': 'cleared'})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP query service for the document Q&A engine")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("QUERY_SERVICE_PORT", "8000")))
+    parser.add_argument("--store", default="vector_store", help="Vector store directory")
+    parser.add_argument("--workers", type=int, default=4, help="Threads running model calls")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Requests running at once")
+    parser.add_argument("--max-queued", type=int, default=32, help="Requests waiting before 503s")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds per request")
+    parser.add_argument("--ingest-timeout", type=float, default=900,
+                        help="Seconds an ingest, samples or delete request waits for its job")
+    parser.add_argument("--rerank", action="store_true", help="Rerank search results with a cross-encoder")
+    args = parser.parse_args()
+
+    service = QueryService(store_path=args.store, max_workers=args.workers,
+                           max_concurrency=args.max_concurrency, max_queued=args.max_queued,
+                           request_timeout=args.timeout, ingest_timeout=args.ingest_timeout,
+                           rerank=args.rerank)
+    web.run_app(service.make_app(), host=args.host, port=args.port)
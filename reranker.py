@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from answer_cache import normalize_question
+from local_vector_store import content_hash
+from model_registry import get_cross_encoder, is_loaded, model_key, DEFAULT_EMBEDDING_BACKEND, DEFAULT_RERANKER_MODEL
+
+
+class Reranker:
+    """Reorders search results by cross-encoder relevance within a per-query time budget
+
+    Candidates are scored in batches, best dense match first. When the next batch
+    would not finish within budget_ms the remaining candidates keep their dense
+    order behind the scored ones. Scores are cached per (question, chunk text), so
+    a repeated question only scores chunks it hasn't seen.
+    """
+
+    def __init__(self, model_name=DEFAULT_RERANKER_MODEL, backend=None, batch_size=16, budget_ms=300,
+                 cache_size=4096):
+        self.model_name = model_name
+        self.backend = backend or DEFAULT_EMBEDDING_BACKEND
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # (normalized question, chunk hash) -> score
+        self.lock = threading.Lock()
+        self.loading = None
+        self.stats = {'queries': 0, 'scored': 0, 'cache_hits': 0, 'over_budget': 0, 'cold': 0,
+                      'total_ms': 0.0}
+
+    @property
+    def model(self):
+        """Shared cross-encoder, loaded on first use"""
+        return get_cross_encoder(self.model_name, backend=self.backend)
+
+    def is_loaded(self):
+        return is_loaded(model_key(self.model_name, self.backend))
+
+    def warm_up(self):
+        """Load the model in a background thread unless it is loaded or loading"""
+        def load():
+            try:
+                self.model
+            except Exception as e:
+                print(f"❌ Could not load reranker {self.model_name}: {str(e)}")
+
+        with self.lock:
+            if self.is_loaded() or (self.loading is not None and self.loading.is_alive()):
+                return self.loading
+            self.loading = threading.Thread(target=load, daemon=True)
+            self.loading.start()
+            return self.loading
+
+    def rerank(self, question, results, k=5):
+        """Best k of results for question, each with a 'rerank_score' (None if it wasn't scored)"""
+        start = time.perf_counter()
+        results = [dict(result, rerank_score=None) for result in results]
+        if not results:
+            return results
+        self.stats['queries'] += 1
+
+        if not self.is_loaded():
+            # Loading takes seconds; answer in dense order meanwhile
+            self.warm_up()
+            self.stats['cold'] += 1
+            print("⏳ Reranker still loading, keeping search order")
+            return results[:k]
+
+        question_key = normalize_question(question)
+        keys = [(question_key, result['metadata'].get('content_hash') or content_hash(result['text']))
+                for result in results]
+        with self.lock:
+            for result, key in zip(results, keys):
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    result['rerank_score'] = self.cache[key]
+                    self.stats['cache_hits'] += 1
+
+        pending = [position for position, result in enumerate(results) if result['rerank_score'] is None]
+        deadline = start + self.budget_ms / 1000
+        batch_seconds = 0.0
+        for batch_start in range(0, len(pending), self.batch_size):
+            # Don't start a batch that can't finish in time
+            if time.perf_counter() + batch_seconds > deadline:
+                self.stats['over_budget'] += 1
+                print(f"⏱️ Reranking budget used up, {len(pending) - batch_start} chunks keep their search order")
+                break
+            batch = pending[batch_start:batch_start + self.batch_size]
+            batch_began = time.perf_counter()
+            scores = self.model.predict([(question, results[position]['text']) for position in batch],
+                                        batch_size=self.batch_size, show_progress_bar=False)
+            batch_seconds = time.perf_counter() - batch_began
+            with self.lock:
+                for position, score in zip(batch, scores):
+                    results[position]['rerank_score'] = float(score)
+                    self.remember(keys[position], float(score))
+            self.stats['scored'] += len(batch)
+
+        # Scored chunks by relevance, then the rest in search order (sorted() is stable)
+        results = sorted(results, key=lambda result: (result['rerank_score'] is None,
+                                                      -(result['rerank_score'] or 0.0)))
+        self.stats['total_ms'] += (time.perf_counter() - start) * 1000
+        return results[:k]
+
+    def remember(self, key, score):
+        """Cache a score, evicting the least recently used one (lock held)"""
+        self.cache[key] = score
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def get_stats(self):
+        queries = self.stats['queries']
+        return {
+            'model': self.model_name,
+            'loaded': self.is_loaded(),
+            'budget_ms': self.budget_ms,
+            'queries': queries,
+            'chunks_scored': self.stats['scored'],
+            'cache_entries': len(self.cache),
+            'cache_hits': self.stats['cache_hits'],
+            'over_budget': self.stats['over_budget'],
+            'cold_starts': self.stats['cold'],
+            'average_ms': round(self.stats['total_ms'] / queries, 1) if queries else 0.0
+        }
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
@@ -0,0 +1,120 @@
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class ReadWriteLock:
+    """Many readers or one writer at a time
+
+    Waiting writers hold back new readers so a steady stream of searches can't
+    starve them. Both sides are reentrant, and the thread holding the write side
+    may also take the read side (but not the other way round).
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = None
+        self.write_depth = 0
+        self.waiting_writers = 0
+        self.local = threading.local()
+
+    @contextmanager
+    def read(self):
+        depth = getattr(self.local, 'read_depth', 0)
+        if depth or self.writer == threading.get_ident():
+            # Already inside the lock on this thread
+            self.local.read_depth = depth + 1
+            try:
+                yield
+            finally:
+                self.local.read_depth = depth
+            return
+
+        with self.cond:
+            while self.writer is not None or self.waiting_writers:
+                self.cond.wait()
+            self.readers += 1
+        self.local.read_depth = 1
+        try:
+            yield
+        finally:
+            self.local.read_depth = 0
+            with self.cond:
+                self.readers -= 1
+                if not self.readers:
+                    self.cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self.cond:
+            if self.writer == me:
+                self.write_depth += 1
+            else:
+                self.waiting_writers += 1
+                try:
+                    while self.writer is not None or self.readers:
+                        self.cond.wait()
+                finally:
+                    self.waiting_writers -= 1
+                self.writer = me
+                self.write_depth = 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.write_depth -= 1
+                if not self.write_depth:
+                    self.writer = None
+                    self.cond.notify_all()
+
+
+class FileLock:
+    """Exclusive or shared lock on a file, held across processes (fcntl.flock)
+
+    acquire()/release() nest: the file is locked by the outermost acquire and
+    unlocked by the matching release, whichever threads make the calls, so it
+    does not keep threads of one process apart. Where fcntl is missing
+    (Windows) only the nesting is tracked.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.depth = 0
+        self.mutex = threading.Lock()
+
+    def acquire(self, shared=False, blocking=True):
+        """Lock the file (if not held already); returns False if blocking=False and it is taken"""
+        with self.mutex:
+            if not self.depth and fcntl is not None:
+                if self.file is None:
+                    self.file = open(self.path, "a+")
+                flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+                try:
+                    fcntl.flock(self.file.fileno(), flags if blocking else flags | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+            self.depth += 1
+            return True
+
+    def release(self):
+        with self.mutex:
+            self.depth -= 1
+            if not self.depth and fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    def is_held(self):
+        return self.depth > 0
+
+    def close(self):
+        with self.mutex:
+            if self.file is not None:
+                self.file.close()  # also drops the lock
+                self.file = None
+                self.depth = 0
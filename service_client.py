@@ -0,0 +1,106 @@
+import os
+import time
+import requests
+
+
+class QueryServiceClient:
+    """Talks to query_service.py over HTTP
+
+    Offers the QueryEngine and DocumentProcessor methods the Streamlit app uses,
+    so the UI can run without loading any models itself.
+    """
+
+    def __init__(self, base_url, timeout=120, stats_ttl=2.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        # The sidebar asks for several parts of /stats per render; fetch it once
+        self.stats_ttl = stats_ttl
+        self.stats = None
+        self.stats_time = 0.0
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session.request(method, self.base_url + path, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} failed ({response.status_code}): {response.text.strip()}")
+        return response
+
+    def is_ready(self):
+        try:
+            return self.session.get(self.base_url + "/ready", timeout=5).status_code == 200
+        except requests.RequestException:
+            return False
+
+    # QueryEngine
+    def ask_question(self, question, use_advanced=False):
+        return self.request("POST", "/ask", json={'question': question, 'use_advanced': use_advanced}).json()['answer']
+
+    def ask_question_stream(self, question, use_advanced=False):
+        """Yield the answer as the service streams it"""
+        response = self.request("POST", "/ask", stream=True,
+                                json={'question': question, 'use_advanced': use_advanced, 'stream': True})
+        response.encoding = 'utf-8'
+        with response:
+            for piece in response.iter_content(chunk_size=None, decode_unicode=True):
+                if piece:
+                    yield piece
+
+    def search_documents(self, question, top_k=5, filters=None):
+        return self.request("POST", "/search",
+                            json={'question': question, 'top_k': top_k, 'filters': filters}).json()['results']
+
+    def warm_up(self, include_generation=False):
+        self.request("POST", "/warm_up", json={'include_generation': include_generation})
+
+    def get_stats(self):
+        """GET /stats, reusing the last response for stats_ttl seconds"""
+        if self.stats is None or time.monotonic() - self.stats_time > self.stats_ttl:
+            self.stats = self.request("GET", "/stats").json()
+            self.stats_time = time.monotonic()
+        return self.stats
+
+    def get_vector_store_stats(self):
+        return self.get_stats()['vector_store']
+
+    def get_model_stats(self):
+        return self.get_stats()['models']
+
+    def get_cache_stats(self):
+        return self.get_stats()['answer_cache']
+
+    # DocumentProcessor
+    def add_sample_documents(self):
+        self.request("POST", "/samples")
+        self.stats = None
+
+    def delete_document(self, document_id):
+        deleted = self.request("DELETE", f"/documents/{requests.utils.quote(document_id, safe='')}").json()['deleted_chunks']
+        self.stats = None
+        return deleted
+
+    def clear_all_documents(self):
+        self.request("DELETE", "/documents")
+        self.stats = None
+
+    def ingest_files(self, files, progress_callback=None):
+        """Upload (file_path, document_id) pairs and return the ingestion summary
+
+        The service names documents after the uploaded file, so document_id is
+        only used locally. Progress events are replayed once the upload is done.
+        """
+        handles = [open(file_path, 'rb') for file_path, _ in files]
+        try:
+            summary = self.request(
+                "POST", "/ingest", timeout=None,
+                files=[('files', (os.path.basename(file_path), handle))
+                       for (file_path, _), handle in zip(files, handles)]
+            ).json()
+        finally:
+            for handle in handles:
+                handle.close()
+        self.stats = None
+        for event in summary.pop('events', []):
+            if progress_callback:
+                progress_callback(event)
+        return summary
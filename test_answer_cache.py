@@ -0,0 +1,75 @@
+import itertools
+import types
+import numpy as np
+import answer_cache
+from answer_cache import AnswerCache, SemanticAnswerCache
+from conftest import DIMENSION, add_document
+
+
+def test_answers_are_keyed_by_normalized_question_mode_and_version():
+    cache = AnswerCache()
+    cache.put("What is the vacation policy?", False, 3, "15 days")
+
+    assert cache.get("  what is the   VACATION policy ", False, 3) == "15 days"
+    assert cache.get("What is the vacation policy?", True, 3) is None
+    assert cache.get("What is the vacation policy?", False, 4) is None
+    assert cache.get_stats()['hits'] == 1
+
+
+def test_a_store_change_makes_cached_answers_unreachable(open_store):
+    store = open_store()
+    add_document(store, "a", 2)
+    cache = AnswerCache()
+    cache.put("question", False, store.get_version(), "answer")
+    assert cache.get("question", False, store.get_version()) == "answer"
+
+    add_document(store, "b", 1)
+    assert cache.get("question", False, store.get_version()) is None
+    cache.put("question", False, store.get_version(), "newer answer")
+
+    store.delete_document("a")
+    assert cache.get("question", False, store.get_version()) is None
+
+
+def test_answers_expire_and_survive_restarts_on_disk(tmp_path, monkeypatch):
+    now = itertools.count(1000, 10)
+    monkeypatch.setattr(answer_cache, 'time', types.SimpleNamespace(time=lambda: next(now)))
+    disk_path = str(tmp_path / "answers.db")
+    AnswerCache(ttl_seconds=100, disk_path=disk_path).put("question", False, 1, "answer")
+
+    restarted = AnswerCache(ttl_seconds=100, disk_path=disk_path)
+    assert restarted.get("question", False, 1) == "answer"
+    assert restarted.get_stats()['disk_hits'] == 1
+
+    expired = AnswerCache(ttl_seconds=15, disk_path=disk_path)
+    assert expired.get("question", False, 1) is None
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype='float32')
+    return vector / np.linalg.norm(vector)
+
+
+def test_semantic_cache_only_returns_close_enough_questions():
+    cache = SemanticAnswerCache(3, threshold=0.9)
+    cache.put(unit([1, 0, 0]), False, "How many vacation days?", "15 days", ["hash-a"])
+
+    assert cache.lookup(unit([1, 0.2, 0]), False)['answer'] == "15 days"  # cosine 0.98
+    assert cache.lookup(unit([1, 0.6, 0]), False) is None  # cosine 0.86
+    assert cache.lookup(unit([1, 0, 0]), True) is None  # answered in the other mode
+
+
+def test_semantic_cache_drops_answers_built_on_deleted_chunks(open_store):
+    store = open_store()
+    add_document(store, "a", 2)
+    add_document(store, "b", 2)
+    hashes = [store.metadata[idx]['content_hash'] for idx in store.metadata.ids_for_document("a")]
+    cache = SemanticAnswerCache(DIMENSION)
+    question = store.embed_texts(["question about a"])[0]
+    cache.put(question, False, "question about a", "answer", hashes)
+    assert cache.lookup(question, False, is_valid=store.has_chunks) is not None
+
+    store.delete_document("a")
+    assert cache.lookup(question, False, is_valid=store.has_chunks) is None
+    assert cache.get_stats()['invalidations'] == 1
+    assert cache.get_stats()['entries'] == 0
@@ -0,0 +1,43 @@
+from document_processor import iter_chunks, chunk_file
+
+
+class FixedSizeSplitter:
+    """Cuts text into pieces of size characters (the langchain splitter isn't needed here)"""
+
+    def __init__(self, size):
+        self.size = size
+
+    def split_text(self, text):
+        return [text[start:start + self.size] for start in range(0, len(text), self.size)]
+
+
+def make_pages(count, words=30):
+    return [(page, "".join(f"p{page}w{word} " for word in range(words))) for page in range(1, count + 1)]
+
+
+def test_chunks_get_the_page_they_start_on():
+    pages = make_pages(5)
+    text = "".join(page_text for _, page_text in pages)
+    page_starts, start = [], 0
+    for page, page_text in pages:
+        page_starts.append((start, page))
+        start += len(page_text)
+
+    chunks = list(iter_chunks(iter(pages), FixedSizeSplitter(70), flush_size=200))
+    assert "".join(chunk for chunk, _ in chunks) == text
+
+    position = 0
+    for chunk, page in chunks:
+        assert page == max(p for start, p in page_starts if start <= position)
+        position += len(chunk)
+
+
+def test_text_files_have_no_page_numbers(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Expense reports are due monthly. " * 50)
+
+    texts, metadatas, document_hash, characters = chunk_file(str(path), "notes.txt", FixedSizeSplitter(300))
+    assert "".join(texts) == path.read_text()
+    assert characters == len(path.read_text())
+    assert [metadata['chunk_index'] for metadata in metadatas] == list(range(len(texts)))
+    assert all('page' not in metadata for metadata in metadatas)
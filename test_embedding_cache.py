@@ -0,0 +1,48 @@
+import itertools
+import types
+import numpy as np
+import embedding_cache
+from embedding_cache import EmbeddingCache
+from conftest import add_document
+
+
+def vectors(count, dimension=8):
+    return np.random.default_rng(0).standard_normal((count, dimension)).astype('float32')
+
+
+def test_vectors_are_cached_per_model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embedding_cache.db"))
+    stored = vectors(2)
+    cache.put_many("model-a", ["first", "second"], stored)
+
+    hits = cache.get_many("model-a", ["second", "unknown", "first"])
+    assert sorted(hits) == [0, 2]
+    np.testing.assert_allclose(hits[0], stored[1], atol=1e-2)  # kept as float16
+    assert cache.get_many("model-b", ["first"]) == {}
+    assert cache.get_stats()['hits'] == 2
+
+
+def test_least_recently_used_vectors_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(embedding_cache, 'time', types.SimpleNamespace(time=lambda: next(clock)))
+    cache = EmbeddingCache(str(tmp_path / "embedding_cache.db"), max_entries=2)
+    cache.put_many("model", ["old"], vectors(1))
+    cache.put_many("model", ["used"], vectors(1))
+    cache.get_many("model", ["old"])  # now "used" is the least recently used
+
+    cache.put_many("model", ["new"], vectors(1))
+    assert len(cache) == 2
+    assert sorted(cache.get_many("model", ["old", "used", "new"])) == [0, 2]
+
+
+def test_store_reuses_cached_embeddings_after_clear(open_store, fake_encoder, monkeypatch):
+    store = open_store(embedding_cache_size=100)
+    add_document(store, "a", 3)
+    store.clear()
+
+    encoded = []
+    encode = fake_encoder.encode
+    monkeypatch.setattr(fake_encoder, 'encode', lambda texts, **kwargs: encoded.extend(texts) or encode(texts, **kwargs))
+    add_document(store, "a", 4)
+    assert encoded == ["a chunk 3"]
+    assert store.search("a chunk 1", k=1, score_threshold=-1)[0]['text'] == "a chunk 1"
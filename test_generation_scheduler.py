@@ -0,0 +1,103 @@
+import queue
+import threading
+import numpy as np
+import pytest
+from generation_scheduler import BatchStreamer, GenerationScheduler
+
+
+class WordTokenizer:
+    """Tokenizer whose token ids are indexes into a list of words"""
+
+    def __init__(self, words):
+        self.words = list(words)
+
+    def id(self, word):
+        if word not in self.words:
+            self.words.append(word)
+        return self.words.index(word)
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(self.words[i] for i in ids)
+
+
+class FakeScheduler(GenerationScheduler):
+    """Answers every prompt with "<prompt> answer", one token per step, without a model"""
+
+    def __init__(self, error=None, **kwargs):
+        self.error = error
+        self.batch_sizes = []
+        super().__init__(None, WordTokenizer([]), **kwargs)
+
+    def generate_batch(self, prompts, max_new_tokens, streamer=None):
+        self.batch_sizes.append(len(prompts))
+        if self.error is not None:
+            raise self.error
+        steps = [[f"{prompt} " for prompt in prompts], ["answer"] * len(prompts)]
+        if streamer is not None:
+            streamer.put(np.zeros((len(prompts), 1), dtype=int))  # the prompts
+            for words in steps:
+                streamer.put(np.array([[self.tokenizer.id(word)] for word in words]))
+            streamer.end()
+        return ["".join(words).strip() for words in zip(*steps)]
+
+
+def test_batch_streamer_splits_rows_into_their_own_queues():
+    tokenizer = WordTokenizer(["<prompt>", "Hello ", "wor", "ld", "Bye"])
+    pieces = [queue.Queue(), None, queue.Queue()]
+    streamer = BatchStreamer(tokenizer, pieces)
+
+    streamer.put(np.array([[0], [0], [0]]))
+    streamer.put(np.array([[1], [4], [4]]))
+    streamer.put(np.array([[2], [4], [4]]))
+    assert pieces[0].get_nowait() == "Hello "
+    assert pieces[2].empty()  # "ByeBye" may still grow
+
+    streamer.put(np.array([[3], [4], [1]]))
+    assert pieces[0].empty()
+    assert pieces[2].get_nowait() == "ByeByeHello "
+    streamer.end()
+    assert [pieces[0].get_nowait(), pieces[0].get_nowait()] == ["world", None]
+    assert pieces[2].get_nowait() is None
+
+    streamer.fail(RuntimeError("too late"))
+    assert pieces[0].empty()
+
+
+def test_batch_streamer_fail_ends_every_stream_with_the_error():
+    pieces = [queue.Queue(), queue.Queue()]
+    streamer = BatchStreamer(WordTokenizer([]), pieces)
+    error = RuntimeError("out of memory")
+    streamer.fail(error)
+    assert pieces[0].get_nowait() is error
+    assert pieces[1].get_nowait() is error
+
+
+def test_generate_and_stream_callers_share_a_batch():
+    scheduler = FakeScheduler(max_wait_ms=500)
+    answers = {}
+    thread = threading.Thread(target=lambda: answers.update(one=scheduler.generate("one", timeout=5)))
+    thread.start()
+    streamed = list(scheduler.stream("two", timeout=5))
+    thread.join(timeout=5)
+
+    assert answers == {'one': "one answer"}
+    assert "".join(streamed) == "two answer"
+    assert scheduler.batch_sizes == [2]
+
+
+def test_a_failed_batch_raises_in_every_caller():
+    scheduler = FakeScheduler(error=RuntimeError("out of memory"), max_wait_ms=500)
+    errors = []
+
+    def generate():
+        try:
+            scheduler.generate("one", timeout=5)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=generate)
+    thread.start()
+    with pytest.raises(RuntimeError, match="out of memory"):
+        list(scheduler.stream("two", timeout=5))
+    thread.join(timeout=5)
+    assert [str(e) for e in errors] == ["out of memory"]
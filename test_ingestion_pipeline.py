@@ -0,0 +1,55 @@
+from ingestion_pipeline import IngestionPipeline
+
+
+def write_files(tmp_path, count):
+    files = []
+    for i in range(count):
+        path = tmp_path / f"doc{i}.txt"
+        path.write_text(f"Document {i} explains topic {i} in detail. " * 60)
+        files.append((str(path), path.name))
+    return files
+
+
+def test_pipeline_ingests_files_and_skips_unchanged_ones(open_store, tmp_path):
+    store = open_store()
+    files = write_files(tmp_path, 3)
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    events = []
+
+    pipeline = IngestionPipeline(store, num_workers=1, progress_callback=events.append)
+    summary = pipeline.run(files + [(str(empty), "empty.txt")])
+    assert (summary['written'], summary['skipped'], summary['failed']) == (3, 0, 1)
+    assert summary['chunks'] == len(store) > 0
+    assert [event['completed'] for event in events if event['status'] in ('written', 'failed')] == [1, 2, 3, 4]
+    assert all(event['total'] == 4 for event in events)
+    failed = [event for event in events if event['status'] == 'failed']
+    assert failed[0]['document_id'] == "empty.txt"
+    assert store.list_segments()  # flushed once the pipeline is done
+
+    summary = IngestionPipeline(store, num_workers=1).run(files)
+    assert (summary['written'], summary['skipped']) == (0, 3)
+
+
+def test_embedding_errors_fail_only_their_files(open_store, tmp_path, monkeypatch):
+    store = open_store()
+
+    def broken(texts, batch_size=None):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(store, 'embed_texts', broken)
+    summary = IngestionPipeline(store, num_workers=1).run(write_files(tmp_path, 2))
+    assert (summary['written'], summary['failed']) == (0, 2)
+    assert len(store) == 0
+
+
+def test_pipeline_drops_cancelled_files(open_store, tmp_path):
+    store = open_store()
+    files = write_files(tmp_path, 2)
+
+    summary = IngestionPipeline(store, num_workers=1, cancelled=lambda document_id: document_id == "doc1.txt").run(files)
+    assert (summary['written'], summary['cancelled']) == (1, 1)
+    assert store.metadata.ids_for_document("doc1.txt") == []
+    assert store.metadata.ids_for_document("doc0.txt")
+
+
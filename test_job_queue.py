@@ -0,0 +1,119 @@
+import subprocess
+import sys
+import threading
+import types
+from job_queue import IngestionWorker, JobQueue
+from test_ingestion_pipeline import write_files
+
+
+def open_queue(tmp_path, **kwargs):
+    return JobQueue(str(tmp_path / "jobs.db"), **kwargs)
+
+
+def test_failed_jobs_are_retried_with_backoff_until_out_of_attempts(tmp_path):
+    jobs = open_queue(tmp_path, retry_backoff=0)
+    job_id = jobs.submit("a.txt", "a.txt", max_attempts=2)
+
+    assert jobs.claim()['attempts'] == 1
+    jobs.fail(job_id, "model crashed")
+    assert jobs.get(job_id)['status'] == "queued"
+
+    assert jobs.claim()['attempts'] == 2
+    jobs.fail(job_id, "model crashed again")
+    job = jobs.get(job_id)
+    assert (job['status'], job['error']) == ("failed", "model crashed again")
+    assert jobs.claim() is None
+
+    assert jobs.retry(job_id)
+    assert jobs.claim()['attempts'] == 1
+
+
+def test_retries_wait_for_their_backoff(tmp_path):
+    jobs = open_queue(tmp_path, retry_backoff=60)
+    job_id = jobs.submit("a.txt", "a.txt")
+    jobs.claim()
+    jobs.fail(job_id, "model crashed")
+    assert jobs.get(job_id)['status'] == "queued"
+    assert jobs.claim() is None
+
+
+def test_cancel_drops_queued_jobs_and_flags_running_ones(tmp_path):
+    jobs = open_queue(tmp_path)
+    running = jobs.submit("a.txt", "a.txt")
+    queued = jobs.submit("b.txt", "b.txt")
+    assert jobs.claim()['id'] == running
+
+    assert jobs.cancel(queued)
+    assert jobs.get(queued)['status'] == "cancelled"
+    assert jobs.cancel(running)
+    assert jobs.get(running)['status'] == "running"
+    assert jobs.cancel_requested(running)
+    assert not jobs.cancel_requested(queued)
+
+    jobs.complete(running, chunks=3, embedded=3)
+    assert not jobs.cancel(running)
+    assert jobs.claim() is None
+
+
+def test_recover_requeues_jobs_of_a_dead_worker(tmp_path):
+    jobs = open_queue(tmp_path)
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    orphan = jobs.submit("a.txt", "a.txt")
+    jobs.claim(worker_pid=dead.pid)
+    alive = jobs.submit("b.txt", "b.txt")
+    jobs.claim()
+
+    assert jobs.recover() == 1
+    assert jobs.get(orphan)['status'] == "queued"
+    assert jobs.get(alive)['status'] == "running"
+
+
+def test_claim_batch_stops_at_other_kinds_and_repeated_documents(tmp_path):
+    jobs = open_queue(tmp_path)
+    for name in ("a.txt", "b.txt", "a.txt", "c.txt"):
+        jobs.submit(name, name)
+    jobs.submit_delete("c.txt")
+    jobs.submit("d.txt", "d.txt")
+
+    assert [job['document_id'] for job in jobs.claim_batch()] == ["a.txt", "b.txt"]
+    assert [job['document_id'] for job in jobs.claim_batch()] == ["a.txt", "c.txt"]
+    assert [job['kind'] for job in jobs.claim_batch()] == ["delete"]
+    assert [job['document_id'] for job in jobs.claim_batch(max_jobs=1)] == ["d.txt"]
+    assert jobs.claim_batch() == []
+
+
+def test_worker_ingests_a_batch_and_finishes_every_job(open_store, tmp_path):
+    store = open_store()
+    jobs = open_queue(tmp_path)
+    files = write_files(tmp_path, 3)
+    written = [jobs.submit(file_path, document_id) for file_path, document_id in files[:2]]
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    failed = jobs.submit(str(empty), "empty.txt", max_attempts=1)
+    cancelled = jobs.submit(*files[2])
+    jobs.cancel(cancelled)
+
+    worker = IngestionWorker(jobs, types.SimpleNamespace(vector_store=store), num_workers=1)
+    worker.ingest(jobs.claim_batch())
+
+    for job_id in written:
+        job = jobs.get(job_id)
+        assert (job['status'], job['stage']) == ("done", "written")
+        assert job['chunks'] == job['embedded'] > 0
+        assert store.metadata.ids_for_document(job['document_id'])
+    assert jobs.get(failed)['status'] == "failed"
+    assert jobs.get(cancelled)['status'] == "cancelled"
+
+    # Uploading the same files again finishes their jobs as unchanged
+    again = [jobs.submit(file_path, document_id) for file_path, document_id in files[:2]]
+    stop = threading.Event()
+    thread = threading.Thread(target=worker.run, args=(stop,))
+    thread.start()
+    try:
+        for job_id in again:
+            job = jobs.wait(job_id, timeout=10, poll_interval=0.05)
+            assert (job['status'], job['embedded']) == ("done", None)
+    finally:
+        stop.set()
+        thread.join(timeout=10)
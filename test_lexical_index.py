@@ -0,0 +1,53 @@
+from lexical_index import LexicalIndex, tokenize
+from metadata_store import MetadataStore
+
+
+def open_index(tmp_path, texts):
+    index = LexicalIndex(MetadataStore(str(tmp_path / "metadata.db")))
+    index.add(0, texts)
+    return index
+
+
+def test_tokenize_drops_stopwords_and_splits_compound_tokens():
+    assert tokenize("What is the refund for a $500 order?") == ["refund", "$500", "500", "order"]
+    assert tokenize("Call 555-0100 or it@company.com") == [
+        "call", "555-0100", "555", "0100", "it@company.com", "company", "com"
+    ]
+
+
+def test_bm25_ranks_rare_and_frequent_terms_higher(tmp_path):
+    index = open_index(tmp_path, [
+        "vacation policy for new employees",
+        "vacation vacation vacation policy",
+        "expense policy",
+        "expense policy for travel",
+    ])
+
+    ids = [idx for idx, _, _ in index.search("vacation policy", k=4)]
+    assert ids[:2] == [1, 0]  # "vacation" is rarer than "policy" and chunk 1 repeats it
+    assert set(ids) == {0, 1, 2, 3}
+    assert [idx for idx, _, _ in index.search("travel")] == [3]
+    assert index.search("the of and") == []
+
+
+def test_coverage_is_the_share_of_query_terms_found(tmp_path):
+    index = open_index(tmp_path, ["vacation policy", "vacation days", "parking"])
+
+    coverage = {idx: coverage for idx, _, coverage in index.search("vacation policy")}
+    assert coverage == {0: 1.0, 1: 0.5}
+
+
+def test_search_honours_exclude_and_include(tmp_path):
+    index = open_index(tmp_path, ["vacation policy", "vacation days", "vacation pay"])
+
+    assert {idx for idx, _, _ in index.search("vacation", exclude={0})} == {1, 2}
+    assert {idx for idx, _, _ in index.search("vacation", include={0, 2})} == {0, 2}
+
+
+def test_compaction_renumbers_postings(tmp_path):
+    index = open_index(tmp_path, ["vacation policy", "expense policy", "parking policy"])
+    index.compact([0])
+
+    assert index.count == 2
+    assert [idx for idx, _, _ in index.search("parking")] == [1]
+    assert index.search("vacation") == []
@@ -0,0 +1,271 @@
+import os
+import pickle
+import sqlite3
+import faiss
+import numpy as np
+import pytest
+from conftest import DIMENSION, FakeEncoder, add_document
+
+
+def top_text(store, text):
+    results = store.search(text, k=1, score_threshold=-1)
+    return results[0]['text'] if results else None
+
+
+@pytest.mark.parametrize("index_type, options", [
+    ("flat", {}),
+    ("hnsw", {}),
+    ("ivf_flat", {'nlist': 2, 'train_threshold': 100}),
+    ("ivf_pq", {'nlist': 2, 'pq_m': 4, 'pq_nbits': 4, 'train_threshold': 100}),
+])
+def test_every_index_type_finds_stored_chunks(open_store, index_type, options):
+    store = open_store(index_type=index_type, **options)
+    texts = add_document(store, "a", 120)
+    assert store.is_flat_index() == (index_type == "flat")  # the ANN index was built
+
+    for text in texts[::30]:
+        results = store.search(text, k=5, score_threshold=-1)
+        assert text in [result['text'] for result in results]
+
+    reopened = open_store(index_type=index_type, **options)
+    assert texts[7] in [result['text'] for result in reopened.search(texts[7], k=5, score_threshold=-1)]
+
+
+def test_ivf_pq_trains_on_at_least_one_point_per_centroid(open_store):
+    store = open_store(index_type="ivf_pq", nlist=1, pq_m=4, pq_nbits=8)
+    assert store.train_threshold == 2 ** 8
+
+
+def test_segments_are_replayed_after_a_crash(open_store):
+    store = open_store()
+    add_document(store, "a", 5)
+    add_document(store, "b", 5)
+    assert len(store.list_segments()) == 2
+    assert not os.path.exists(store.vectors_file)  # never checkpointed
+    store.close()
+
+    # Lose the metadata commit of the second segment, as if the process died right after writing it
+    with sqlite3.connect(os.path.join(store.store_path, "metadata.db")) as conn:
+        conn.execute("DELETE FROM chunks WHERE id >= 5")
+
+    reopened = open_store()
+    assert len(reopened) == 10
+    assert top_text(reopened, "b chunk 3") == "b chunk 3"
+    assert reopened.metadata.get_many([8])[8]['document_id'] == "b"
+
+
+def test_unflushed_additions_become_one_segment(open_store):
+    store = open_store()
+    add_document(store, "a", 3, flush=False)
+    add_document(store, "b", 3, flush=False)
+    assert store.list_segments() == []
+
+    store.flush()
+    assert len(store.list_segments()) == 1
+    reopened = open_store()
+    assert len(reopened) == 6
+    assert top_text(reopened, "a chunk 1") == "a chunk 1"
+
+
+def test_checkpoint_removes_merged_segments(open_store):
+    store = open_store(max_segments=3)
+    add_document(store, "a", 4)
+    add_document(store, "b", 4)
+    assert len(store.list_segments()) == 2
+
+    store.checkpoint()
+    assert store.list_segments() == []
+    assert os.path.exists(store.vectors_file)
+
+    # Reaching max_segments merges them into a new checkpoint
+    for document_id in ("c", "d", "e"):
+        add_document(store, document_id, 4)
+    assert store.list_segments() == []
+
+    reopened = open_store()
+    assert len(reopened) == 20
+    assert top_text(reopened, "e chunk 2") == "e chunk 2"
+
+
+@pytest.mark.parametrize("vector_dtype", ["float32", "float16"])
+def test_checkpoint_is_memory_mapped(open_store, vector_dtype):
+    store = open_store(vector_dtype=vector_dtype)
+    add_document(store, "a", 4)
+    store.checkpoint()
+
+    reopened = open_store(vector_dtype=vector_dtype)
+    assert isinstance(reopened.vectors.base, np.memmap)
+    assert reopened.vectors.base.dtype == np.dtype(vector_dtype)
+    assert isinstance(reopened.texts.blob, np.memmap)
+    assert reopened.texts[2] == "a chunk 2"
+
+    # Additions since the checkpoint are searched together with the mapped vectors
+    add_document(reopened, "b", 4)
+    assert top_text(reopened, "a chunk 3") == "a chunk 3"
+    assert top_text(reopened, "b chunk 1") == "b chunk 1"
+
+
+def test_compaction_renumbers_the_remaining_chunks(open_store):
+    store = open_store(compaction_ratio=2.0)  # only compact when asked
+    add_document(store, "a", 3)
+    add_document(store, "b", 3)
+    add_document(store, "c", 3)
+    assert store.delete_document("b") == 3
+
+    assert store.compact()
+    assert store.vectors.ntotal == 6
+    assert store.tombstones == set()
+    assert store.metadata.ids_for_document("c") == [3, 4, 5]
+    result = store.search("c chunk 1", k=1, score_threshold=-1)[0]
+    assert result['id'] == 4
+    assert result['metadata']['document_id'] == "c"
+
+    reopened = open_store()
+    assert len(reopened) == 6
+    assert reopened.metadata.ids_for_document("b") == []
+    assert reopened.search("c chunk 1", k=1, score_threshold=-1)[0]['id'] == 4
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_search_batch_skips_deleted_chunks(open_store, index_type):
+    store = open_store(index_type=index_type, compaction_ratio=2.0)
+    add_document(store, "kept", 5)
+    deleted = add_document(store, "deleted", 40)
+    store.delete_document("deleted")
+
+    results = store.search_batch(deleted[:3], k=3, score_threshold=-1)
+    for row in results:
+        assert len(row) == 3
+        assert all(result['metadata']['document_id'] == "kept" for result in row)
+
+
+def test_legacy_pickle_store_is_migrated(open_store, tmp_path):
+    path = tmp_path / "store"
+    path.mkdir()
+    texts = [f"legacy chunk {i}" for i in range(6)]
+    vectors = FakeEncoder().encode(texts)
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(DIMENSION)
+    index.add(vectors)
+    faiss.write_index(index, str(path / "docs.index"))
+    with open(path / "metadata.pkl", 'wb') as f:
+        pickle.dump({'texts': texts, 'metadata': [{'document_id': "legacy", 'source': "legacy.txt",
+                                                   'chunk_index': i} for i in range(6)]}, f)
+
+    store = open_store()
+    assert len(store) == 6
+    assert not os.path.exists(path / "metadata.pkl")
+    assert os.path.exists(store.vectors_file)
+    result = store.search("legacy chunk 4", k=1, score_threshold=-1)[0]
+    assert result['text'] == "legacy chunk 4"
+    assert result['metadata']['chunk_index'] == 4
+
+    reopened = open_store()
+    assert top_text(reopened, "legacy chunk 2") == "legacy chunk 2"
+
+
+def chunk_metadatas(document_id, count):
+    return [{'document_id': document_id, 'source': f"{document_id}.txt", 'chunk_index': i} for i in range(count)]
+
+
+def test_upsert_only_embeds_new_chunks(open_store, fake_encoder, monkeypatch):
+    encoded = []
+    encode = fake_encoder.encode
+    monkeypatch.setattr(fake_encoder, 'encode', lambda texts, **kwargs: encoded.extend(texts) or encode(texts, **kwargs))
+    store = open_store()
+
+    assert store.upsert_document("a", ["intro", "body", "end"], chunk_metadatas("a", 3), document_hash="v1") == 3
+    assert store.upsert_document("a", ["intro", "body", "end"], chunk_metadatas("a", 3), document_hash="v1") is None
+
+    # One chunk changed: it alone is embedded, and the old version is deleted
+    encoded.clear()
+    assert store.upsert_document("a", ["intro", "body v2", "end"], chunk_metadatas("a", 3), document_hash="v2") == 1
+    assert encoded == ["body v2"]
+    live = store.metadata.get_many(store.metadata.ids_for_document("a"))
+    assert sorted(store.texts[idx] for idx in live) == ["body v2", "end", "intro"]
+    assert all(result['text'] != "body" for result in store.search("body", k=5, score_threshold=-1))
+
+
+def test_upsert_reuses_vectors_of_identical_chunks(open_store, fake_encoder, monkeypatch):
+    store = open_store()
+    store.upsert_document("a", ["shared disclaimer", "only in a"], chunk_metadatas("a", 2))
+
+    encoded = []
+    encode = fake_encoder.encode
+    monkeypatch.setattr(fake_encoder, 'encode', lambda texts, **kwargs: encoded.extend(texts) or encode(texts, **kwargs))
+    assert store.upsert_document("b", ["shared disclaimer", "only in b"], chunk_metadatas("b", 2)) == 1
+    assert encoded == ["only in b"]
+    assert len(store.metadata.ids_for_document("b")) == 2
+
+
+def vector_with_score(score):
+    """A unit vector whose inner product with the first basis vector is score"""
+    vector = np.zeros(DIMENSION, dtype='float32')
+    vector[0], vector[1] = score, np.sqrt(1 - score ** 2)
+    return vector
+
+
+def test_search_tiered_groups_results_into_bands(open_store):
+    store = open_store()
+    scores = [0.9, 0.8, 0.4, 0.35, 0.1]
+    store.add_documents([f"score {score}" for score in scores], chunk_metadatas("a", len(scores)),
+                        embeddings=np.stack([vector_with_score(score) for score in scores]))
+    query = vector_with_score(1.0)
+
+    bands = store.search_tiered("query", k=3, thresholds=(0.3, 0.45), query_embedding=query)
+    assert list(bands) == [0.45, 0.3]
+    assert [result['text'] for result in bands[0.45]] == ["score 0.9", "score 0.8"]
+    assert [result['text'] for result in bands[0.3]] == ["score 0.4"]
+
+    bands = store.search_tiered("query", k=1, query_embedding=query)
+    assert [result['text'] for result in bands[0.45]] == ["score 0.9"]
+    assert bands[0.3] == []
+
+
+def add_scored_chunks(store, chunks):
+    """Add {text: dense score against vector_with_score(1.0)}"""
+    store.add_documents(list(chunks), chunk_metadatas("a", len(chunks)),
+                        embeddings=np.stack([vector_with_score(score) for score in chunks.values()]))
+
+
+def test_search_hybrid_fuses_dense_and_keyword_hits(open_store):
+    store = open_store()
+    add_scored_chunks(store, {"shipping times": 0.9, "returns within 30 days": 0.5,
+                              "refund policy laptops": 0.2})
+
+    results = store.search_hybrid("refund policy laptops", k=3, query_embedding=vector_with_score(1.0))
+    by_text = {result['text']: result for result in results}
+    assert set(by_text) == {"shipping times", "returns within 30 days", "refund policy laptops"}
+    keyword_only = by_text["refund policy laptops"]
+    assert keyword_only['coverage'] == 1 and keyword_only['lexical_score'] > 0
+    assert abs(keyword_only['score'] - 0.2) < 1e-5  # the dense score is filled in
+    assert by_text["shipping times"]['coverage'] == 0
+    assert results == sorted(results, key=lambda result: result['fused_score'], reverse=True)
+
+
+def test_search_tiered_promotes_keyword_matches_with_a_reasonable_dense_score(open_store):
+    store = open_store()
+    add_scored_chunks(store, {"shipping times": 0.9, "refund policy for laptops and tablets": 0.35,
+                              "returns within 30 days": 0.4, "refund policy laptops": 0.2})
+
+    bands = store.search_tiered("refund policy laptops", k=3, hybrid=True, query_embedding=vector_with_score(1.0))
+    assert {result['text'] for result in bands[0.45]} == {"shipping times", "refund policy for laptops and tablets"}
+    assert [result['text'] for result in bands[0.3]] == ["returns within 30 days"]
+
+
+@pytest.mark.parametrize("index_type, exact_filter_limit", [("flat", 20000), ("hnsw", 20000), ("hnsw", 0)])
+def test_filtered_search_only_returns_matching_chunks(open_store, index_type, exact_filter_limit):
+    store = open_store(index_type=index_type, exact_filter_limit=exact_filter_limit, compaction_ratio=2.0)
+    add_document(store, "handbook", 30, category="hr_policy")
+    add_document(store, "budget", 30, category="finance")
+    add_document(store, "laptops", 30, category="it")
+    store.delete_document("laptops")
+
+    results = store.search("budget chunk 3", k=5, score_threshold=-1, filters={'document_id': "handbook"})
+    assert len(results) == 5
+    assert all(result['metadata']['document_id'] == "handbook" for result in results)
+
+    rows = store.search_batch(["handbook chunk 1", "laptops chunk 1"], k=5, score_threshold=-1,
+                              filters={'category': ["finance", "it"]})
+    assert all(result['metadata']['document_id'] == "budget" for row in rows for result in row)
+    assert store.search("handbook chunk 1", k=5, score_threshold=-1, filters={'category': "missing"}) == []
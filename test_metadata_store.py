@@ -0,0 +1,61 @@
+import pytest
+from metadata_store import MetadataStore
+
+
+def chunk(document_id, index, **extra):
+    return dict({'document_id': document_id, 'source': f"{document_id}.txt", 'chunk_index': index}, **extra)
+
+
+def test_metadata_round_trips_without_the_text(tmp_path):
+    store = MetadataStore(str(tmp_path / "metadata.db"))
+    store.extend([chunk("a", 0, text="not stored twice", page=3), chunk("a", 1)])
+    store.commit()
+
+    assert len(store) == 2
+    assert store[0] == chunk("a", 0, page=3)
+    assert store.ids_for_document("a") == [0, 1]
+    store.close()
+
+
+def test_rows_are_durable_only_once_committed(tmp_path):
+    db_file = str(tmp_path / "metadata.db")
+    store = MetadataStore(db_file)
+    store.extend([chunk("a", 0)])
+    store.commit()
+    store.extend([chunk("b", 0)])  # the vectors of this row never got written
+    store.close()
+
+    reopened = MetadataStore(db_file)
+    assert len(reopened) == 1
+    assert reopened.ids_for_document("b") == []
+    reopened.close()
+
+
+def test_compact_renumbers_rows_and_keeps_newer_tombstones(tmp_path):
+    store = MetadataStore(str(tmp_path / "metadata.db"))
+    store.extend([chunk("a", 0), chunk("b", 0), chunk("b", 1), chunk("c", 0), chunk("d", 0)])
+    store.add_tombstones([1, 2, 4])
+
+    # 4 was deleted while the compaction was running, so it isn't dropped yet
+    store.compact([1, 2])
+    store.commit()
+
+    assert len(store) == 3
+    assert [row['document_id'] for row in store] == ["a", "c", "d"]
+    assert store.get_tombstones() == {2}
+    assert store.ids_for_document("d") == []  # still deleted
+    store.close()
+
+
+def test_ids_matching_applies_every_filter_to_live_chunks(tmp_path):
+    store = MetadataStore(str(tmp_path / "metadata.db"))
+    store.extend([chunk("a", 0, category="hr_policy"), chunk("a", 1, category="finance"),
+                  chunk("b", 0, category="hr_policy"), chunk("c", 0, category="it")])
+    store.add_tombstones([2])
+
+    assert store.ids_matching({'document_id': "a"}) == [0, 1]
+    assert store.ids_matching({'category': ["hr_policy", "it"]}) == [0, 3]
+    assert store.ids_matching({'document_id': "a", 'category': "finance"}) == [1]
+    with pytest.raises(ValueError):
+        store.ids_matching({'text': "anything"})
+    store.close()
@@ -0,0 +1,78 @@
+import time
+import pytest
+import model_registry
+from model_registry import model_key
+from reranker import Reranker
+
+
+class FakeCrossEncoder:
+    """Scores a (question, text) pair by the number in the text, taking delay seconds per batch"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.scored = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        time.sleep(self.delay)
+        self.scored.extend(text for _, text in pairs)
+        return [float(text.split()[-1]) for _, text in pairs]
+
+
+@pytest.fixture
+def load_reranker(monkeypatch):
+    def load(encoder, **kwargs):
+        reranker = Reranker(**kwargs)
+        monkeypatch.setitem(model_registry._models, model_key(reranker.model_name, reranker.backend), encoder)
+        return reranker
+    return load
+
+
+def dense_results(scores):
+    """Search results in dense order whose texts carry their cross-encoder score"""
+    return [{'id': i, 'text': f"chunk {score}", 'score': 0.9 - i / 100, 'metadata': {}}
+            for i, score in enumerate(scores)]
+
+
+def texts(results):
+    return [result['text'] for result in results]
+
+
+def test_results_are_reordered_by_cross_encoder_score(load_reranker):
+    encoder = FakeCrossEncoder()
+    reranker = load_reranker(encoder, batch_size=2)
+
+    results = reranker.rerank("question", dense_results([1, 5, 3, 4]), k=3)
+    assert texts(results) == ["chunk 5", "chunk 4", "chunk 3"]
+    assert [result['rerank_score'] for result in results] == [5.0, 4.0, 3.0]
+
+
+def test_scores_are_cached_per_question_and_chunk(load_reranker):
+    encoder = FakeCrossEncoder()
+    reranker = load_reranker(encoder)
+    reranker.rerank("What is the policy?", dense_results([1, 2]))
+
+    encoder.scored.clear()
+    results = reranker.rerank("  what is the POLICY ", dense_results([1, 2, 3]))
+    assert encoder.scored == ["chunk 3"]
+    assert texts(results) == ["chunk 3", "chunk 2", "chunk 1"]
+    assert reranker.get_stats()['cache_hits'] == 2
+
+
+def test_chunks_over_budget_keep_their_dense_order(load_reranker):
+    reranker = load_reranker(FakeCrossEncoder(delay=0.1), batch_size=2, budget_ms=50)
+
+    results = reranker.rerank("question", dense_results([1, 2, 9, 8, 7]), k=5)
+    assert texts(results) == ["chunk 2", "chunk 1", "chunk 9", "chunk 8", "chunk 7"]
+    assert [result['rerank_score'] for result in results[2:]] == [None, None, None]
+    assert reranker.get_stats()['over_budget'] == 1
+
+
+def test_dense_order_is_kept_while_the_model_loads(monkeypatch):
+    reranker = Reranker()
+    warmed = []
+    monkeypatch.setattr(reranker, 'warm_up', lambda: warmed.append(True))
+
+    results = reranker.rerank("question", dense_results([1, 5, 3]), k=2)
+    assert texts(results) == ["chunk 1", "chunk 5"]
+    assert all(result['rerank_score'] is None for result in results)
+    assert warmed and reranker.get_stats()['cold_starts'] == 1